@@ -4,5 +4,33 @@
 """
 Title:              __init__.py
 """
-from src.auvik.api import AuvikAPI
+from importlib import import_module
 
+# Public names and the modules they live in.  They are imported on first
+# access so 'import auvik_inventory.auvik' stays cheap for quick lookups.
+_LAZY = {
+    'AuvikAPI': 'src.auvik.api',
+    'AuvikFilter': 'src.auvik.filters',
+    'AuvikSpec': 'src.auvik.spec',
+    'DeviceTable': 'src.auvik.table',
+    'InventoryIndex': 'src.auvik.index',
+    'InventoryOverrides': 'src.auvik.overrides',
+    'TableRenderer': 'src.auvik.render',
+    'TenantDirectory': 'src.auvik.tenants',
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str) -> object:
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(list(globals()) + __all__)
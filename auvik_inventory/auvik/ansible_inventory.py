@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+# vim: noai:et:tw=80:ts=4:ss=4:sts=4:sw=4:ft=python
+
+'''
+Title:              ansible_inventory.py
+Description:        Ansible dynamic inventory script for Auvik
+Author:             Ricky Laney
+Version:            0.1.0
+'''
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from typing import (
+    IO,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
+from src.auvik.data import AuvikDeviceData
+from src.auvik.decoder import loads
+
+# Typing shortcuts
+UsP = Union[str, os.PathLike]
+
+__all__ = [
+    'AnsibleInventory',
+    'main',
+]
+
+DEFAULT_CACHE_FILE = '~/.auvik_inventory/ansible_hostvars.json'
+DEFAULT_CACHE_TTL = 3600
+# --list output kept in memory up to this size, then spilled to disk
+LIST_BUFFER_SIZE = 8 * 1024 * 1024
+
+
+def _group_name(prefix: str, value: str) -> str:
+    # Ansible group names may only hold letters, digits and underscores
+    return f"{prefix}_{re.sub(r'[^0-9a-zA-Z]+', '_', value).strip('_')}".lower()
+
+
+class AnsibleInventory:
+    """ Render Auvik network devices as an Ansible dynamic inventory.
+
+    --list is built as devices stream in: each host's variables are written
+    under _meta.hostvars as soon as its page arrives, so Ansible never has
+    to call --host, and only group membership is held until the end.  The
+    payload goes to a spooled temporary file and is copied to the output
+    only once complete, so a failure never leaves truncated JSON behind.
+    The host variables are also written to cache_file, which answers --host
+    without contacting the API.
+
+    Hosts are grouped by tenant, device_type and nd_type.  Values that
+    sanitize to the same group name get a suffix, the tenant id for
+    tenants, so distinct tenants are never merged.
+
+    :param:str: cache_file = JSON file --host is answered from.
+    :param:int: cache_ttl = seconds before the cache is rebuilt for --host.
+    :param:str: config_file = AuvikAPI config file.
+    :param:str: filters = device filters, see AuvikFilter.
+    """
+    VERSION = 1
+    GROUPS = ('tenant', 'device_type', 'nd_type')
+
+    def __init__(self, cache_file: UsP=DEFAULT_CACHE_FILE,
+                 cache_ttl: int=DEFAULT_CACHE_TTL, config_file: UsP=None,
+                 filters: str=None) -> None:
+        self.cache_file = os.path.expanduser(cache_file)
+        self.cache_ttl = cache_ttl
+        self.config_file = config_file
+        self.filters = filters
+        # Sanitized group name -> (key, value) it was first given to
+        self._group_names = {}
+
+    def devices(self) -> Iterable[AuvikDeviceData]:
+        """ Network devices streamed from the API.
+        """
+        # Only the API client needs requests and friends, --host does not
+        from src.auvik import AuvikAPI
+        with AuvikAPI(self.config_file) as api:
+            # Progress bars would corrupt the JSON on stdout
+            api.show_progress = False
+            yield from api.iter_devices(filters=self.filters, net_only=True)
+
+    @staticmethod
+    def hostvars(device: AuvikDeviceData) -> dict:
+        fields = device._fields()
+        fields['tenant'] = device.tenant.domain if device.tenant else None
+        fields['ansible_host'] = device.ip
+        return fields
+
+    def groups(self, device: AuvikDeviceData) -> List[str]:
+        groups = []
+        for key in self.GROUPS:
+            value = getattr(device, key, None)
+            suffix = None
+            if key == 'tenant' and value is not None:
+                value, suffix = value.domain, value._id
+            if value:
+                groups.append(self._unique_group(key, value, suffix))
+        return groups
+
+    def _unique_group(self, key: str, value: str, suffix: str=None) -> str:
+        """ Group name of value, suffixed when another value of key already
+        took its sanitized name.
+        """
+        names = self._group_names
+        name = _group_name(key, value)
+        taken = names.get(name)
+        if taken is None:
+            names[name] = (key, value)
+        elif taken != (key, value):
+            suffix = suffix or hashlib.sha1(value.encode()).hexdigest()[:8]
+            name = _group_name(key, f"{value}_{suffix}")
+            names.setdefault(name, (key, value))
+        return name
+
+    def write_list(self, out: IO[str],
+                   devices: Iterable[AuvikDeviceData]=None) -> int:
+        """ Write the --list payload to out and refresh the cache.
+        Nothing is written to out unless every device was read.  Returns
+        the number of hosts written.
+        """
+        devices = self.devices() if devices is None else devices
+        directory = os.path.dirname(os.path.abspath(self.cache_file))
+        os.makedirs(directory, exist_ok=True)
+        tmp_file = f"{self.cache_file}.tmp"
+        with tempfile.SpooledTemporaryFile(max_size=LIST_BUFFER_SIZE,
+                                           mode='w+') as payload:
+            try:
+                written = self._write_list(payload, devices, tmp_file)
+            except BaseException:
+                # Never leave a partial cache behind
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+                raise
+            os.replace(tmp_file, self.cache_file)
+            payload.seek(0)
+            shutil.copyfileobj(payload, out)
+        return written
+
+    def _write_list(self, out: IO[str], devices: Iterable[AuvikDeviceData],
+                    tmp_file: str) -> int:
+        members = {}
+        seen = set()
+        self._group_names = {}
+        with open(tmp_file, 'w') as cache:
+            cache.write(f'{{"version": {self.VERSION}, '
+                        f'"saved": {time.time()}, "hostvars": {{')
+            out.write('{"_meta": {"hostvars": {')
+            for device in devices:
+                name = device.pretty_name
+                if name == 'Unknown' or name in seen:
+                    # Keep hosts unique when names collide across tenants
+                    name = device.ip or device._id
+                    if name in seen:
+                        name = device._id
+                entry = (f'{", " if seen else ""}{json.dumps(name)}: '
+                         f'{json.dumps(self.hostvars(device), default=str)}')
+                seen.add(name)
+                out.write(entry)
+                cache.write(entry)
+                for group in self.groups(device):
+                    members.setdefault(group, []).append(name)
+            cache.write('}}')
+            out.write('}}')
+            for group, hosts in sorted(members.items()):
+                out.write(f', {json.dumps(group)}: '
+                          f'{json.dumps({"hosts": hosts})}')
+            out.write(f', "all": {json.dumps({"children": sorted(members)})}')
+            out.write('}\n')
+        return len(seen)
+
+    def _cached_hostvars(self) -> Optional[Dict[str, dict]]:
+        if not os.path.isfile(self.cache_file):
+            return None
+        try:
+            with open(self.cache_file, 'rb') as cf:
+                stored = loads(cf.read())
+        except (OSError, ValueError):
+            return None
+        if stored.get('version') != self.VERSION or \
+                time.time() - stored.get('saved', 0) > self.cache_ttl:
+            return None
+        return stored['hostvars']
+
+    def host(self, name: str) -> dict:
+        """ Variables for a single host, from the cache when fresh.
+        """
+        hostvars = self._cached_hostvars()
+        if hostvars is None:
+            with open(os.devnull, 'w') as null:
+                self.write_list(null)
+            hostvars = self._cached_hostvars() or {}
+        return hostvars.get(name, {})
+
+
+def main(argv: List[str]=None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Ansible dynamic inventory from the Auvik API'
+    )
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--list', action='store_true',
+                      help='all groups and hosts with their variables')
+    mode.add_argument('--host', help='variables of a single host')
+    parser.add_argument('--config', help='AuvikAPI config file')
+    parser.add_argument('--filters', help='device filters, e.g. vendor=cisco')
+    parser.add_argument('--cache-file', default=DEFAULT_CACHE_FILE,
+                        help='host variables cache used by --host')
+    parser.add_argument('--cache-ttl', type=int, default=DEFAULT_CACHE_TTL,
+                        help='seconds before --host refreshes the cache')
+    args = parser.parse_args(argv)
+    inventory = AnsibleInventory(cache_file=args.cache_file,
+                                 cache_ttl=args.cache_ttl,
+                                 config_file=args.config,
+                                 filters=args.filters)
+    if args.list:
+        try:
+            inventory.write_list(sys.stdout)
+        except Exception as e:
+            # Ansible reports stderr, stdout must be JSON or nothing
+            sys.stderr.write(f"Unable to build the inventory: {e}\n")
+            return 1
+    else:
+        json.dump(inventory.host(args.host), sys.stdout, default=str)
+        sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,21 +5,38 @@
 Title:              main.py
 """
 
-from alive_progress import alive_bar
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from functools import cached_property
 import logging
 import os
-from prettytable import PrettyTable
-import requests
+import queue
+import threading
+import time
 from typing import (
+    IO,
+    TYPE_CHECKING,
     Union,
     Dict,
     List,
     Optional,
     Iterable,
+    Iterator,
 )
+from urllib.parse import quote
 from auvik_inventory.data import AuvikDeviceData, AuvikTenantData, AuvikNetworkData
+from auvik_inventory.decoder import AuvikPage, get_decoder, loads, set_decoder
 from auvik_inventory.filters import AuvikFilter
+from auvik_inventory.overrides import InventoryOverrides
+from auvik_inventory.progress import alive_bar
+from auvik_inventory.pushdown import AuvikFilterPushdown, PushdownPlan
+from auvik_inventory.ratelimit import RequestScheduler
+from auvik_inventory.render import TableRenderer
+from auvik_inventory.spec import AuvikSpec
+from auvik_inventory.sync import AuvikInventorySync
+from auvik_inventory.sysdescr import sysdescr_cache
+from auvik_inventory.table import DeviceTable
+from auvik_inventory.tenants import TenantDirectory
 from auvik_inventory.config import Config
 from auvik_inventory.constants import PRJ_DIR
 from auvik_inventory.logger import Logger
@@ -29,6 +46,12 @@ from auvik_inventory.exceptions import (
     ConfigError,
 )
 
+if TYPE_CHECKING:
+    # Heavy dependencies are imported where they are used to keep
+    # 'import auvik_inventory' fast
+    import requests
+    from auvik_inventory.cache import AuvikResponseCache
+
 # Typing shortcuts
 UdLd = Union[dict, List[dict]]
 UsP = Union[str, os.PathLike]
@@ -48,6 +71,19 @@ class AuvikAPI:
     """
     DEFAULT_URL = "https://auvikapi.us1.my.auvik.com/v1"
     CERT_DIR = os.path.join(PRJ_DIR, f"ssl")
+    # Number of devices enriched concurrently when details are requested
+    DEFAULT_MAX_WORKERS = 8
+    # 'device' looks up each device, 'bulk' crawls the collection endpoints
+    DEFAULT_ENRICHMENT = 'device'
+    # Number of pages fetched ahead while the current page is processed
+    DEFAULT_PREFETCH = 2
+    # Snapshot used by incremental syncs
+    DEFAULT_SNAPSHOT_FILE = '~/.auvik_inventory/snapshot.json'
+    # Seconds a persisted tenant directory stays fresh
+    DEFAULT_TENANT_TTL = 3600
+    # Seconds to connect and between bytes of a response
+    DEFAULT_TIMEOUT = 30
+    CACHE_POLICIES = ('use', 'refresh', 'bypass')
 
     def __init__(self, config_file: OUsP=None) -> None:
         # Create a Logger instance per AuvikAPI instance
@@ -59,6 +95,24 @@ class AuvikAPI:
         self._load_config()
         # Initialized blank attributes
         self.url = None
+        self.session = self._create_session()
+
+
+    def __enter__(self) -> 'AuvikAPI':
+        return self
+
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+    def close(self) -> None:
+        """ Close the HTTP session and release pooled connections.
+        """
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+        sysdescr_cache.save()
 
 
     def _load_config(self) -> None:
@@ -81,6 +135,84 @@ class AuvikAPI:
         self._user = auvik_config['AUVIK_API_USER']
         self._api_key = auvik_config['AUVIK_API_KEY']
         self.auth = (self._user, self._api_key.show())
+        max_workers = auvik_config.get('AUVIK_API_MAX_WORKERS')
+        self.max_workers = int(max_workers or self.DEFAULT_MAX_WORKERS)
+        enrichment = auvik_config.get('AUVIK_API_ENRICHMENT')
+        self.enrichment = enrichment or self.DEFAULT_ENRICHMENT
+        # Tenant name lookups, persisted for tenant_ttl seconds if a file is set
+        tenant_file = auvik_config.get('AUVIK_API_TENANT_FILE')
+        self.tenant_file = os.path.expanduser(tenant_file) if tenant_file \
+            else None
+        tenant_ttl = auvik_config.get('AUVIK_API_TENANT_TTL')
+        self.tenant_ttl = int(self.DEFAULT_TENANT_TTL if tenant_ttl is None
+                              else tenant_ttl)
+        self.tenant_policies = {
+            'ambiguous': auvik_config.get('AUVIK_API_TENANT_AMBIGUOUS')
+                or 'first',
+            'missing': auvik_config.get('AUVIK_API_TENANT_MISSING') or 'warn',
+        }
+        # Crawl each tenant's pages concurrently instead of one tenants= query
+        self.tenant_fanout = bool(auvik_config.get('AUVIK_API_TENANT_FANOUT'))
+        tenant_workers = auvik_config.get('AUVIK_API_TENANT_WORKERS')
+        self.tenant_workers = int(tenant_workers or self.max_workers)
+        self.crawl_stats = {}
+        # Send filters the API can evaluate as filter[...] parameters
+        pushdown = auvik_config.get('AUVIK_API_PUSHDOWN')
+        self.filter_pushdown = True if pushdown is None else bool(pushdown)
+        # Parse os, model, nd_type and timestamps only when first read
+        self.lazy_devices = bool(auvik_config.get('AUVIK_API_LAZY_DEVICES'))
+        # CSV/Excel corrections applied to every device built
+        override_files = auvik_config.get('AUVIK_API_OVERRIDE_FILES') or []
+        if isinstance(override_files, str):
+            override_files = [override_files]
+        self.override_files = override_files
+        # Fastest JSON decoder installed unless one is named
+        try:
+            set_decoder(auvik_config.get('AUVIK_API_JSON_DECODER'))
+        except (ValueError, ImportError) as e:
+            raise IEAutomationConfigError(f"Unable to use JSON decoder: {e}")
+        # Decode records one at a time instead of whole pages
+        self.stream_pages = bool(auvik_config.get('AUVIK_API_STREAM_PAGES'))
+        spec_cache_file = auvik_config.get('AUVIK_API_SPEC_CACHE_FILE')
+        self.spec_cache_file = os.path.expanduser(spec_cache_file) \
+            if spec_cache_file else None
+        # Default to one pooled connection per enrichment worker
+        pool_size = auvik_config.get('AUVIK_API_POOL_SIZE')
+        self.pool_size = int(pool_size or self.max_workers)
+        prefetch = auvik_config.get('AUVIK_API_PREFETCH')
+        self.prefetch = int(self.DEFAULT_PREFETCH if prefetch is None
+                            else prefetch)
+        self.snapshot_file = os.path.expanduser(
+            auvik_config.get('AUVIK_API_SNAPSHOT_FILE')
+            or self.DEFAULT_SNAPSHOT_FILE
+        )
+        self.full_sync_interval = auvik_config.get(
+            'AUVIK_API_FULL_SYNC_INTERVAL'
+        )
+        self.stale_after = auvik_config.get('AUVIK_API_STALE_AFTER')
+        timeout = auvik_config.get('AUVIK_API_TIMEOUT')
+        self.timeout = float(self.DEFAULT_TIMEOUT if timeout is None
+                             else timeout)
+        self.scheduler = RequestScheduler(
+            rate=auvik_config.get('AUVIK_API_RATE_LIMIT'),
+            burst=auvik_config.get('AUVIK_API_RATE_BURST'),
+            max_retries=auvik_config.get('AUVIK_API_MAX_RETRIES'),
+            retry_budget=auvik_config.get('AUVIK_API_RETRY_BUDGET'),
+        )
+        self.cache = self._create_cache(auvik_config)
+        self.cache_policy = auvik_config.get('AUVIK_API_CACHE_POLICY') \
+            or 'use'
+        if self.cache_policy not in self.CACHE_POLICIES:
+            raise IEAutomationConfigError(
+                f"Invalid cache policy: {self.cache_policy}"
+            )
+        # sysDescr classifications are shared by every device and client
+        sysdescr_file = auvik_config.get('AUVIK_API_SYSDESCR_CACHE_FILE')
+        sysdescr_cache.configure(
+            maxsize=auvik_config.get('AUVIK_API_SYSDESCR_CACHE_SIZE'),
+            cache_file=os.path.expanduser(sysdescr_file) if sysdescr_file
+            else None,
+        )
         cert_file = auvik_config['AUVIK_API_SSL_CERT']
         self._cert = os.path.join(self.CERT_DIR, cert_file)
         if os.path.isfile(self._cert):
@@ -91,27 +223,83 @@ class AuvikAPI:
             raise IEAutomationAuvikSSLError("You MUST use SSL encryption!")
 
 
+    def _create_cache(self, auvik_config: dict
+                      ) -> Optional['AuvikResponseCache']:
+        """ Create the persistent response cache if one is configured.
+        """
+        cache_file = auvik_config.get('AUVIK_API_CACHE_FILE')
+        if not cache_file:
+            return None
+        from auvik_inventory.cache import AuvikResponseCache
+        max_mb = auvik_config.get('AUVIK_API_CACHE_MAX_MB')
+        cache = AuvikResponseCache(
+            os.path.expanduser(cache_file),
+            ttl=auvik_config.get('AUVIK_API_CACHE_TTL'),
+            ttls=auvik_config.get('AUVIK_API_CACHE_TTLS'),
+            max_size=int(max_mb) * 1024 * 1024 if max_mb else None,
+            namespace=f"{self._user}@{self.base_url}",
+        )
+        self.log.debug(f"Response cache enabled -> {cache_file}")
+        return cache
+
+
+    def _create_session(self) -> 'requests.Session':
+        """ Create a keep-alive session that shares auth, SSL and a pool.
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+        # Kept so _get_body does not import requests on every call
+        self._retry_errors = (requests.ConnectionError, requests.Timeout)
+        session = requests.Session()
+        session.auth = self.auth
+        session.verify = self.ssl
+        adapter = HTTPAdapter(pool_maxsize=self.pool_size, pool_block=True)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        self.log.debug(f"Session created with pool size {self.pool_size}")
+        return session
+
+
+    @property
+    def pool_stats(self) -> Dict[str, dict]:
+        """ Connection pool statistics per host.
+        'connections' counts new connections opened and 'reused' counts the
+        requests that were served over an existing keep-alive connection.
+        """
+        stats = {}
+        pools = self.session.get_adapter(self.base_url).poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "maxsize": self.pool_size,
+                "available": pool.pool.qsize() if pool.pool else 0,
+                "connections": pool.num_connections,
+                "requests": pool.num_requests,
+                "reused": pool.num_requests - pool.num_connections,
+            }
+        return stats
+
+
     def _add_to_base_url(self, path: str) -> str:
         if not path.startswith('/'):
             path = f"/{path}"
         return f"{self.base_url}{path}"
 
 
-    def _set_url(self, url: str) -> None:
+    def _set_url(self, url: str) -> str:
         if not url.startswith(self.base_url):
             url = self._add_to_base_url(url)
         self.log.debug(f"New url set -> {url}")
         self.url = url
+        return url
 
 
-    def _join_things(self, things: Union[str, list]) -> Union[str, list]:
+    def _join_things(self, things: Union[str, list]) -> str:
         if isinstance(things, list):
-            if len(things) == 1:
-                return things[0]
-            else:
-                # Ensure no duplicates here
-                clean_things = set(things)
-                return [','.join(t) for t in clean_things]
+            # Ensure no duplicates here but keep the order
+            return ','.join(dict.fromkeys(things))
         else:
             return things
 
@@ -122,82 +310,266 @@ class AuvikAPI:
         *,
         return_data: bool=True,
         recurse: bool=False,
+        cache_policy: str=None,
     ) -> UdLd:
         """ Private method that performs specialized GET operations.
+        cache_policy is one of 'use', 'refresh' (skip reads but store the
+        new response) or 'bypass' and defaults to self.cache_policy.
         """
         if not url and not self.url:
             raise IEAutomationAuvikAPIError(f"No URL provided nor set via attribute")
-        if url:
-            self._set_url(url)
+        # Keep a local copy of the url as workers may call _get concurrently
+        url = self._set_url(url) if url else self.url
         if recurse:
-            return self._get_recursive()
-        self.log.debug(f"_get called for -> {self.url}")
-        response = requests.get(self.url, auth=self.auth, verify=self.ssl)
-        if response.ok:
-            self.log.debug(f"OK Response -> {self.url}")
-            results = response.json()
-            return results['data'] if return_data else results
+            return self._get_recursive(url, cache_policy)
+        results = loads(self._fetch(url, cache_policy))
+        return results['data'] if return_data else results
+
+
+    def _fetch(self, url: str, cache_policy: str=None) -> bytes:
+        """ Private method that returns the raw body of url from the cache
+        or the API following cache_policy.
+        """
+        cache_policy = cache_policy or self.cache_policy
+        use_cache = self.cache is not None and cache_policy != 'bypass'
+        body = None
+        if use_cache and cache_policy != 'refresh':
+            body = self.cache.get(url)
+        if body is None:
+            body = self._get_body(url)
+            if use_cache:
+                self.cache.set(url, body)
         else:
-            raise IEAutomationAuvikAPIError(
-                f"HTTP error code: {response.raise_for_status()}"
-            )
+            self.log.debug(f"Cached Response -> {url}")
+        return body
 
 
-    def _get_recursive(self) -> UdLd:
+    def _get_body(self, url: str) -> bytes:
+        """ Private method that requests a URL and returns the raw body.
+        Requests are paced by the scheduler and throttled or failed
+        requests are retried with backoff while the retry budget allows.
+        """
+        self.log.debug(f"_get called for -> {url}")
+        attempt = 0
+        while True:
+            self.scheduler.wait()
+            status = retry_after = None
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except self._retry_errors as e:
+                error = f"Connection error: {e} for {url}"
+            else:
+                if response.ok:
+                    self.log.debug(f"OK Response -> {url}")
+                    self.scheduler.success(response.headers)
+                    return response.content
+                status = response.status_code
+                retry_after = response.headers.get('Retry-After')
+                error = f"HTTP error code: {status} for {url}"
+            delay = self.scheduler.retry_delay(status, attempt, retry_after)
+            if delay is None:
+                raise IEAutomationAuvikAPIError(error)
+            time.sleep(delay)
+            attempt += 1
+
+
+    def _get_recursive(self, url: str=None, cache_policy: str=None) -> UdLd:
         """ Private method recursive GET operation.
         This is called by using the _get() method with recurse=True.
         """
-        # Get first results
-        results = self._get(return_data=False)
-        # Save first data
-        data = results['data']
+        data = []
+        for page in self.iter_pages(url, cache_policy=cache_policy):
+            data.extend(page)
+        # No more 'next' links return data
+        return data
+
+
+    def _iter_results(self, url: str=None,
+                      cache_policy: str=None) -> Iterator[dict]:
+        """ Private generator of whole pages following the 'next' links.
+        """
+        results = self._get(url, return_data=False, cache_policy=cache_policy)
+        yield results
+        while 'next' in results['links'].keys():
+            results = self._get(results['links']['next'], return_data=False,
+                                cache_policy=cache_policy)
+            yield results
+
+
+    def _prefetch(self, iterable: Iterable, depth: int) -> Iterator:
+        """ Private generator that runs iterable in a background thread.
+        Up to depth items are fetched ahead of the consumer so network time
+        overlaps with whatever the consumer does with each item.  The
+        producer holds one item while waiting for room, so the queue keeps
+        depth - 1 (a depth of 1 still fetches up to 2 items ahead).
+        """
+        buffer = queue.Queue(maxsize=max(depth - 1, 1))
+        stop = threading.Event()
+        done = object()
+
+        def put(item: tuple) -> bool:
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce() -> None:
+            try:
+                for item in iterable:
+                    if not put((item, None)):
+                        return
+            except Exception as e:
+                put((done, e))
+            else:
+                put((done, None))
+
+        worker = threading.Thread(target=produce, name='auvik-prefetch',
+                                  daemon=True)
+        worker.start()
+        try:
+            while True:
+                item, error = buffer.get()
+                if item is done:
+                    if error:
+                        raise error
+                    return
+                yield item
+        finally:
+            stop.set()
+
+
+    def iter_pages(self, url: str=None, prefetch: int=None,
+                   progress: bool=True,
+                   cache_policy: str=None) -> Iterator[List[dict]]:
+        """ Yield the data of each page as soon as it arrives.
+        Follows the 'next' links until the last page.  With prefetch > 0 the
+        next pages are fetched in the background while the current page is
+        being processed.  progress=False hides the progress bar and
+        cache_policy applies to every page, see _get.
+        """
+        prefetch = self.prefetch if prefetch is None else prefetch
+        pages = self._iter_results(url, cache_policy)
+        if prefetch > 0:
+            pages = self._prefetch(pages, prefetch)
         try:
-            num_pages = results['meta']['totalPages']
-        except KeyError:
-            self.log.error("Get recursive called and no more pages exist")
-            return data
-        pages_left = int(num_pages) - 1
-        self.log.debug(f"_get_recursive called with {pages_left} pages left")
-        # Go get results and extend data (an iteration)
-        if self.show_progress:
+            # Get first results
+            results = next(pages)
+            yield results['data']
+            try:
+                num_pages = results['meta']['totalPages']
+            except KeyError:
+                self.log.error("Get recursive called and no more pages exist")
+                return
+            pages_left = int(num_pages) - 1
+            self.log.debug(f"iter_pages called with {pages_left} pages left")
+            # Go get results and yield data (an iteration)
             title = 'Gathering data from Auvik API'
-            with alive_bar(pages_left, title=title, bar='smooth') as bar:
-                # Now check for a 'next' link and recurse if found
-                while 'next' in results['links'].keys():
-                    self.url = results['links']['next']
-                    results = self._get(return_data=False)
-                    data.extend(results['data'])
+            with alive_bar(pages_left, title=title, bar='smooth',
+                           disable=not (self.show_progress and progress)) as bar:
+                for results in pages:
+                    yield results['data']
                     bar()
-        else:
-            while 'next' in results['links'].keys():
-                self.url = results['links']['next']
-                results = self._get(return_data=False)
-                data.extend(results['data'])
-        # No more 'next' links return data
-        return data
+        finally:
+            pages.close()
+
+
+    def _iter_stream(self, url: str=None,
+                     cache_policy: str=None) -> Iterator[dict]:
+        """ Private generator of records parsed incrementally from each page.
+        The 'next' link is only known once a page is parsed, so pages are
+        fetched one at a time.
+        """
+        url = self._set_url(url) if url else self.url
+        page = AuvikPage(self._fetch(url, cache_policy))
+        yield from page
+        if not page.next:
+            return
+        # 'meta' follows 'data', so the page count is known from here on
+        pages_left = int(page.meta.get('totalPages', 0)) - 1
+        title = 'Gathering data from Auvik API'
+        with alive_bar(pages_left if pages_left > 0 else None, title=title,
+                       bar='smooth', disable=not self.show_progress) as bar:
+            while page.next:
+                url = self._set_url(page.next)
+                page = AuvikPage(self._fetch(url, cache_policy))
+                yield from page
+                bar()
+
+
+    def iter_records(self, url: str=None,
+                     cache_policy: str=None) -> Iterator[dict]:
+        """ Yield records one by one from every page of a collection.
+        With stream_pages and the stdlib decoder each record is decoded as
+        it is reached rather than decoding the whole page first.  orjson and
+        ujson decode a whole page faster than the stdlib streams it, so they
+        keep the prefetching page path.
+        """
+        if self.stream_pages and get_decoder() == 'json':
+            yield from self._iter_stream(url, cache_policy)
+            return
+        for page in self.iter_pages(url, cache_policy=cache_policy):
+            yield from page
 
 
     @cached_property
     def tenants(self) -> ATD:
         """ Get a list of tenants for your default domain.
         """
+        return self._fetch_tenants()
+
+
+    def _fetch_tenants(self, cache_policy: str=None) -> ATD:
         tenants = []
         url_path = "/tenants"
         self.log.debug(f"Tenants for {self.domain}")
-        for tenant in self._get(url_path):
-            tenants.append(AuvikTenantData(tenant))
+        for tenant in self._get(url_path, cache_policy=cache_policy):
+            tenants.append(AuvikTenantData.intern(tenant))
         self.log.debug(f"{len(tenants)} tenants found for {self.domain}")
         return tenants
 
 
-    def get_tenant_id_by_name(self, name: str) -> str:
-        """ Get the id of tenant by name.
-        Logic -> if 'name' in 'actual_name_from_API'.
-        Returns first hit.
+    @cached_property
+    def tenant_directory(self) -> TenantDirectory:
+        """ Indexed tenants, loaded from tenant_file while it is fresh.
+        """
+        return self._build_tenant_directory()
+
+
+    def refresh_tenant_directory(self) -> TenantDirectory:
+        """ Rebuild the tenant directory from the API, skipping the tenant
+        file and cached responses, and save it.
+        """
+        self.tenants = self._fetch_tenants(cache_policy='refresh')
+        self.tenant_directory = self._build_tenant_directory(use_file=False)
+        return self.tenant_directory
+
+
+    def _build_tenant_directory(self, use_file: bool=True) -> TenantDirectory:
+        namespace = f"{self._user}@{self.base_url}/{self.domain}"
+        if self.tenant_file and use_file:
+            directory = TenantDirectory.load(self.tenant_file,
+                                             self.tenant_ttl, namespace,
+                                             **self.tenant_policies)
+            if directory is not None:
+                self.log.debug(f"Loaded {len(directory)} tenants from "
+                               f"{self.tenant_file}")
+                return directory
+        directory = TenantDirectory(self.tenants, **self.tenant_policies)
+        if self.tenant_file:
+            directory.save(self.tenant_file, namespace)
+        return directory
+
+
+    def get_tenant_id_by_name(self, name: str) -> Optional[str]:
+        """ Get the id of tenant by name (or id).
+        Exact domains win over prefixes, which win over 'name' in domain.
+        Ambiguous and missing names follow the tenant policies.
         """
-        for tenant in self.tenants:
-            if name in tenant.domain:
-                return tenant._id
+        ids = self.tenant_directory.resolve(name)
+        return ids[0] if ids else None
 
 
     def get_tenant_detail(self, domain: str=None, name: str=None,
@@ -214,10 +586,17 @@ class AuvikAPI:
         return self._get(url_path)
 
 
-    def generate_query(self, tenants: Usl=None, tenant_ids: Usl=None) -> str:
-        # Tenant_ids take precedence
+    def resolve_tenant_ids(self, tenants: Usl=None, tenant_ids: Usl=None,
+                           strict: bool=False) -> List[str]:
+        """ Resolve tenant names (or ids) to a list of unique tenant ids.
+        With strict=True every name must resolve, see
+        TenantDirectory.resolve_all.
+        """
+        # Tenant_ids take precedence and are used as-is
         if tenant_ids:
-            names = tenant_ids
+            if isinstance(tenant_ids, str):
+                tenant_ids = tenant_ids.split(',')
+            return list(dict.fromkeys(tenant_ids))
         elif tenants:
             names = tenants
         elif self.domain_filters:
@@ -227,39 +606,251 @@ class AuvikAPI:
                 "Must provide tenants, tenant_ids, or domain filters"
             )
         if isinstance(names, str):
-            ids = self.get_tenant_id_by_name(names)
-            self.log.debug(f"Generated query for {ids}")
-        else:
-            ids = [self.get_tenant_id_by_name(n) for n in names]
-            self.log.debug(f"Generated query for {len(ids)} tenants")
+            names = [names]
+        directory = self.tenant_directory
+        if directory.loaded and directory.unresolved(names):
+            # The saved tenants may predate a tenant created since
+            self.log.debug("Tenant names not in the saved tenants, refreshing")
+            directory = self.refresh_tenant_directory()
+        return directory.resolve_all(names, strict=strict)
+
+
+    def generate_query(self, tenants: Usl=None, tenant_ids: Usl=None,
+                       strict: bool=False) -> str:
+        ids = self.resolve_tenant_ids(tenants, tenant_ids, strict)
+        self.log.debug(f"Generated query for {len(ids)} tenants")
         return self._join_things(ids)
 
 
+    @cached_property
+    def inventory_sync(self) -> AuvikInventorySync:
+        """ Incremental sync backed by the configured snapshot file.
+        """
+        return AuvikInventorySync(
+            self,
+            self.snapshot_file,
+            full_interval=self.full_sync_interval,
+            stale_after=self.stale_after,
+        )
+
+
+    @cached_property
+    def overrides(self) -> Optional[InventoryOverrides]:
+        """ Overrides from AUVIK_API_OVERRIDE_FILES, parsed on first use.
+        """
+        if not self.override_files:
+            return None
+        return InventoryOverrides(self.override_files)
+
+
+    @cached_property
+    def spec(self) -> AuvikSpec:
+        return AuvikSpec(cache_file=self.spec_cache_file)
+
+
+    @cached_property
+    def pushdown(self) -> AuvikFilterPushdown:
+        return AuvikFilterPushdown(self.spec)
+
+
+    def plan_filters(self, filters: Usl=None,
+                      pushdown: bool=True) -> PushdownPlan:
+        """ Combine the global and local device filters and, when allowed,
+        move what the API can evaluate into filter[...] parameters.
+        """
+        dev_filters = []
+        for fil in (self.device_filters, filters):
+            if fil:
+                fil = fil if isinstance(fil, AuvikFilter) else AuvikFilter(fil)
+                dev_filters.extend(fil.filters)
+        combined = AuvikFilter(dev_filters) if dev_filters else None
+        if not (pushdown and self.filter_pushdown):
+            return PushdownPlan({}, combined)
+        return self.pushdown.plan(combined)
+
+
+    @staticmethod
+    def _filter_query(server_filters: Dict[str, str]=None) -> str:
+        if not server_filters:
+            return ''
+        return ''.join(f"&{name}={quote(value, safe='')}"
+                       for name, value in server_filters.items())
+
+
+    def _crawl_tenant(self, url: str, cache_policy: str=None) -> List[dict]:
+        # The pool already overlaps requests, so no prefetch thread or bar
+        records = []
+        for page in self.iter_pages(url, prefetch=0, progress=False,
+                                    cache_policy=cache_policy):
+            records.extend(page)
+        return records
+
+
+    def crawl_tenants(self, path: str, tenants: Usl=None,
+                      tenant_ids: Usl=None, max_workers: int=None,
+                      server_filters: Dict[str, str]=None,
+                      cache_policy: str=None) -> List[dict]:
+        """ Crawl the pages of path for every tenant concurrently.
+        Records are merged in tenant order.  Timing, record counts and errors
+        per tenant are kept in crawl_stats, and tenants that fail are skipped
+        so the others are still returned.  Raises only if every tenant fails.
+        """
+        ids = self.resolve_tenant_ids(tenants, tenant_ids)
+        query = self._filter_query(server_filters)
+        workers = max(1, min(max_workers or self.tenant_workers, len(ids) or 1))
+        stats = {}
+        results = {}
+
+        def crawl(tenant_id: str) -> List[dict]:
+            started = time.perf_counter()
+            try:
+                return self._crawl_tenant(f"{path}?tenants={tenant_id}{query}",
+                                          cache_policy)
+            finally:
+                stats[tenant_id] = {
+                    "seconds": round(time.perf_counter() - started, 3),
+                }
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {tenant_id: pool.submit(crawl, tenant_id)
+                       for tenant_id in ids}
+            with alive_bar(len(ids), title=f"Crawling {path}", bar='smooth',
+                           disable=not self.show_progress) as bar:
+                for tenant_id, future in futures.items():
+                    try:
+                        results[tenant_id] = future.result()
+                        stats[tenant_id].update(
+                            records=len(results[tenant_id]), error=None
+                        )
+                    except Exception as e:
+                        stats[tenant_id].update(records=0, error=str(e))
+                        self.log.warning(f"Crawl of {path} failed for tenant "
+                                         f"{tenant_id}: {e}")
+                    bar()
+        self.crawl_stats = stats
+        failed = [t for t, stat in stats.items() if stat['error']]
+        if ids and len(failed) == len(ids):
+            raise AuvikAPIError(
+                f"Crawl of {path} failed for every tenant: "
+                f"{stats[failed[0]]['error']}"
+            )
+        if failed:
+            self.log.warning(f"Returning partial results, {len(failed)} of "
+                             f"{len(ids)} tenants failed")
+        records = []
+        for tenant_id in ids:
+            records.extend(results.get(tenant_id, []))
+        return records
+
+
     def get_tenant_inventory(self, tenants: Usl=None, tenant_ids: Usl=None,
-                             recurse: bool=True) -> dict:
+                             recurse: bool=True,
+                             incremental: bool=False,
+                             server_filters: Dict[str, str]=None,
+                             fanout: bool=None,
+                             cache_policy: str=None) -> dict:
         """ Get a list of inventory from one or more tenant ids.
+        With incremental=True only changes since the last run are pulled and
+        merged into the local snapshot.  server_filters are sent as is,
+        e.g. {'filter[vendorName]': 'Cisco'}.  fanout (default
+        self.tenant_fanout) crawls the tenants concurrently.  cache_policy
+        overrides self.cache_policy for this call, see _get.
         """
+        if incremental:
+            return self.inventory_sync.sync('devices', tenants, tenant_ids)
+        fanout = self.tenant_fanout if fanout is None else fanout
+        if fanout and recurse:
+            return self.crawl_tenants('/inventory/device/info', tenants,
+                                      tenant_ids,
+                                      server_filters=server_filters,
+                                      cache_policy=cache_policy)
         query = self.generate_query(tenants, tenant_ids)
-        url_path = f"/inventory/device/info?tenants={query}"
-        return self._get(url_path, recurse=recurse)
+        url_path = f"/inventory/device/info?tenants={query}" \
+            f"{self._filter_query(server_filters)}"
+        return self._get(url_path, recurse=recurse,
+                         cache_policy=cache_policy)
+
+
+    def iter_tenant_inventory(self, tenants: Usl=None,
+                              tenant_ids: Usl=None,
+                              server_filters: Dict[str, str]=None,
+                              cache_policy: str=None,
+                              ) -> Iterator[dict]:
+        """ Yield inventory items from one or more tenant ids page by page.
+        """
+        query = self.generate_query(tenants, tenant_ids)
+        url_path = f"/inventory/device/info?tenants={query}" \
+            f"{self._filter_query(server_filters)}"
+        return self.iter_records(url_path, cache_policy)
 
 
     def get_tenant_networks(self, tenants: Usl=None, tenant_ids: Usl=None,
-                            recurse: bool=True) -> dict:
+                            recurse: bool=True,
+                            incremental: bool=False,
+                            fanout: bool=None,
+                            cache_policy: str=None) -> dict:
         """ Get a list of networks from one or more tenant ids.
+        With incremental=True only changes since the last run are pulled and
+        merged into the local snapshot.  fanout (default self.tenant_fanout)
+        crawls the tenants concurrently.
         """
+        if incremental:
+            return self.inventory_sync.sync('networks', tenants, tenant_ids)
+        fanout = self.tenant_fanout if fanout is None else fanout
+        if fanout and recurse:
+            return self.crawl_tenants('/inventory/network/info', tenants,
+                                      tenant_ids, cache_policy=cache_policy)
         query = self.generate_query(tenants, tenant_ids)
         url_path = f"/inventory/network/info?tenants={query}"
-        return self._get(url_path, recurse=recurse)
+        return self._get(url_path, recurse=recurse,
+                         cache_policy=cache_policy)
 
 
     def get_tenant_configs(self, tenants: Usl=None, tenant_ids: Usl=None,
-                             recurse: bool=True) -> dict:
+                             recurse: bool=True,
+                             cache_policy: str=None) -> dict:
         """ Get a list of configs from one or more tenant ids.
         """
         query = self.generate_query(tenants, tenant_ids)
         url_path = f"/inventory/configuration/info?tenants={query}"
-        return self._get(url_path, recurse=recurse)
+        return self._get(url_path, recurse=recurse,
+                         cache_policy=cache_policy)
+
+
+    def get_tenant_device_details(self, tenants: Usl=None,
+                                  tenant_ids: Usl=None,
+                                  recurse: bool=True,
+                                  cache_policy: str=None) -> dict:
+        """ Get a list of device details from one or more tenant ids.
+        """
+        query = self.generate_query(tenants, tenant_ids)
+        url_path = f"/inventory/device/detail?tenants={query}"
+        return self._get(url_path, recurse=recurse,
+                         cache_policy=cache_policy)
+
+
+    def get_tenant_device_warranties(self, tenants: Usl=None,
+                                     tenant_ids: Usl=None,
+                                     recurse: bool=True,
+                                     cache_policy: str=None) -> dict:
+        """ Get a list of device warranties from one or more tenant ids.
+        """
+        query = self.generate_query(tenants, tenant_ids)
+        url_path = f"/inventory/device/warranty?tenants={query}"
+        return self._get(url_path, recurse=recurse,
+                         cache_policy=cache_policy)
+
+
+    def get_tenant_device_lifecycles(self, tenants: Usl=None,
+                                     tenant_ids: Usl=None,
+                                     recurse: bool=True,
+                                     cache_policy: str=None) -> dict:
+        """ Get a list of device lifecycles from one or more tenant ids.
+        """
+        query = self.generate_query(tenants, tenant_ids)
+        url_path = f"/inventory/device/lifecycle?tenants={query}"
+        return self._get(url_path, recurse=recurse,
+                         cache_policy=cache_policy)
 
 
     def get_device_info(self, device_id: str, detail: bool=False,
@@ -304,6 +895,9 @@ class AuvikAPI:
 
 
     def get_device_details(self, item: dict) -> dict:
+        """ Get detail, warranty and lifecycle data for an inventory item.
+        Each lookup fails on its own and is returned as None.
+        """
         try:
             details = self.get_device_detail(item['id'])
         except Exception as e:
@@ -328,6 +922,144 @@ class AuvikAPI:
             }
 
 
+    def enrich_devices(self, items: Iterable[dict],
+                       max_workers: int=None) -> Iterator[dict]:
+        """ Get details for many inventory items with a pool of workers.
+        Results are yielded in the same order as items.  A failure for one
+        device is isolated by get_device_details() and never stops the pool.
+        Items are consumed lazily so a stream of pages can be enriched
+        without holding the whole inventory.
+        """
+        workers = max_workers or self.max_workers
+        if workers <= 1:
+            yield from map(self.get_device_details, items)
+            return
+        self.log.debug(f"Enriching devices with {workers} workers")
+        pool = ThreadPoolExecutor(max_workers=workers,
+                                  thread_name_prefix='auvik-enrich')
+        # Keep a bounded window of pending lookups in submission order
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(pool.submit(self.get_device_details, item))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+    def bulk_enrich_devices(self, items: Iterable[dict], tenants: Usl=None,
+                            tenant_ids: Usl=None) -> Iterator[dict]:
+        """ Get details for many inventory items from the collection endpoints.
+        The detail, warranty and lifecycle collections are crawled once per
+        tenant query and joined onto the items by device id.  A collection
+        that fails to load is logged and its data returned as None.
+        """
+        collections = {
+            "details": self.get_tenant_device_details,
+            "warranty": self.get_tenant_device_warranties,
+            "lifecycle": self.get_tenant_device_lifecycles,
+        }
+        lookups = {}
+        with ThreadPoolExecutor(max_workers=len(collections),
+                                thread_name_prefix='auvik-bulk') as pool:
+            futures = {
+                key: pool.submit(getter, tenants=tenants,
+                                 tenant_ids=tenant_ids)
+                for key, getter in collections.items()
+            }
+            for key, future in futures.items():
+                try:
+                    lookups[key] = {d['id']: d for d in future.result()}
+                except Exception as e:
+                    lookups[key] = {}
+                    self.log.debug(f"Failed bulk {key} with {e}")
+                self.log.debug(f"Bulk {key} found {len(lookups[key])} items")
+        for item in items:
+            yield {
+                "item": item,
+                "details": lookups["details"].get(item['id']),
+                "warranty": lookups["warranty"].get(item['id']),
+                "lifecycle": lookups["lifecycle"].get(item['id']),
+            }
+
+
+    def _enrich(self, items: Iterable[dict], tenants: Usl=None,
+                tenant_ids: Usl=None, enrichment: str=None,
+                max_workers: int=None) -> Iterator[dict]:
+        """ Dispatch to the configured enrichment mode.
+        """
+        enrichment = enrichment or self.enrichment
+        if enrichment == 'bulk':
+            return self.bulk_enrich_devices(items, tenants, tenant_ids)
+        elif enrichment == 'device':
+            return self.enrich_devices(items, max_workers)
+        raise AuvikAPIError(f"Invalid enrichment mode: {enrichment}")
+
+
+    def _to_device(self, item: dict) -> AuvikDeviceData:
+        """ Build device data from an inventory item or enriched item
+        with the overrides applied.
+        """
+        if 'item' in item.keys():
+            device = AuvikDeviceData(
+                item['item'],
+                details=item['details'],
+                warranty=item['warranty'],
+                lifecycle=item['lifecycle'],
+                lazy=self.lazy_devices,
+            )
+        else:
+            device = AuvikDeviceData(item, lazy=self.lazy_devices)
+        if self.overrides is not None:
+            self.overrides.apply(device)
+        return device
+
+
+    def iter_devices(
+        self,
+        tenants: Usl=None,
+        tenant_ids: Usl=None,
+        details: bool=False,
+        filters: str=None,
+        return_objects: bool=True,
+        net_only: bool=False,
+        max_workers: int=None,
+        enrichment: str=None,
+        cache_policy: str=None,
+    ) -> Iterator[Union[AuvikDeviceData, dict]]:
+        """ Stream devices through enrichment and filtering.
+        Devices are yielded as soon as their page arrives, so memory stays
+        bounded by a page rather than the whole inventory.
+        """
+        # Raw items are filtered by their own keys, so only push down
+        # filters on device attributes
+        plan = self.plan_filters(filters, pushdown=return_objects)
+        inv_items = self.iter_tenant_inventory(tenants=tenants,
+                                               tenant_ids=tenant_ids,
+                                               server_filters=plan.params,
+                                               cache_policy=cache_policy)
+        if details:
+            inv_items = self._enrich(inv_items, tenants, tenant_ids,
+                                     enrichment, max_workers)
+
+        def devices() -> Iterator[Union[AuvikDeviceData, dict]]:
+            for item in inv_items:
+                if return_objects or net_only:
+                    device = self._to_device(item)
+                    if net_only and not device.is_net_device():
+                        self.log.debug(f"Not a net device {device}")
+                        continue
+                yield device if return_objects else item
+
+        if plan.local:
+            yield from plan.local.iter_valid(devices())
+        else:
+            yield from devices()
+
+
     def get_devices(
         self,
         tenants: Usl=None,
@@ -335,35 +1067,44 @@ class AuvikAPI:
         details: bool=False,
         filters: str=None,
         return_objects: bool=True,
-    ) -> ADD:
+        max_workers: int=None,
+        enrichment: str=None,
+        incremental: bool=False,
+        as_table: bool=False,
+        cache_policy: str=None,
+    ) -> Union[ADD, DeviceTable]:
+        plan = self.plan_filters(
+            filters, pushdown=return_objects and not incremental
+        )
         inv_items = self.get_tenant_inventory(tenants=tenants,
-                                              tenant_ids=tenant_ids)
-        self.log.info(f"Processing {len(inv_items)} devices")
+                                              tenant_ids=tenant_ids,
+                                              incremental=incremental,
+                                              server_filters=plan.params,
+                                              cache_policy=cache_policy)
+        num_items = len(inv_items)
+        self.log.info(f"Processing {num_items} devices")
+        if details:
+            inv_items = self._enrich(inv_items, tenants, tenant_ids,
+                                     enrichment, max_workers)
         all_devs = []
         with alive_bar(
-            len(inv_items),
+            num_items,
             title='Processing inventory',
             bar='smooth',
         ) as bar:
             for item in inv_items:
-                item = self.get_device_details(item) if details else item
                 if return_objects:
-                    if details:
-                        device = AuvikDeviceData(**item)
-                    else:
-                        device = AuvikDeviceData(item)
+                    device = self._to_device(item)
                 else:
                     device = item
                 all_devs.append(device)
                 bar()
-        if self.device_filters:
-            self.log.debug(f"Global filtering {len(all_devs)} devices")
-            all_devs = self.device_filters.filter_devices(all_devs)
-        if filters:
-            dev_filter = AuvikFilter(filters)
+        if plan.local:
             self.log.debug(f"Local filtering {len(all_devs)} devices")
-            all_devs = dev_filter.filter_devices(all_devs)
+            all_devs = plan.local.filter_devices(all_devs)
         self.log.info(f"Processed {len(all_devs)} devices")
+        if as_table and return_objects:
+            return DeviceTable.from_devices(all_devs)
         return all_devs
 
 
@@ -374,22 +1115,33 @@ class AuvikAPI:
         details: bool=False,
         filters: str=None,
         return_objects: bool=True,
-    ) -> ADD:
+        max_workers: int=None,
+        enrichment: str=None,
+        incremental: bool=False,
+        as_table: bool=False,
+        cache_policy: str=None,
+    ) -> Union[ADD, DeviceTable]:
+        plan = self.plan_filters(
+            filters, pushdown=return_objects and not incremental
+        )
         inv_items = self.get_tenant_inventory(tenants=tenants,
-                                              tenant_ids=tenant_ids)
-        self.log.info(f"Processing {len(inv_items)} network devices")
+                                              tenant_ids=tenant_ids,
+                                              incremental=incremental,
+                                              server_filters=plan.params,
+                                              cache_policy=cache_policy)
+        num_items = len(inv_items)
+        self.log.info(f"Processing {num_items} network devices")
+        if details:
+            inv_items = self._enrich(inv_items, tenants, tenant_ids,
+                                     enrichment, max_workers)
         net_devs = []
         with alive_bar(
-            len(inv_items),
+            num_items,
             title='Processing network devices',
             bar='smooth',
         ) as bar:
             for item in inv_items:
-                if details:
-                    item = self.get_device_details(item)
-                    device = AuvikDeviceData(**item)
-                else:
-                    device = AuvikDeviceData(item)
+                device = self._to_device(item)
                 if device.is_net_device():
                     if return_objects:
                         net_devs.append(device)
@@ -398,14 +1150,12 @@ class AuvikAPI:
                 else:
                     self.log.debug(f"Not a net device {device}")
                 bar()
-        if self.device_filters:
-            self.log.debug(f"Global filtering {len(net_devs)} net devices")
-            net_devs = self.device_filters.filter_devices(net_devs)
-        if filters:
-            dev_filter = AuvikFilter(filters)
+        if plan.local:
             self.log.debug(f"Local filtering {len(net_devs)} net devices")
-            net_devs = dev_filter.filter_devices(net_devs)
+            net_devs = plan.local.filter_devices(net_devs)
         self.log.info(f"Processed {len(net_devs)} net devices")
+        if as_table and return_objects:
+            return DeviceTable.from_devices(net_devs)
         return net_devs
 
 
@@ -415,8 +1165,12 @@ class AuvikAPI:
         tenant_ids: Usl=None,
         filters: str=None,
         return_objects: bool=True,
+        incremental: bool=False,
+        cache_policy: str=None,
     ) -> ADD:
-        nets = self.get_tenant_networks(tenants=tenants, tenant_ids=tenant_ids)
+        nets = self.get_tenant_networks(tenants=tenants, tenant_ids=tenant_ids,
+                                        incremental=incremental,
+                                        cache_policy=cache_policy)
         self.log.info(f"Processing {len(nets)} networks")
         all_nets = []
         with alive_bar(
@@ -435,12 +1189,23 @@ class AuvikAPI:
         return all_nets
 
 
-    def print_table(self, devices: ADD, filters: str=None) -> PrettyTable:
-        self.log.debug(f"print_table with {len(devices)} devices")
-        with alive_bar(len(devices), title='Creating table', bar='smooth') as bar:
-            headers = devices[0]._as_dict().keys()
-            ptable = PrettyTable(field_names=headers)
-            for dev in devices:
-                ptable.add_row(dev._as_dict().values())
-                bar()
-        return print(ptable)
+    def print_table(
+        self,
+        devices: Iterable[Union[AuvikDeviceData, dict]],
+        filters: str=None,
+        columns: List[str]=None,
+        mode: str='table',
+        widths: Dict[str, int]=None,
+        out: IO[str]=None,
+    ) -> int:
+        """ Print devices as rows while they arrive, e.g. from iter_devices.
+        mode is 'table', 'csv' or 'tsv' and columns picks the fields shown.
+        Returns the number of rows printed.
+        """
+        if filters:
+            devices = AuvikFilter(filters).iter_valid(devices)
+        renderer = TableRenderer(columns=columns, mode=mode, widths=widths,
+                                 out=out)
+        count = renderer.render(devices)
+        self.log.debug(f"print_table printed {count} devices")
+        return count
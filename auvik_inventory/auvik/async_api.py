@@ -2,14 +2,12 @@
 # vim: noai:et:tw=80:ts=4:ss=4:sts=4:sw=4:ft=python
 
 """
-Title:              main.py
+Title:              async_api.py
 """
 
-import aiohttp
-from aiohttp import ClientSession, BasicAuth
-from alive_progress import alive_bar
-import base64
-from datetime import datetime
+import asyncio
+from collections import deque
+import logging
 import os
 import ssl
 from typing import (
@@ -19,12 +17,21 @@ from typing import (
     Optional,
 )
 # Mylibs
+from src.auvik.data import AuvikDeviceData, AuvikTenantData, AuvikNetworkData
+from src.auvik.decoder import loads
+from src.auvik.filters import AuvikFilter
+from src.auvik.progress import alive_bar
+from src.auvik.ratelimit import RequestScheduler
 from src.auvik.spec import AuvikSpec
+from src.auvik.tenants import TenantDirectory
 from src.exceptions import IEAutomationError, IEAutomationSSLError
 
 # Typing shortcuts
 UdLd = Union[dict, List[dict]]
 UsP = Union[str, os.PathLike]
+ADD = List[Union[AuvikDeviceData, dict]]
+ATD = List[AuvikTenantData]
+Usl = Union[str, list]
 
 default_url = "https://auvikapi.us1.my.auvik.com/v1"
 BASE_URL = os.getenv("AUVIK_API_URL")
@@ -36,76 +43,103 @@ SSL_CERT = os.getenv("AUVIK_API_SSL_CERT")
 HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 ROOT = os.path.dirname(HERE)
 
+__all__ = ['AuvikAPI']
 
 
-# async def get_book_details_async(isbn, session):
-#     """Get book details using Google Books API (asynchronously)"""
-#     url = GOOGLE_BOOKS_URL + isbn
-#     try:
-#         response = await session.request(method='GET', url=url)
-#         response.raise_for_status()
-#         print(f"Response status ({url}): {response.status}")
-#     except HTTPError as http_err:
-#         print(f"HTTP error occurred: {http_err}")
-#     except Exception as err:
-#         print(f"An error ocurred: {err}")
-#     response_json = await response.json()
-#     return response_json
-#
-#
-# async def run_program(isbn, session):
-#     """Wrapper for running program in an asynchronous manner"""
-#     try:
-#         response = await get_book_details_async(isbn, session)
-#         parsed_response = extract_fields_from_response(response)
-#         print(f"Response: {json.dumps(parsed_response, indent=2)}")
-#     except Exception as err:
-#         print(f"Exception occured: {err}")
-#         pass
-#
-# async with ClientSession() as session:
-#     await asyncio.gather(*[run_program(isbn, session) for isbn in LIST_ISBN])
-import aiohttp
-import asyncio
-
-async def fetch(client):
-    async with client.get('http://python.org') as resp:
-        assert resp.status == 200
-        return await resp.text()
+class AuvikAPI:
+    """ Asyncio entry point for the Auvik API
 
-async def main():
-    async with aiohttp.ClientSession() as client:
-        html = await fetch(client)
-        print(html)
+    Mirrors the synchronous AuvikAPI but every call is a coroutine.  A single
+    ClientSession is shared by all requests and per-device lookups are fanned
+    out in a bounded window.  Use it as an async context manager:
 
-loop = asyncio.get_event_loop()
-loop.run_until_complete(main())
+        async with AuvikAPI() as api:
+            devices = await api.get_devices(tenants=['domain1'], details=True)
 
-class AuvikAPI:
-    """ Main entry point for the Auvik API
+    The tenants and tenant_directory properties of the synchronous client
+    need a request on first use, so here they are the get_tenants() and
+    get_tenant_directory() coroutines.
     """
+    # Number of devices enriched concurrently when details are requested
+    DEFAULT_MAX_WORKERS = 32
+    # 'device' looks up each device, 'bulk' crawls the collection endpoints
+    DEFAULT_ENRICHMENT = 'device'
+
     def __init__(self,
             user: str=None,
             api_key: str=None,
             ssl_cert: UsP=None,
-            timeout: int=15) -> None:
+            domain: str=None,
+            timeout: int=15,
+            max_workers: int=None,
+            rate_limit: float=None,
+            max_retries: int=None,
+            enrichment: str=None,
+            lazy_devices: bool=False,
+            domain_filters: Usl=None,
+            device_filters: Usl=None,
+            show_progress: bool=False) -> None:
+        # aiohttp is only imported once an async client is created
+        from aiohttp import BasicAuth, ClientTimeout
+        self.log = logging.getLogger('auvik.async_api')
         self.spec = AuvikSpec()
         self.base_url = BASE_URL or self.spec.server_url
         self.url = None
+        self.domain = domain or DOMAIN
         self._user = user or USER
         self._api_key = api_key or API_KEY
         self.auth = BasicAuth(self._user, self._api_key)
-        self._cert = os.path.join(ROOT, f"ssl/{ssl_cert or SSL_CERT}")
+        self._cert = os.path.join(HERE, f"ssl/{ssl_cert or SSL_CERT}")
         if os.path.isfile(self._cert):
             self.ssl = ssl.create_default_context(cafile=self._cert)
         else:
-            raise IEAutomationError(f"You MUST use SSL encryption!")
-            # self.ssl = False
-            # Disable warnings
-            # requests.packages.urllib3.disable_warnings()
-        self._timeout = timeout
-        self.loop = asyncio.get_event_loop()
-        self.session = ClientSession(auth=self.auth)
+            raise IEAutomationSSLError(f"You MUST use SSL encryption!")
+        self._timeout = ClientTimeout(total=timeout)
+        self.max_workers = max_workers or self.DEFAULT_MAX_WORKERS
+        self.enrichment = enrichment or self.DEFAULT_ENRICHMENT
+        self.lazy_devices = lazy_devices
+        self.scheduler = RequestScheduler(rate=rate_limit,
+                                          max_retries=max_retries)
+        self.domain_filters = domain_filters
+        self.device_filters = AuvikFilter(device_filters) \
+            if device_filters else None
+        self.show_progress = show_progress
+        self.session = None
+        self._tenants = None
+        self._tenant_directory = None
+        # Created inside the running loop, see _tenants_lock()
+        self._tenants_lock_loop = None
+        self._tenants_lock_obj = None
+
+
+    async def __aenter__(self) -> 'AuvikAPI':
+        await self.open()
+        return self
+
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+    async def open(self) -> None:
+        """ Open the shared ClientSession if not already open.
+        """
+        if self.session is None or self.session.closed:
+            from aiohttp import ClientSession, TCPConnector
+            connector = TCPConnector(limit=self.max_workers, ssl=self.ssl)
+            self.session = ClientSession(
+                auth=self.auth,
+                connector=connector,
+                timeout=self._timeout,
+            )
+
+
+    async def close(self) -> None:
+        """ Close the shared ClientSession and its connections.
+        """
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
 
 
     def _add_to_base_url(self, path: str) -> str:
@@ -114,100 +148,246 @@ class AuvikAPI:
         return f"{self.base_url}{path}"
 
 
-    def _set_url(self, url: str) -> None:
+    def _set_url(self, url: str) -> str:
         if url.startswith(self.base_url):
             self.url = url
         else:
             self.url = self._add_to_base_url(url)
+        return self.url
+
 
+    def _join_things(self, things: Usl) -> str:
+        if isinstance(things, list):
+            # Ensure no duplicates here but keep the order
+            return ','.join(dict.fromkeys(things))
+        return things
 
-    async def _async_get(self) -> UdLd:
+
+    async def _async_get(self, url: str) -> dict:
         """ Private method that performs specialized async GET operations.
+        Requests are paced by the scheduler and throttled or failed
+        requests are retried with backoff while the retry budget allows.
         """
-        async with self.session as session:
-            async with session.get(self.url, ssl=self.ssl) as response:
-                return await response.json()
+        import aiohttp
+        await self.open()
+        self.log.debug(f"_async_get called for -> {url}")
+        attempt = 0
+        while True:
+            await self.scheduler.wait_async()
+            status = retry_after = None
+            try:
+                async with self.session.get(url) as response:
+                    if response.status < 400:
+                        self.scheduler.success(response.headers)
+                        # Auvik answers with application/vnd.api+json
+                        return await response.json(content_type=None,
+                                                   loads=loads)
+                    status = response.status
+                    retry_after = response.headers.get('Retry-After')
+                    error = f"HTTP error code: {status} for {url}"
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = f"Connection error: {e!r} for {url}"
+            delay = self.scheduler.retry_delay(status, attempt, retry_after)
+            if delay is None:
+                raise IEAutomationError(error)
+            await asyncio.sleep(delay)
+            attempt += 1
 
 
     async def _get(self, url: str=None, *, return_data: bool=True, recurse: bool=False) -> UdLd:
         if not url and not self.url:
             raise IEAutomationError(f"No URL provided nor set via attribute")
-        if url:
-            self._set_url(url)
+        # Keep a local copy of the url as many requests run concurrently
+        url = self._set_url(url) if url else self.url
         if recurse:
-            return await self._get_recursive()
-        results = await self._async_get()
-        if results:
-            return results['data'] if return_data else results
-        else:
-            raise IEAutomationError(f"HTTP error code: {results}")
+            return await self._get_recursive(url)
+        results = await self._async_get(url)
+        return results['data'] if return_data else results
 
 
-    async def _get_recursive(self) -> UdLd:
+    async def _get_recursive(self, url: str=None) -> UdLd:
         """ Private method recursive GET operation.
         This is called by using the _get() method with recurse=True.
         """
-        results = await self._get(return_data=False)
+        results = await self._get(url, return_data=False)
         data = results['data']
-        counter = 1
-        no_pages = results['meta']['totalPages']
-        pages_left = int(no_pages) - counter
+        try:
+            pages_left = int(results['meta']['totalPages']) - 1
+        except KeyError:
+            return data
         # Go get results and extend data (an iteration)
-        with alive_bar(pages_left, bar='smooth') as bar:
+        with alive_bar(pages_left, bar='smooth',
+                       disable=not self.show_progress) as bar:
             # Now check for a 'next' link and recurse if found
             while 'next' in results['links'].keys():
-                self.url = results['links']['next']
-                results = await self._get(return_data=False)
+                results = await self._get(results['links']['next'],
+                                          return_data=False)
                 data.extend(results['data'])
-                counter += 1
                 bar()
         # No more 'next' links return data
         return data
 
 
-    async def get_tenants(self) -> Dict:
-        """ Get a list of tenants for your default domain.
+    async def _fetch_tenants(self) -> List[dict]:
+        """ Get a list of raw tenants for your default domain.
         """
         url_path = "/tenants"
         return await self._get(url_path)
 
 
-    async def get_tenant_id_by_name(self, name: str) -> str:
-        """ Get the id of tenant by name. Uses 'name' in 'actual_name_from_API'.
+    def _tenants_lock(self) -> asyncio.Lock:
+        """ Lock bound to the running loop.
+        Before Python 3.10 asyncio primitives bind to the loop current when
+        they are created, so they can not be made in __init__ when the
+        client is used under asyncio.run().
         """
-        for tenant in self.get_tenants():
-            if name in tenant['attributes']['domainPrefix']:
-                return tenant['id']
+        loop = asyncio.get_running_loop()
+        if self._tenants_lock_loop is not loop:
+            self._tenants_lock_obj = asyncio.Lock()
+            self._tenants_lock_loop = loop
+        return self._tenants_lock_obj
 
 
-    async def get_tenant_detail(self, domain: str=DOMAIN, name: str=None, tenant_id: str=None) -> Dict:
+    async def get_tenants(self) -> ATD:
+        """ Get a cached list of tenants for your default domain, like the
+        tenants property of the synchronous client.
+        """
+        async with self._tenants_lock():
+            if self._tenants is None:
+                self._tenants = [AuvikTenantData.intern(t) for t in
+                                 await self._fetch_tenants()]
+                self._tenant_directory = TenantDirectory(self._tenants)
+                self.log.debug(f"{len(self._tenants)} tenants found")
+        return self._tenants
+
+
+    async def get_tenant_directory(self) -> TenantDirectory:
+        """ Indexed tenants, like the tenant_directory property of the
+        synchronous client.
+        """
+        await self.get_tenants()
+        return self._tenant_directory
+
+
+    async def get_tenant_id_by_name(self, name: str) -> Optional[str]:
+        """ Get the id of tenant by name (or id).
+        Exact domains win over prefixes, which win over 'name' in domain.
+        """
+        ids = (await self.get_tenant_directory()).resolve(name)
+        return ids[0] if ids else None
+
+
+    async def get_tenant_detail(self, domain: str=None, name: str=None, tenant_id: str=None) -> Dict:
         """ Get details for a tenant.
         """
+        if not domain:
+            domain = self.domain
         if name is None and tenant_id is None:
-            raise AuvikAPIError("Provide either name or id of the tenant")
+            raise IEAutomationError("Provide either name or id of the tenant")
         elif name and not tenant_id:
-            tenant_id = get_tenant_id_by_name(name)
+            tenant_id = await self.get_tenant_id_by_name(name)
         url_path = f"/tenants/detail/{tenant_id}?tenantDomainPrefix={domain}"
         return await self._get(url_path)
 
 
-    async def get_tenant_inventory(self, tenant_ids: Union[str, list], recurse: bool=False) -> Dict:
-        """ Get a list of network devices from one or more tenant ids.
+    async def resolve_tenant_ids(self, tenants: Usl=None,
+                                 tenant_ids: Usl=None,
+                                 strict: bool=False) -> List[str]:
+        """ Resolve tenant names (or ids) to a list of unique tenant ids.
+        With strict=True every name must resolve, see
+        TenantDirectory.resolve_all.
+        """
+        # Tenant_ids take precedence and are used as-is
+        if tenant_ids:
+            if isinstance(tenant_ids, str):
+                tenant_ids = tenant_ids.split(',')
+            return list(dict.fromkeys(tenant_ids))
+        elif tenants:
+            names = tenants
+        elif self.domain_filters:
+            names = self.domain_filters
+        else:
+            raise IEAutomationError(
+                "Must provide tenants, tenant_ids, or domain filters"
+            )
+        if isinstance(names, str):
+            names = [names]
+        directory = await self.get_tenant_directory()
+        return directory.resolve_all(names, strict=strict)
+
+
+    async def generate_query(self, tenants: Usl=None, tenant_ids: Usl=None,
+                             strict: bool=False) -> str:
+        ids = await self.resolve_tenant_ids(tenants, tenant_ids, strict)
+        self.log.debug(f"Generated query for {len(ids)} tenants")
+        return self._join_things(ids)
+
+
+    async def get_tenant_inventory(self, tenants: Usl=None, tenant_ids: Usl=None,
+                                   recurse: bool=True) -> List[dict]:
+        """ Get a list of inventory from one or more tenant ids.
+        """
+        query = await self.generate_query(tenants, tenant_ids)
+        url_path = f"/inventory/device/info?tenants={query}"
+        return await self._get(url_path, recurse=recurse)
+
+
+    async def get_tenant_networks(self, tenants: Usl=None, tenant_ids: Usl=None,
+                                  recurse: bool=True) -> List[dict]:
+        """ Get a list of networks from one or more tenant ids.
+        """
+        query = await self.generate_query(tenants, tenant_ids)
+        url_path = f"/inventory/network/info?tenants={query}"
+        return await self._get(url_path, recurse=recurse)
+
+
+    async def get_tenant_configs(self, tenants: Usl=None, tenant_ids: Usl=None,
+                                 recurse: bool=True) -> List[dict]:
+        """ Get a list of configs from one or more tenant ids.
+        """
+        query = await self.generate_query(tenants, tenant_ids)
+        url_path = f"/inventory/configuration/info?tenants={query}"
+        return await self._get(url_path, recurse=recurse)
+
+
+    async def get_tenant_device_details(self, tenants: Usl=None,
+                                        tenant_ids: Usl=None,
+                                        recurse: bool=True) -> List[dict]:
+        """ Get a list of device details from one or more tenant ids.
         """
-        tenants = [','.join(t) for t in tenant_ids] \
-            if isinstance(tenant_ids, list) else tenant_ids
-        url_path = f"/inventory/device/info?tenants={tenants}"
+        query = await self.generate_query(tenants, tenant_ids)
+        url_path = f"/inventory/device/detail?tenants={query}"
         return await self._get(url_path, recurse=recurse)
 
 
-    async def get_device_info(self, device_id: str, detail: bool=False, fields: Union[str, list]=None) -> Dict:
+    async def get_tenant_device_warranties(self, tenants: Usl=None,
+                                           tenant_ids: Usl=None,
+                                           recurse: bool=True) -> List[dict]:
+        """ Get a list of device warranties from one or more tenant ids.
+        """
+        query = await self.generate_query(tenants, tenant_ids)
+        url_path = f"/inventory/device/warranty?tenants={query}"
+        return await self._get(url_path, recurse=recurse)
+
+
+    async def get_tenant_device_lifecycles(self, tenants: Usl=None,
+                                           tenant_ids: Usl=None,
+                                           recurse: bool=True) -> List[dict]:
+        """ Get a list of device lifecycles from one or more tenant ids.
+        """
+        query = await self.generate_query(tenants, tenant_ids)
+        url_path = f"/inventory/device/lifecycle?tenants={query}"
+        return await self._get(url_path, recurse=recurse)
+
+
+    async def get_device_info(self, device_id: str, detail: bool=False, fields: Usl=None) -> Dict:
         """ Get general info about a device.
         """
         url_path = f"/inventory/device/info/{device_id}"
         if detail:
             url_path = f"{url_path}?include=deviceDetail"
             if fields:
-                include = [','.join(f) for f in fields] if isinstance(fields, list) else fields
+                include = self._join_things(fields)
                 url_path = f"{url_path}&fields[deviceDetail]={include}"
         return await self._get(url_path)
 
@@ -226,15 +406,198 @@ class AuvikAPI:
         return await self._get(url_path)
 
 
-    async def get_device_warranty_info(self, device_id: str) -> Dict:
-        """ Get extended details about a device.
+    async def get_device_warranty(self, device_id: str) -> Dict:
+        """ Get warranty details about a device.
         """
         url_path = f"/inventory/device/warranty/{device_id}"
         return await self._get(url_path)
 
 
-    async def get_device_lifecycle_info(self, device_id: str) -> Dict:
-        """ Get extended details about a device.
+    async def get_device_lifecycle(self, device_id: str) -> Dict:
+        """ Get lifecycle details about a device.
         """
         url_path = f"/inventory/device/lifecycle/{device_id}"
         return await self._get(url_path)
+
+
+    async def get_device_details(self, item: dict) -> dict:
+        """ Get detail, warranty and lifecycle data for an inventory item.
+        The three lookups run together and each one fails on its own.
+        """
+        details, warranty, lifecycle = await asyncio.gather(
+            self.get_device_detail(item['id']),
+            self.get_device_warranty(item['id']),
+            self.get_device_lifecycle(item['id']),
+            return_exceptions=True,
+        )
+        results = {
+            "item": item,
+            "details": details,
+            "warranty": warranty,
+            "lifecycle": lifecycle,
+        }
+        for key in ("details", "warranty", "lifecycle"):
+            if isinstance(results[key], Exception):
+                self.log.debug(f"Failed {key}_info with {results[key]}")
+                results[key] = None
+        return results
+
+
+    async def enrich_devices(self, items: List[dict],
+                             max_workers: int=None) -> List[dict]:
+        """ Get details for many inventory items at once.
+        At most max_workers devices are looked up at the same time and the
+        results keep the same order as items.  Like the synchronous client
+        only a bounded window of lookups is scheduled at once.
+        """
+        workers = max_workers or self.max_workers
+        self.log.debug(f"Enriching {len(items)} devices with {workers} workers")
+        results = []
+        # Keep a bounded window of pending lookups in submission order
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(asyncio.ensure_future(
+                    self.get_device_details(item)
+                ))
+                if len(pending) >= workers:
+                    results.append(await pending.popleft())
+            while pending:
+                results.append(await pending.popleft())
+        finally:
+            for task in pending:
+                task.cancel()
+        return results
+
+
+    async def bulk_enrich_devices(self, items: List[dict], tenants: Usl=None,
+                                  tenant_ids: Usl=None) -> List[dict]:
+        """ Get details for many inventory items from the collection endpoints.
+        The detail, warranty and lifecycle collections are crawled together
+        and joined onto the items by device id.
+        """
+        keys = ("details", "warranty", "lifecycle")
+        collections = await asyncio.gather(
+            self.get_tenant_device_details(tenants, tenant_ids),
+            self.get_tenant_device_warranties(tenants, tenant_ids),
+            self.get_tenant_device_lifecycles(tenants, tenant_ids),
+            return_exceptions=True,
+        )
+        lookups = {}
+        for key, collection in zip(keys, collections):
+            if isinstance(collection, Exception):
+                self.log.debug(f"Failed bulk {key} with {collection}")
+                collection = []
+            lookups[key] = {d['id']: d for d in collection}
+        return [{
+            "item": item,
+            "details": lookups["details"].get(item['id']),
+            "warranty": lookups["warranty"].get(item['id']),
+            "lifecycle": lookups["lifecycle"].get(item['id']),
+        } for item in items]
+
+
+    async def _enrich(self, items: List[dict], tenants: Usl=None,
+                      tenant_ids: Usl=None, enrichment: str=None,
+                      max_workers: int=None) -> List[dict]:
+        """ Dispatch to the configured enrichment mode.
+        """
+        enrichment = enrichment or self.enrichment
+        if enrichment == 'bulk':
+            return await self.bulk_enrich_devices(items, tenants, tenant_ids)
+        elif enrichment == 'device':
+            return await self.enrich_devices(items, max_workers)
+        raise IEAutomationError(f"Invalid enrichment mode: {enrichment}")
+
+
+    def _to_device(self, item: dict) -> AuvikDeviceData:
+        """ Build device data from an inventory item or enriched item.
+        """
+        if 'item' in item.keys():
+            return AuvikDeviceData(
+                item['item'],
+                details=item['details'],
+                warranty=item['warranty'],
+                lifecycle=item['lifecycle'],
+                lazy=self.lazy_devices,
+            )
+        return AuvikDeviceData(item, lazy=self.lazy_devices)
+
+
+    def _filter_devices(self, devices: ADD, filters: str=None) -> ADD:
+        if self.device_filters:
+            self.log.debug(f"Global filtering {len(devices)} devices")
+            devices = self.device_filters.filter_devices(devices)
+        if filters:
+            dev_filter = AuvikFilter(filters)
+            self.log.debug(f"Local filtering {len(devices)} devices")
+            devices = dev_filter.filter_devices(devices)
+        return devices
+
+
+    async def get_devices(
+        self,
+        tenants: Usl=None,
+        tenant_ids: Usl=None,
+        details: bool=False,
+        filters: str=None,
+        return_objects: bool=True,
+        max_workers: int=None,
+        enrichment: str=None,
+    ) -> ADD:
+        inv_items = await self.get_tenant_inventory(tenants=tenants,
+                                                    tenant_ids=tenant_ids)
+        self.log.info(f"Processing {len(inv_items)} devices")
+        if details:
+            inv_items = await self._enrich(inv_items, tenants, tenant_ids,
+                                           enrichment, max_workers)
+        if return_objects:
+            all_devs = [self._to_device(item) for item in inv_items]
+        else:
+            all_devs = inv_items
+        all_devs = self._filter_devices(all_devs, filters)
+        self.log.info(f"Processed {len(all_devs)} devices")
+        return all_devs
+
+
+    async def get_net_devices(
+        self,
+        tenants: Usl=None,
+        tenant_ids: Usl=None,
+        details: bool=False,
+        filters: str=None,
+        return_objects: bool=True,
+        max_workers: int=None,
+        enrichment: str=None,
+    ) -> ADD:
+        inv_items = await self.get_tenant_inventory(tenants=tenants,
+                                                    tenant_ids=tenant_ids)
+        self.log.info(f"Processing {len(inv_items)} network devices")
+        if details:
+            inv_items = await self._enrich(inv_items, tenants, tenant_ids,
+                                           enrichment, max_workers)
+        net_devs = []
+        for item in inv_items:
+            device = self._to_device(item)
+            if device.is_net_device():
+                net_devs.append(device if return_objects else item)
+            else:
+                self.log.debug(f"Not a net device {device}")
+        net_devs = self._filter_devices(net_devs, filters)
+        self.log.info(f"Processed {len(net_devs)} net devices")
+        return net_devs
+
+
+    async def get_networks(
+        self,
+        tenants: Usl=None,
+        tenant_ids: Usl=None,
+        filters: str=None,
+        return_objects: bool=True,
+    ) -> ADD:
+        nets = await self.get_tenant_networks(tenants=tenants,
+                                              tenant_ids=tenant_ids)
+        self.log.info(f"Processing {len(nets)} networks")
+        if return_objects:
+            return [AuvikNetworkData(net) for net in nets]
+        return nets
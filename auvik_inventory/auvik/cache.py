@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# vim: noai:et:tw=80:ts=4:ss=4:sts=4:sw=4:ft=python
+
+'''
+Title:              cache.py
+Description:        Persistent HTTP response cache for AuvikAPI
+Author:             Ricky Laney
+Version:            0.1.0
+'''
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import (
+    Callable,
+    Dict,
+    Optional,
+    Union,
+)
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Typing shortcuts
+UsP = Union[str, os.PathLike]
+
+__all__ = ['AuvikResponseCache']
+
+
+class AuvikResponseCache:
+    """ SQLite backed cache of raw API response bodies.
+
+    Entries are keyed by the normalized URL (and namespace, normally the API
+    user) and expire after a TTL picked by the longest matching path in ttls.
+    A TTL of 0 disables caching for that path.  A running total of the
+    stored bodies is kept, and once it grows past max_size bytes expired and
+    then least recently used entries are evicted down to EVICT_TO of
+    max_size, so eviction runs now and then rather than on every write.
+
+    :param:str: cache_file = SQLite database file.
+    :param:int: ttl = default time to live in seconds.
+    :param:dict: ttls = time to live in seconds by URL path.
+    :param:int: max_size = maximum size of stored bodies in bytes.
+    :param:str: namespace = keeps entries of different users apart.
+    :param:callable: clock = epoch seconds, swapped out by the tests.
+    """
+    DEFAULT_TTL = 300
+    DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+    # Share of max_size left after an eviction
+    EVICT_TO = 0.9
+
+    def __init__(self, cache_file: UsP, ttl: int=None,
+                 ttls: Dict[str, int]=None, max_size: int=None,
+                 namespace: str='',
+                 clock: Callable[[], float]=time.time) -> None:
+        self.cache_file = cache_file
+        self.ttl = self.DEFAULT_TTL if ttl is None else ttl
+        # Longest paths first so the most specific TTL wins
+        self.ttls = sorted((ttls or {}).items(), key=lambda t: -len(t[0]))
+        self.max_size = max_size or self.DEFAULT_MAX_SIZE
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(cache_file))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(cache_file, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, url TEXT, body BLOB, size INTEGER, "
+            "expires REAL, accessed REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed "
+            "ON responses (accessed)"
+        )
+        self._size = self._total_size()
+
+    @staticmethod
+    def normalize(url: str) -> str:
+        """ Normalize a URL so equivalent requests share an entry.
+        """
+        parts = urlsplit(url)
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)),
+                          safe='[],')
+        path = parts.path.rstrip('/') or '/'
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(),
+                           path, query, ''))
+
+    def _key(self, url: str) -> str:
+        key = f"{self.namespace}|{self.normalize(url)}"
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def ttl_for(self, url: str) -> int:
+        path = urlsplit(url).path
+        for prefix, ttl in self.ttls:
+            if path.startswith(prefix):
+                return ttl
+        return self.ttl
+
+    def get(self, url: str) -> Optional[bytes]:
+        """ Get a cached body or None if missing or expired.
+        """
+        key = self._key(url)
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, expires, size FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute(
+                        "DELETE FROM responses WHERE key = ?", (key,)
+                    )
+                    self._size -= row[2]
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            return row[0]
+
+    def set(self, url: str, body: bytes) -> None:
+        """ Store a body and evict old entries if over max_size.
+        """
+        ttl = self.ttl_for(url)
+        if ttl <= 0:
+            return
+        key = self._key(url)
+        now = self._clock()
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, url, body, size, expires, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, body, len(body), now + ttl, now),
+            )
+            self._size += len(body) - (old[0] if old else 0)
+            if self._size > self.max_size:
+                self._evict()
+
+    def _total_size(self) -> int:
+        return self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def _evict(self) -> None:
+        # Other processes sharing the file may have changed it
+        self._size = self._total_size()
+        if self._size <= self.max_size:
+            return
+        # Expired entries go first, then the least recently used
+        self._conn.execute(
+            "DELETE FROM responses WHERE expires < ?", (self._clock(),)
+        )
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed DESC"
+        ).fetchall()
+        limit = self.max_size * self.EVICT_TO
+        keep = 0
+        evict = []
+        for key, entry_size in rows:
+            if evict or keep + entry_size > limit:
+                evict.append((key,))
+            else:
+                keep += entry_size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evict)
+        self._size = keep
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._size = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "size": size,
+        }
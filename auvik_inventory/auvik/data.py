@@ -4,9 +4,10 @@
 """
 Title:              data.py
 """
-import jsonpickle
 import os
-from sysdescrparser import sysdescrparser
+from sys import intern
+import threading
+import weakref
 from typing import (
     Union,
     Any,
@@ -15,6 +16,7 @@ from typing import (
     Optional,
     Iterable,
 )
+from src.auvik.sysdescr import SysDescr, sysdescr_cache
 from src.auvik.constants import (
     AUVIK_NET_DEVICE_TYPES,
     NETWORK_TYPES,
@@ -36,14 +38,104 @@ __all__ = [
     'AuvikNetworkData',
 ]
 
+# Returned by getattr() for slots that were never set
+_UNSET = object()
+
+
+def _shared(value: Any) -> Any:
+    """ Intern strings repeated across devices so they share one copy.
+    """
+    return intern(value) if isinstance(value, str) else value
+
+
+class _derived:
+    """ Device field computed on first access and cached in '_<name>'.
+    loader names the method that computes (and sets) the field.
+    """
+
+    def __init__(self, loader: str) -> None:
+        self.loader = loader
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.slot = f"_{name}"
+        # Every derived slot of owner, so they can be cleared together
+        owner._derived_slots = getattr(owner, '_derived_slots', ()) + \
+            (self.slot,)
+
+    def __get__(self, obj: object, objtype: type=None) -> Any:
+        if obj is None:
+            return self
+        try:
+            return getattr(obj, self.slot)
+        except AttributeError:
+            getattr(obj, self.loader)()
+            return getattr(obj, self.slot)
+
+    def __set__(self, obj: object, value: Any) -> None:
+        setattr(obj, self.slot, value)
+
 
 class AuvikDeviceData:
     """ Used to store device data from AuvikAPI.
     Will raise exception if NOT device data.
-    Loads and processes data during initialization.
+    Loads and processes data during initialization.  With lazy=True the
+    derived fields (os, model, version, nd_type, last_seen and
+    last_modified) are only computed on first access.
 
     :param:dict:   data - dictionary from AuvikAPI
+    :param:bool:   lazy - defer parsing of the derived fields
     """
+    # Fields in the order _as_dict() reports them.  Detail, warranty and
+    # lifecycle fields are only reported when that data is loaded.
+    _FIELDS = (
+        'name', 'ip', 'os', 'model', 'version', 'tenant', 'nd_type',
+        '_id', 'ips', 'device_type', 'make', 'vendor', 'software', 'serial',
+        'description', 'firmware', 'status', 'last_seen', 'last_modified',
+        # Details data
+        'snmp_status', 'login_status', 'wmi_status', 'vmware_status',
+        'manage_status', 'netflow_status', 'connected_devices', 'interfaces',
+        'config_backup', 'last_backup',
+        # Warranty data
+        'service_coverage', 'service_attachment', 'contract_renewal',
+        'warranty_coverage', 'warranty_expiration', 'recommended_software',
+        # Lifecycle data
+        'sales_availability', 'software_maintenance',
+        'security_software_maintenance', 'last_support',
+    )
+    # Slots keep large inventories compact.  Derived fields are stored in
+    # '_<name>' slots behind the _derived descriptors below and _raw keeps
+    # the raw timestamps until they are formatted.
+    __slots__ = (
+        'name', 'ip', '_os', '_model', '_version', 'tenant', '_nd_type',
+        '_id', 'ips', 'device_type', 'make', 'vendor', 'software', 'serial',
+        'description', 'firmware', 'status', '_last_seen', '_last_modified',
+        '_raw',
+        # Details data
+        'snmp_status', 'login_status', 'wmi_status', 'vmware_status',
+        'manage_status', 'netflow_status', 'connected_devices', 'interfaces',
+        'config_backup', 'last_backup',
+        # Warranty data
+        'service_coverage', 'service_attachment', 'contract_renewal',
+        'warranty_coverage', 'warranty_expiration', 'recommended_software',
+        # Lifecycle data
+        'sales_availability', 'software_maintenance',
+        'security_software_maintenance', 'last_support',
+    )
+
+    # Fields each derived field is computed from
+    _DERIVED_FROM = {
+        'os': ('description',),
+        'model': ('description',),
+        'version': ('description',),
+        'nd_type': ('os', 'description', 'device_type', 'name'),
+    }
+
+    os = _derived('_load_sysdescr')
+    model = _derived('_load_sysdescr')
+    version = _derived('_load_sysdescr')
+    nd_type = _derived('_load_nd_type')
+    last_seen = _derived('_load_last_seen')
+    last_modified = _derived('_load_last_modified')
 
     def __init__(
             self,
@@ -51,17 +143,14 @@ class AuvikDeviceData:
             details: dict=None,
             warranty: dict=None,
             lifecycle: dict=None,
+            lazy: bool=False,
         ) -> None:
         if data['type'] != 'device':
             raise IEAutomationAuvikDeviceDataError(f"Invalid type: {data['type']}'")
         self.name = None
         self.ip = None
-        self.os = None
-        self.model = None
-        self.version = None
         self.tenant = None
-        self.nd_type = None
-        self.load(data)
+        self.load(data, lazy=lazy)
         # Details data
         if details:
             self.snmp_status = None
@@ -92,34 +181,94 @@ class AuvikDeviceData:
             self.last_support = None
             self.load_lifecycle(lifecycle)
 
+    @classmethod
+    def from_fields(cls, **fields) -> 'AuvikDeviceData':
+        """ Build device data from already processed field values.
+        Used to rebuild devices from other containers such as a DeviceTable.
+        """
+        device = cls.__new__(cls)
+        for key, val in fields.items():
+            if isinstance(val, tuple):
+                val = list(val)
+            setattr(device, key, val)
+        return device
+
     def __str__(self):
         return f"{self.name},{self.ip},{self.os},{self.nd_type}"
 
     def __repr__(self):
         return f"<AuvikDeviceData[name={self.name}, ip={self.ip}]>"
 
-    def load(self, data: dict) -> None:
+    def load(self, data: dict, lazy: bool=False) -> None:
+        # Derived from the previous data when loaded again
+        for slot in self._derived_slots:
+            if getattr(self, slot, _UNSET) is not _UNSET:
+                delattr(self, slot)
         self._id = data['id']
         self.ips = data['attributes']['ipAddresses']
         self.name = data['attributes']['deviceName']
-        self.device_type = data['attributes']['deviceType']
-        self.make = data['attributes']['makeModel']
-        self.vendor = data['attributes']['vendorName']
-        self.software = data['attributes']['softwareVersion']
+        self.device_type = _shared(data['attributes']['deviceType'])
+        self.make = _shared(data['attributes']['makeModel'])
+        self.vendor = _shared(data['attributes']['vendorName'])
+        self.software = _shared(data['attributes']['softwareVersion'])
         self.serial = data['attributes']['serialNumber']
-        self.description = data['attributes']['description']
-        self.firmware = data['attributes']['firmwareVersion']
-        self.status = data['attributes']['onlineStatus']
-        self.last_seen = time_formatter(data['attributes']['lastSeenTime'])
-        self.last_modified = time_formatter(data['attributes']['lastModified'])
-        sys = sysdescrparser(self.description)
-        self.os = sys.os
-        self.model = sys.model
-        self.version = sys.version
-        self.tenant = AuvikTenantData(data['relationships']['tenant']['data'])
+        self.description = _shared(data['attributes']['description'])
+        self.firmware = _shared(data['attributes']['firmwareVersion'])
+        self.status = _shared(data['attributes']['onlineStatus'])
+        self._raw = (
+            data['attributes']['lastSeenTime'],
+            data['attributes']['lastModified'],
+        )
+        self.tenant = AuvikTenantData.intern(
+            data['relationships']['tenant']['data']
+        )
         self.process_ip()
+        if not lazy:
+            self._load_sysdescr()
+            self._load_last_seen()
+            self._load_last_modified()
+            self._load_nd_type()
+            del self._raw
+
+    def _clear_derived(self, changed: Iterable[str]) -> None:
+        """ Forget derived fields computed from any of the changed fields,
+        so they are derived again from the new values on next read.  Changed
+        fields themselves are kept.
+        """
+        changed = set(changed)
+        for field, inputs in self._DERIVED_FROM.items():
+            if field in changed or changed.isdisjoint(inputs):
+                continue
+            slot = f"_{field}"
+            if getattr(self, slot, _UNSET) is not _UNSET:
+                delattr(self, slot)
+
+    def _sysdescr(self) -> Optional[SysDescr]:
+        description = getattr(self, 'description', None)
+        if description is None:
+            return None
+        return sysdescr_cache.classify(description)
+
+    def _load_sysdescr(self) -> None:
+        sys = self._sysdescr()
+        parsed = (sys.os, sys.model, sys.version) if sys else (None,) * 3
+        for slot, value in zip(('_os', '_model', '_version'), parsed):
+            # Keep fields set before the first read, e.g. by an override
+            if getattr(self, slot, _UNSET) is _UNSET:
+                setattr(self, slot, value)
+
+    def _load_nd_type(self) -> None:
+        self._nd_type = None
         self.process_nd_type()
 
+    def _load_last_seen(self) -> None:
+        raw = getattr(self, '_raw', None)
+        self._last_seen = time_formatter(raw[0]) if raw else None
+
+    def _load_last_modified(self) -> None:
+        raw = getattr(self, '_raw', None)
+        self._last_modified = time_formatter(raw[1]) if raw else None
+
     @property
     def pretty_name(self) -> str:
         if not self.name or '@' in self.name:
@@ -135,9 +284,19 @@ class AuvikDeviceData:
                 return new_name[0]
         return name
 
+    def _fields(self) -> dict:
+        """ Loaded fields and their values in _FIELDS order.
+        """
+        fields = {}
+        for key in self._FIELDS:
+            val = getattr(self, key, _UNSET)
+            if val is not _UNSET:
+                fields[key] = val
+        return fields
+
     def _as_dict(self) -> dict:
         _pretty_dict_ = {}
-        for key, val in self.__dict__.items():
+        for key, val in self._fields().items():
             if isinstance(val, list):
                 _pretty_dict_[key] = len(val)
             else:
@@ -145,7 +304,10 @@ class AuvikDeviceData:
         return _pretty_dict_
 
     def toJSON(self) -> object:
-        return jsonpickle.encode(self, unpicklable=False)
+        import jsonpickle
+        fields = self._fields()
+        fields['tenant'] = self.tenant._as_dict() if self.tenant else None
+        return jsonpickle.encode(fields, unpicklable=False)
 
     def is_net_device(self) -> bool:
         if self.device_type in AUVIK_NET_DEVICE_TYPES and \
@@ -180,6 +342,11 @@ class AuvikDeviceData:
         if self.is_net_device():
             self.nd_type = "autodetect"
             if self.has_os():
+                sys = self._sysdescr()
+                if sys is not None and sys.os == self.os:
+                    # Mapped once per distinct description
+                    self.nd_type = sys.nd_type or self.nd_type
+                    return
                 try:
                     self.nd_type = NET_DEVICE_MAPPER[self.os]
                 except KeyError:
@@ -226,6 +393,14 @@ class AuvikDeviceData:
 
 
 class AuvikTenantData:
+    """ Used to store tenant data from AuvikAPI.
+    Devices and networks share one instance per tenant through intern().
+    """
+    __slots__ = ('_id', 'domain', 'tenant_type', '__weakref__')
+    # Tenants currently in use, by id
+    _interned = weakref.WeakValueDictionary()
+    _intern_lock = threading.Lock()
+
     def __init__(self, data: dict) -> None:
         self._id = None
         self.domain = None
@@ -246,11 +421,33 @@ class AuvikTenantData:
         except KeyError:
             self.tenant_type = None
 
+    @classmethod
+    def intern(cls, data: dict) -> 'AuvikTenantData':
+        """ Get the shared instance for a tenant, creating it if needed.
+        """
+        with cls._intern_lock:
+            tenant = cls._interned.get(data['id'])
+            if tenant is None:
+                tenant = cls(data)
+                cls._interned[tenant._id] = tenant
+            return tenant
+
     def _as_dict(self) -> dict:
-        return self.__dict__
+        return {
+            '_id': self._id,
+            'domain': self.domain,
+            'tenant_type': self.tenant_type,
+        }
 
 
 class AuvikNetworkData:
+    """ Used to store network data from AuvikAPI.
+    """
+    __slots__ = (
+        '_id', 'net_type', 'name', 'description', 'scan_status',
+        'last_modified', 'devices', 'tenant',
+    )
+
     def __init__(self, data: dict) -> None:
         self._id = None
         self.net_type = None
@@ -274,7 +471,9 @@ class AuvikNetworkData:
         self.description = data['attributes']['description']
         self.scan_status = data['attributes']['scanStatus']
         self.last_modified = time_formatter(data['attributes']['lastModified'])
-        self.tenant = AuvikTenantData(data['relationships']['tenant']['data'])
+        self.tenant = AuvikTenantData.intern(
+            data['relationships']['tenant']['data']
+        )
         try:
             devices = data['relationships']['devices']['data']
         except KeyError:
@@ -287,5 +486,5 @@ class AuvikNetworkData:
                 })
 
     def _as_dict(self) -> dict:
-        return self.__dict__
+        return {key: getattr(self, key, None) for key in self.__slots__}
 
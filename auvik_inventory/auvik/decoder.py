@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+# vim: noai:et:tw=80:ts=4:ss=4:sts=4:sw=4:ft=python
+
+'''
+Title:              decoder.py
+Description:        Pluggable JSON decoding and streaming page parsing
+Author:             Ricky Laney
+Version:            0.1.0
+'''
+import json
+import threading
+from typing import (
+    Any,
+    Callable,
+    Iterator,
+    Optional,
+    Union,
+)
+
+# Typing shortcuts
+UbS = Union[bytes, str]
+
+__all__ = [
+    'DECODERS',
+    'get_decoder',
+    'set_decoder',
+    'loads',
+    'AuvikPage',
+]
+
+
+def _orjson() -> Callable[[UbS], Any]:
+    import orjson
+    return orjson.loads
+
+
+def _ujson() -> Callable[[UbS], Any]:
+    import ujson
+    return ujson.loads
+
+
+def _stdlib() -> Callable[[UbS], Any]:
+    return json.loads
+
+
+# Decoders in order of preference, each returns a loads function
+DECODERS = {
+    'orjson': _orjson,
+    'ujson': _ujson,
+    'json': _stdlib,
+}
+
+_decoder = None
+_decoder_lock = threading.Lock()
+
+
+def set_decoder(name: str=None) -> str:
+    """ Use the named decoder, or the fastest one installed if None.
+    Returns the name of the decoder in use.
+    """
+    global _decoder
+    names = [name] if name else list(DECODERS)
+    for candidate in names:
+        try:
+            factory = DECODERS[candidate]
+        except KeyError:
+            raise ValueError(f"Invalid JSON decoder: {candidate}")
+        try:
+            decode = factory()
+        except ImportError:
+            if name:
+                raise
+            continue
+        with _decoder_lock:
+            _decoder = (candidate, decode)
+        return candidate
+
+
+def get_decoder() -> str:
+    if _decoder is None:
+        set_decoder()
+    return _decoder[0]
+
+
+def loads(body: UbS) -> Any:
+    """ Decode a JSON document with the selected decoder.
+    """
+    if _decoder is None:
+        set_decoder()
+    return _decoder[1](body)
+
+
+class AuvikPage:
+    """ Incremental parser of a JSON:API page from the Auvik API.
+
+    Iterating yields the items of the top level 'data' array one at a time,
+    so the whole page document is never built.  'links' and 'meta' are
+    decoded as they are reached and next is available once iteration is
+    done (Auvik puts them after 'data').  Parsing relies on the stdlib's
+    raw_decode, so it only pays off when the stdlib is the selected
+    decoder; faster decoders are quicker decoding the whole page.  Like
+    loads(), a malformed or truncated page raises json.JSONDecodeError (a
+    ValueError).
+
+    :param:bytes: body = raw response body.
+    """
+    _decoder = json.JSONDecoder()
+    _WHITESPACE = ' \t\n\r'
+
+    def __init__(self, body: UbS) -> None:
+        self.text = body.decode('utf-8') if isinstance(body, bytes) else body
+        self.links = {}
+        self.meta = {}
+
+    @property
+    def next(self) -> Optional[str]:
+        return self.links.get('next') if self.links else None
+
+    def _skip(self, pos: int) -> int:
+        text = self.text
+        while pos < len(text) and text[pos] in self._WHITESPACE:
+            pos += 1
+        return pos
+
+    def _expect(self, pos: int, chars: str) -> int:
+        pos = self._skip(pos)
+        if pos >= len(self.text) or self.text[pos] not in chars:
+            found = self.text[pos:pos + 1] or 'end of page'
+            raise json.JSONDecodeError(
+                f"Expected {chars!r}, found {found!r}", self.text, pos
+            )
+        return pos
+
+    def _peek(self, pos: int) -> str:
+        pos = self._skip(pos)
+        if pos >= len(self.text):
+            raise json.JSONDecodeError("Unexpected end of page", self.text,
+                                       pos)
+        return self.text[pos]
+
+    def _value(self, pos: int) -> tuple:
+        return self._decoder.raw_decode(self.text, self._skip(pos))
+
+    def __iter__(self) -> Iterator[Any]:
+        pos = self._expect(0, '{') + 1
+        if self._peek(pos) == '}':
+            return
+        while True:
+            key, pos = self._value(pos)
+            pos = self._expect(pos, ':') + 1
+            if key == 'data' and self._peek(pos) == '[':
+                pos = yield from self._items(self._skip(pos) + 1)
+            else:
+                value, pos = self._value(pos)
+                if key == 'data':
+                    # Single resource pages
+                    yield value
+                elif key in ('links', 'meta'):
+                    setattr(self, key, value or {})
+            pos = self._expect(pos, ',}')
+            if self.text[pos] == '}':
+                break
+            pos += 1
+        # Drop the text once parsed
+        self.text = ''
+
+    def _items(self, pos: int) -> Iterator[Any]:
+        if self._peek(pos) == ']':
+            return self._skip(pos) + 1
+        while True:
+            item, pos = self._value(pos)
+            yield item
+            pos = self._expect(pos, ',]')
+            if self.text[pos] == ']':
+                return pos + 1
+            pos += 1
@@ -4,10 +4,12 @@
 '''
 Title:              filters.py
 '''
+import re
 from src.exceptions import IEAutomationAuvikFilterError
-from typing import List, Union
+from typing import Any, Callable, Iterable, Iterator, List, Tuple, Union
 
 LUod = List[Union[object, dict]]
+Predicate = Callable[[Any], bool]
 
 class AuvikFilter:
     ''' Filters for the Auvik API device inventory
@@ -15,13 +17,27 @@ class AuvikFilter:
     :param:str: filter_str = String used to filter objects.
     The string should be in 'key=val,key2=val2' format. Each item separated
     by ',' (comma) and key/val pair separated by '=' (equals).
+
+    Values match case-insensitive substrings unless they start with an
+    operator:  '=' exact match ('name==sw1'), '^' prefix ('name=^sw'),
+    '~' regular expression ('name=~^sw[0-9]+$').  A leading '!' negates
+    the match ('vendor=!cisco', 'name=!^sw').  A backslash before the
+    operator keeps it literal, so values written before the operators
+    existed still mean the same once escaped ('name=\\^sw' contains '^sw',
+    'name=!\\!sw' does not contain '!sw').
+
+    Filters are compiled once into predicates so a batch of devices is
+    checked in a single pass.
     '''
+    OPERATORS = {'=': 'exact', '^': 'prefix', '~': 'regex'}
+
     def __init__(self, filters: Union[str, list]) -> None:
         # Filter strings override config filters
         if isinstance(filters, str):
             self.filters = self._build_filters(filters)
         else:
             self.filters = filters
+        self.predicates = self._compile(self.filters)
 
     @staticmethod
     def _build_filters(filter_str: str) -> list:
@@ -32,33 +48,105 @@ class AuvikFilter:
                 raise IEAutomationAuvikFilterError(
                     f"Invalid filter item: {item}"
                 )
-            key, value = item.split('=')
+            key, value = item.split('=', 1)
             filters.append({key: value})
         return filters
 
-    def is_valid_device(self, device: Union[object, dict]) -> bool:
-        if not self.filters:
-            return True
+    @classmethod
+    def parse_value(cls, value: Any) -> Tuple[str, bool, str]:
+        """ Split a filter value into (operator, negate, operand).
+        operator is one of 'contains', 'exact', 'prefix' or 'regex'.
+        """
+        value = str(value)
+        if value.startswith('\\'):
+            return 'contains', False, value[1:]
+        negate = value.startswith('!')
+        if negate:
+            value = value[1:]
+            if value.startswith('\\'):
+                return 'contains', negate, value[1:]
+        operator = cls.OPERATORS.get(value[:1])
+        if operator is None:
+            return 'contains', negate, value
+        return operator, negate, value[1:]
+
+    @classmethod
+    def compile_value(cls, value: Any) -> Predicate:
+        """ Predicate for a single filter value, see the class docstring.
+        """
+        operator, negate, operand = cls.parse_value(value)
+        needle = operand.lower()
+        if operator == 'exact':
+            def match(val: Any) -> bool:
+                return bool(val) and str(val).lower() == needle
+        elif operator == 'prefix':
+            def match(val: Any) -> bool:
+                return bool(val) and str(val).lower().startswith(needle)
+        elif operator == 'regex':
+            try:
+                search = re.compile(operand, re.IGNORECASE).search
+            except re.error as err:
+                raise IEAutomationAuvikFilterError(
+                    f"Invalid filter regex: {operand} ({err})"
+                )
+            def match(val: Any) -> bool:
+                return bool(val) and search(str(val)) is not None
         else:
-            for fil in self.filters:
-                for fil_key, fil_val in fil.items():
-                    device_value = None
-                    if isinstance(device, dict):
-                        if 'item' in device.keys():
-                            device = device['item']
-                        if fil_key in device.keys():
-                            device_value = device.get(fil_key)
-                    else:
-                        if hasattr(device, fil_key):
-                            device_value = getattr(device, fil_key)
-                    if device_value and fil_val.lower() in device_value.lower():
-                        continue
-                    else:
+            def match(val: Any) -> bool:
+                return bool(val) and needle in str(val).lower()
+        if negate:
+            return lambda val: not match(val)
+        return match
+
+    @classmethod
+    def _compile(cls, filters: list) -> List[Tuple[str, Predicate]]:
+        predicates = []
+        for fil in filters or []:
+            for fil_key, fil_val in fil.items():
+                predicates.append((fil_key, cls.compile_value(fil_val)))
+        return predicates
+
+    def matcher(self, sample: Union[object, dict]) -> Callable[[Any], bool]:
+        """ Device predicate for a batch of devices shaped like sample.
+        Dicts (optionally wrapped in an enriched 'item') are read by key and
+        objects by attribute.
+        """
+        predicates = self.predicates
+        if isinstance(sample, dict):
+            def is_valid(device: dict) -> bool:
+                if 'item' in device:
+                    device = device['item']
+                get = device.get
+                for key, predicate in predicates:
+                    if not predicate(get(key)):
+                        return False
+                return True
+        else:
+            def is_valid(device: object) -> bool:
+                for key, predicate in predicates:
+                    if not predicate(getattr(device, key, None)):
                         return False
-        return True
+                return True
+        return is_valid
 
-    def filter_devices(self, devices: LUod) -> LUod:
-        valid_devices = [device for device in devices if \
-                        self.is_valid_device(device)]
-        return valid_devices
+    def is_valid_device(self, device: Union[object, dict]) -> bool:
+        if not self.predicates:
+            return True
+        return self.matcher(device)(device)
 
+    def iter_valid(self, devices: Iterable) -> Iterator:
+        """ Lazily yield the devices passing every filter.
+        """
+        devices = iter(devices)
+        for first in devices:
+            if not self.predicates:
+                yield first
+                yield from devices
+                return
+            is_valid = self.matcher(first)
+            if is_valid(first):
+                yield first
+            yield from filter(is_valid, devices)
+
+    def filter_devices(self, devices: LUod) -> LUod:
+        return list(self.iter_valid(devices))
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+# vim: noai:et:tw=80:ts=4:ss=4:sts=4:sw=4:ft=python
+
+'''
+Title:              index.py
+Description:        Multi-key lookup index over an Auvik inventory
+Author:             Ricky Laney
+Version:            0.1.0
+'''
+from bisect import bisect_left, bisect_right, insort
+import ipaddress
+import re
+from socket import AF_INET, AF_INET6, inet_pton
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from src.auvik.data import AuvikDeviceData
+
+# Typing shortcuts
+UdS = Union[AuvikDeviceData, str]
+
+__all__ = ['InventoryIndex']
+
+_MAC_SEPARATORS = re.compile(r'[^0-9a-f]')
+
+
+class InventoryIndex:
+    """ Multi-key index over AuvikDeviceData built in a single pass.
+
+    Exact lookups by ip (every address in ips, not just ip), name, serial,
+    interface MAC (from load_details) and tenant (id or domain) are O(1).
+    Prefix lookups work on any key and CIDR lookups on IPs.  Devices can be
+    added, updated and removed as the inventory changes.
+
+    :param:list: devices = AuvikDeviceData objects to index.
+    """
+    KEYS = ('ip', 'name', 'serial', 'mac', 'tenant')
+
+    def __init__(self, devices: Iterable[AuvikDeviceData]=None) -> None:
+        self._devices = {}
+        # key -> normalized value -> device id, or {device id: None} (an
+        # ordered set) once several devices share the value.  Most values
+        # are unique, so this saves a dict per value.
+        self._exact = {key: {} for key in self.KEYS}
+        # Device id -> (key, value) pairs it was indexed under, for removal
+        self._entries = {}
+        # Sorted views built on first use, then kept in step by add/remove
+        self._sorted = {}
+        self._networks = None
+        for device in devices or []:
+            self.add(device)
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def __contains__(self, device: UdS) -> bool:
+        return self._device_id(device) in self._devices
+
+    def __iter__(self) -> Iterator[AuvikDeviceData]:
+        return iter(self._devices.values())
+
+    def __repr__(self) -> str:
+        return f"<InventoryIndex[devices={len(self)}]>"
+
+    @staticmethod
+    def _device_id(device: UdS) -> str:
+        return device if isinstance(device, str) else device._id
+
+    @staticmethod
+    def normalize_ip(value: str) -> Optional[str]:
+        value = str(value).strip()
+        try:
+            # Fast path, inet_pton only accepts canonical dotted quads
+            inet_pton(AF_INET, value)
+            return value
+        except OSError:
+            pass
+        try:
+            return ipaddress.ip_address(value).compressed
+        except ValueError:
+            return None
+
+    @staticmethod
+    def normalize_mac(value: str) -> Optional[str]:
+        mac = _MAC_SEPARATORS.sub('', str(value).lower())
+        return mac if len(mac) == 12 else None
+
+    @classmethod
+    def normalize(cls, key: str, value: str) -> Optional[str]:
+        """ Normalized form of value as stored under key.
+        """
+        if value is None:
+            return None
+        if key == 'ip':
+            return cls.normalize_ip(value)
+        if key == 'mac':
+            return cls.normalize_mac(value)
+        value = str(value).strip().lower()
+        return value or None
+
+    @staticmethod
+    def _raw_values(device: AuvikDeviceData) -> Dict[str, list]:
+        ips = list(getattr(device, 'ips', None) or [])
+        if device.ip and device.ip not in ips:
+            ips.append(device.ip)
+        macs = [mac for interface in getattr(device, 'interfaces', None) or []
+                for mac in interface.values()]
+        tenant = device.tenant
+        tenants = [tenant._id, tenant.domain] if tenant is not None else []
+        return {
+            'ip': ips,
+            'name': [device.name],
+            'serial': [getattr(device, 'serial', None)],
+            'mac': macs,
+            'tenant': tenants,
+        }
+
+    def add(self, device: AuvikDeviceData) -> None:
+        """ Index a device, replacing any device with the same id.
+        """
+        device_id = device._id
+        if device_id in self._devices:
+            self.remove(device_id)
+        entries = {}
+        for key, values in self._raw_values(device).items():
+            index = self._exact[key]
+            for value in values:
+                value = self.normalize(key, value)
+                if value is None or (key, value) in entries:
+                    continue
+                entries[(key, value)] = None
+                ids = index.get(value)
+                if ids is None:
+                    index[value] = device_id
+                    if key in self._sorted:
+                        insort(self._sorted[key], value)
+                elif isinstance(ids, dict):
+                    ids[device_id] = None
+                else:
+                    index[value] = {ids: None, device_id: None}
+                if key == 'ip' and self._networks is not None:
+                    self._network_add(value, device_id)
+        self._devices[device_id] = device
+        self._entries[device_id] = tuple(entries)
+
+    def update(self, device: AuvikDeviceData) -> None:
+        """ Re-index a device after its fields changed.
+        """
+        self.add(device)
+
+    def remove(self, device: UdS) -> Optional[AuvikDeviceData]:
+        """ Remove a device (or device id) and return it, if indexed.
+        """
+        device_id = self._device_id(device)
+        removed = self._devices.pop(device_id, None)
+        if removed is None:
+            return None
+        for key, value in self._entries.pop(device_id):
+            index = self._exact[key]
+            ids = index[value]
+            if isinstance(ids, dict):
+                del ids[device_id]
+                if len(ids) == 1:
+                    index[value] = next(iter(ids))
+            else:
+                del index[value]
+                if key in self._sorted:
+                    values = self._sorted[key]
+                    del values[bisect_left(values, value)]
+            if key == 'ip' and self._networks is not None:
+                self._network_remove(value, device_id)
+        return removed
+
+    def _ids(self, key: str, value: str) -> Iterable[str]:
+        ids = self._exact[key].get(value)
+        if ids is None:
+            return ()
+        return ids if isinstance(ids, dict) else (ids,)
+
+    def get(self, device_id: str) -> Optional[AuvikDeviceData]:
+        return self._devices.get(device_id)
+
+    def _check_key(self, key: str) -> None:
+        if key not in self._exact:
+            raise KeyError(f"Invalid index key: {key}")
+
+    def lookup(self, key: str, value: str) -> List[AuvikDeviceData]:
+        """ Devices whose key exactly matches value (case-insensitive).
+        """
+        self._check_key(key)
+        ids = self._ids(key, self.normalize(key, value))
+        return [self._devices[device_id] for device_id in ids]
+
+    def by_ip(self, ip: str) -> List[AuvikDeviceData]:
+        return self.lookup('ip', ip)
+
+    def by_name(self, name: str) -> List[AuvikDeviceData]:
+        return self.lookup('name', name)
+
+    def by_serial(self, serial: str) -> List[AuvikDeviceData]:
+        return self.lookup('serial', serial)
+
+    def by_mac(self, mac: str) -> List[AuvikDeviceData]:
+        return self.lookup('mac', mac)
+
+    def by_tenant(self, tenant: str) -> List[AuvikDeviceData]:
+        return self.lookup('tenant', tenant)
+
+    def _collect(self, ids: Iterable[str]) -> List[AuvikDeviceData]:
+        # Several matching values can point at the same device
+        return [self._devices[device_id] for device_id in dict.fromkeys(ids)]
+
+    def prefix(self, key: str, prefix: str) -> List[AuvikDeviceData]:
+        """ Devices with a key value starting with prefix (case-insensitive).
+        IP prefixes are matched on the text, e.g. '10.1.'.
+        """
+        self._check_key(key)
+        values = self._sorted.get(key)
+        if values is None:
+            values = self._sorted[key] = sorted(self._exact[key])
+        prefix = str(prefix).strip().lower()
+        if key == 'mac':
+            prefix = _MAC_SEPARATORS.sub('', prefix)
+        start = bisect_left(values, prefix)
+        ids = []
+        for pos in range(start, len(values)):
+            value = values[pos]
+            if not value.startswith(prefix):
+                break
+            ids.extend(self._ids(key, value))
+        return self._collect(ids)
+
+    @staticmethod
+    def _ip_int(value: str) -> Tuple[int, int]:
+        """ IP version and integer of a normalized IP.
+        """
+        version, family = (6, AF_INET6) if ':' in value else (4, AF_INET)
+        # Drop any IPv6 scope ('fe80::1%eth0')
+        address = value.split('%', 1)[0]
+        return version, int.from_bytes(inet_pton(family, address), 'big')
+
+    def _network_add(self, value: str, device_id: str) -> None:
+        version, ip = self._ip_int(value)
+        ints, ids = self._networks[version]
+        pos = bisect_right(ints, ip)
+        ints.insert(pos, ip)
+        ids.insert(pos, device_id)
+
+    def _network_remove(self, value: str, device_id: str) -> None:
+        version, ip = self._ip_int(value)
+        ints, ids = self._networks[version]
+        for pos in range(bisect_left(ints, ip), bisect_right(ints, ip)):
+            if ids[pos] == device_id:
+                del ints[pos]
+                del ids[pos]
+                return
+
+    def _network_index(self) -> Dict[int, Tuple[List[int], List[str]]]:
+        """ IPs as sorted integers per IP version, built on first use.
+        """
+        if self._networks is None:
+            pairs = {4: [], 6: []}
+            for value in self._exact['ip']:
+                version, ip = self._ip_int(value)
+                for device_id in self._ids('ip', value):
+                    pairs[version].append((ip, device_id))
+            self._networks = {}
+            for version, items in pairs.items():
+                items.sort()
+                self._networks[version] = ([i for i, _ in items],
+                                           [d for _, d in items])
+        return self._networks
+
+    def cidr(self, network: str) -> List[AuvikDeviceData]:
+        """ Devices with any IP inside network, e.g. '10.1.0.0/16'.
+        """
+        net = ipaddress.ip_network(str(network).strip(), strict=False)
+        ints, ids = self._network_index()[net.version]
+        start = bisect_left(ints, int(net.network_address))
+        end = bisect_right(ints, int(net.broadcast_address))
+        return self._collect(ids[start:end])
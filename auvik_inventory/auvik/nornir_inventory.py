@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+# vim: noai:et:tw=80:ts=4:ss=4:sts=4:sw=4:ft=python
+
+'''
+Title:              nornir_inventory.py
+Description:        Nornir inventory plugin for Auvik
+Author:             Ricky Laney
+Version:            0.1.0
+'''
+from collections.abc import MutableMapping
+import os
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+    Union,
+)
+from nornir.core.inventory import (
+    BaseAttributes,
+    Defaults,
+    Group,
+    Groups,
+    Host,
+    Hosts,
+    Inventory,
+    ParentGroups,
+)
+from src.auvik.constants import AUVIK_NET_DEVICE_TYPES
+from src.auvik.data import AuvikDeviceData
+from src.auvik.filters import AuvikFilter
+
+# Typing shortcuts
+UsP = Union[str, os.PathLike]
+Usl = Union[str, list]
+SelectedRecord = Tuple[dict, Optional[AuvikDeviceData]]
+
+__all__ = [
+    'AuvikHost',
+    'AuvikInventory',
+]
+
+# Stands in for a platform not derived from the device yet
+_DEVICE_PLATFORM = object()
+
+
+class RawDevice:
+    """ Attribute view of a raw inventory record.
+
+    Exposes the AuvikDeviceData fields that come straight from the record,
+    so AuvikFilter can check records before any device is built.  A single
+    view is rebound to each record in turn.
+    """
+    __slots__ = ('attributes',)
+    FIELDS = {
+        'name': 'deviceName',
+        'ips': 'ipAddresses',
+        'device_type': 'deviceType',
+        'make': 'makeModel',
+        'vendor': 'vendorName',
+        'software': 'softwareVersion',
+        'serial': 'serialNumber',
+        'description': 'description',
+        'firmware': 'firmwareVersion',
+        'status': 'onlineStatus',
+    }
+
+    def __init__(self, record: dict=None) -> None:
+        self.attributes = record['attributes'] if record else {}
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self.attributes.get(self.FIELDS[name])
+        except KeyError:
+            raise AttributeError(name)
+
+    def bind(self, record: dict) -> 'RawDevice':
+        self.attributes = record['attributes']
+        return self
+
+    def is_net_device(self) -> bool:
+        # Same rule as AuvikDeviceData.is_net_device
+        return self.device_type in AUVIK_NET_DEVICE_TYPES and \
+            ' Member ' not in (self.name or '')
+
+
+class HostData(MutableMapping):
+    """ Host data reading the fields of an AuvikDeviceData on access.
+
+    Derived fields (os, nd_type, ...) are only parsed when a task or filter
+    reads them.  Values set by Nornir are kept apart and win over the
+    device's fields.
+    """
+    __slots__ = ('device', '_set')
+
+    def __init__(self, device: AuvikDeviceData) -> None:
+        self.device = device
+        self._set = {}
+
+    def _keys(self) -> Iterator[str]:
+        # Listing the fields must not derive them
+        derived = {slot[1:] for slot in self.device._derived_slots}
+        for key in AuvikDeviceData._FIELDS:
+            if key in derived or hasattr(self.device, key):
+                yield key
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._set:
+            return self._set[key]
+        if key == 'tenant':
+            tenant = self.device.tenant
+            return tenant.domain if tenant else None
+        if key not in AuvikDeviceData._FIELDS:
+            raise KeyError(key)
+        try:
+            return getattr(self.device, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._set[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self._set[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._set
+        for key in self._keys():
+            if key not in self._set:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"<HostData[{self.device!r}]>"
+
+
+class AuvikHost(Host):
+    """ Nornir Host backed by an AuvikDeviceData.
+
+    The platform (the device's nd_type through platform_map) and the data
+    fields are only derived when first read, so hosts dropped by
+    Inventory.filter on raw fields never parse their sysDescr.
+
+    :param:str: name = host name.
+    :param:AuvikDeviceData: device = the device of the host.
+    :param:dict: platform_map = nd_type to Nornir platform.
+    """
+    __slots__ = ('device', 'platform_map')
+
+    def __init__(self, name: str, device: AuvikDeviceData,
+                 platform_map: Dict[str, str]=None, **kwargs) -> None:
+        self.device = device
+        self.platform_map = platform_map or {}
+        super().__init__(name=name, hostname=device.ip,
+                         platform=_DEVICE_PLATFORM, data=HostData(device),
+                         **kwargs)
+
+    @property
+    def platform(self) -> Optional[str]:
+        platform = BaseAttributes.platform.__get__(self)
+        if platform is _DEVICE_PLATFORM:
+            nd_type = self.device.nd_type
+            platform = self.platform_map.get(nd_type, nd_type)
+            BaseAttributes.platform.__set__(self, platform)
+        return platform
+
+    @platform.setter
+    def platform(self, value: Optional[str]) -> None:
+        BaseAttributes.platform.__set__(self, value)
+
+
+class AuvikInventory:
+    """ Nornir inventory plugin backed by AuvikAPI.
+
+    Filters the API can evaluate are sent as filter[...] parameters and the
+    rest of the record level filters run on the raw records, so filtered
+    out devices never become objects.  Filters on derived fields (os,
+    nd_type, ip, ...) need the device, so it is built (lazily parsed) for
+    records passing the other filters and reused for the host.  The
+    selected records become AuvikHosts, which only derive the fields Nornir
+    reads, so later Inventory.filter calls stay cheap.
+
+    The platform is the device's nd_type, translated by platform_map when
+    given (e.g. {'cisco_ios': 'ios'} for NAPALM).  Hosts are grouped as
+    tenant_<domain> and vendor_<vendor>.
+
+    Register it with Nornir under the name 'AuvikInventory':
+
+        InitNornir(inventory={
+            'plugin': 'AuvikInventory',
+            'options': {'filters': 'vendor=cisco', 'tenants': 'acme'},
+        })
+
+    :param:str: config_file = AuvikAPI config file.
+    :param:str: tenants = tenant names, see AuvikAPI.resolve_tenant_ids.
+    :param:str: tenant_ids = tenant ids.
+    :param:str: filters = device filters, see AuvikFilter.
+    :param:bool: net_only = only network devices (default True).
+    :param:dict: platform_map = nd_type to Nornir platform.
+    :param:dict: defaults = Nornir Defaults data.
+    """
+
+    def __init__(self, config_file: UsP=None, tenants: Usl=None,
+                 tenant_ids: Usl=None, filters: Usl=None,
+                 net_only: bool=True, platform_map: Dict[str, str]=None,
+                 defaults: Dict[str, Any]=None) -> None:
+        self.config_file = config_file
+        self.tenants = tenants
+        self.tenant_ids = tenant_ids
+        self.filters = filters
+        self.net_only = net_only
+        self.platform_map = platform_map or {}
+        self.defaults = Defaults(data=defaults or {})
+
+    @staticmethod
+    def _split_filters(local: Optional[AuvikFilter]
+                       ) -> Tuple[Optional[AuvikFilter], Optional[AuvikFilter]]:
+        """ Record level and device level filters of local.
+        """
+        if not local:
+            return None, None
+        raw, derived = [], []
+        for fil in local.filters:
+            if all(key in RawDevice.FIELDS for key in fil):
+                raw.append(fil)
+            else:
+                derived.append(fil)
+        return (AuvikFilter(raw) if raw else None,
+                AuvikFilter(derived) if derived else None)
+
+    def select(self, records: Iterable[dict], raw_filter: AuvikFilter=None,
+               device_filter: AuvikFilter=None) -> Iterator[SelectedRecord]:
+        """ Records passing net_only and the filters, with their device
+        when device_filter needed one.
+        """
+        view = RawDevice()
+        is_raw_valid = raw_filter.matcher(view) if raw_filter else None
+        # AuvikFilter reads objects by attribute, the view stands in
+        is_valid = device_filter.matcher(view) if device_filter else None
+        for record in records:
+            view.bind(record)
+            if self.net_only and not view.is_net_device():
+                continue
+            if is_raw_valid and not is_raw_valid(view):
+                continue
+            device = None
+            if is_valid:
+                device = AuvikDeviceData(record, lazy=True)
+                if not is_valid(device):
+                    continue
+            yield record, device
+
+    @staticmethod
+    def _groups(record: dict) -> Tuple[str, ...]:
+        groups = []
+        tenant = record['relationships']['tenant']['data']
+        domain = tenant.get('attributes', {}).get('domainPrefix')
+        if domain:
+            groups.append(f"tenant_{domain}")
+        vendor = record['attributes'].get('vendorName')
+        if vendor:
+            groups.append(f"vendor_{vendor}")
+        return tuple(groups)
+
+    def load(self) -> Inventory:
+        # Only the API client needs requests and friends
+        from src.auvik import AuvikAPI
+        with AuvikAPI(self.config_file) as api:
+            plan = api.plan_filters(self.filters)
+            records = api.iter_tenant_inventory(tenants=self.tenants,
+                                                tenant_ids=self.tenant_ids,
+                                                server_filters=plan.params)
+            return self.build(self.select(records,
+                                          *self._split_filters(plan.local)))
+
+    def build(self, selected: Iterable[SelectedRecord]) -> Inventory:
+        """ Inventory of the records selected by select().
+        """
+        groups = Groups()
+        hosts = Hosts()
+        pretty_name = AuvikDeviceData.pretty_name.fget
+        view = RawDevice()
+        for record, device in selected:
+            name = pretty_name(view.bind(record))
+            if name == 'Unknown' or name in hosts:
+                # Keep hosts unique when names collide across tenants
+                name = record['id']
+            host_groups = self._groups(record)
+            for group in host_groups:
+                if group not in groups:
+                    groups[group] = Group(name=group, defaults=self.defaults)
+            hosts[name] = AuvikHost(
+                name, device or AuvikDeviceData(record, lazy=True),
+                platform_map=self.platform_map,
+                groups=ParentGroups(groups[group] for group in host_groups),
+                defaults=self.defaults,
+            )
+        self.groups = groups
+        return Inventory(hosts=hosts, groups=groups, defaults=self.defaults)
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+# vim: noai:et:tw=80:ts=4:ss=4:sts=4:sw=4:ft=python
+
+'''
+Title:              overrides.py
+Description:        CSV/Excel overrides merged onto Auvik inventory
+Author:             Ricky Laney
+Version:            0.1.0
+'''
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from src.auvik.data import AuvikDeviceData
+from src.auvik.decoder import loads
+from src.exceptions import IEAutomationAuvikDeviceDataError
+
+# Typing shortcuts
+UsP = Union[str, os.PathLike]
+Override = Tuple[Tuple[str, Any], ...]
+
+__all__ = ['InventoryOverrides']
+
+OVERRIDE_CACHE_DIR = os.path.expanduser('~/.auvik_inventory/overrides')
+
+
+class InventoryOverrides:
+    """ Corrections from CSV/Excel sheets applied to AuvikDeviceData.
+
+    Each sheet has a header row naming a key column (id, serial or name)
+    and the AuvikDeviceData fields to override, e.g.:
+
+        serial,ip,nd_type
+        FOC1234X0AB,10.1.1.1,cisco_ios
+
+    Rows are streamed into hash indexes by id, serial and name (case-
+    insensitive), so applying them is a dict lookup per key and device.
+    A device matched by several keys gets all of them, id winning over
+    serial and serial over name.  Empty cells leave the field alone and
+    list fields (ips) are split on ',', ';' or whitespace.  When several
+    files are given, later files win.  Derived fields (os, model, version,
+    nd_type) that are not overridden themselves are derived again from the
+    overridden fields, e.g. nd_type follows an overridden os, so lazy and
+    eager devices end up the same.
+
+    Parsed sheets are stamped with their size and mtime and cached in memory
+    and in cache_dir, so a sheet is only parsed again when it changes.
+    Excel sheets need openpyxl.
+
+    :param:list: files = CSV (.csv, .tsv) or Excel (.xlsx) files.
+    :param:str: cache_dir = directory of parsed sheets, None to disable.
+    """
+    # Bump when the cached layout changes
+    VERSION = 1
+    KEYS = ('id', 'serial', 'name')
+    LIST_FIELDS = ('ips',)
+    # Objects and the id can not be overridden
+    FIELDS = frozenset(AuvikDeviceData._FIELDS) - {'_id', 'tenant'}
+    # Parsed sheets by path, shared across instances
+    _parsed = {}
+    _lock = threading.Lock()
+
+    def __init__(self, files: Union[UsP, Iterable[UsP]],
+                 cache_dir: Optional[UsP]=OVERRIDE_CACHE_DIR) -> None:
+        self.log = logging.getLogger('auvik.overrides')
+        if isinstance(files, (str, os.PathLike)):
+            files = [files]
+        self.files = [os.path.abspath(os.path.expanduser(f)) for f in files]
+        self.cache_dir = cache_dir
+        self.by_id = {}
+        self.by_serial = {}
+        self.by_name = {}
+        self.applied = 0
+        for sheet in self.files:
+            for key, value, override in self._load(sheet):
+                getattr(self, f"by_{key}")[value] = override
+
+    def __len__(self) -> int:
+        return len(self.by_id) + len(self.by_serial) + len(self.by_name)
+
+    def __repr__(self) -> str:
+        return f"<InventoryOverrides[files={len(self.files)}, rows={len(self)}]>"
+
+    @staticmethod
+    def _stamp(sheet: str) -> dict:
+        if not os.path.isfile(sheet):
+            raise IEAutomationAuvikDeviceDataError(
+                f"Not a valid override file: {sheet}"
+            )
+        stat = os.stat(sheet)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+    def _cache_file(self, sheet: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        name = hashlib.sha1(sheet.encode()).hexdigest()
+        return os.path.join(os.path.expanduser(self.cache_dir), f"{name}.json")
+
+    def _load(self, sheet: str) -> List[Tuple[str, str, Override]]:
+        """ Parsed rows of sheet as (key, value, override), from the memory
+        or file cache when sheet has not changed.
+        """
+        stamp = self._stamp(sheet)
+        cached = self._parsed.get(sheet)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        with self._lock:
+            rows = self._read_cache(sheet, stamp)
+            if rows is None:
+                rows = list(self.parse(sheet))
+                self._write_cache(sheet, stamp, rows)
+                self.log.debug(f"Parsed {len(rows)} overrides from {sheet}")
+            self._parsed[sheet] = (stamp, rows)
+        return rows
+
+    def _read_cache(self, sheet: str, stamp: dict
+                    ) -> Optional[List[Tuple[str, str, Override]]]:
+        cache_file = self._cache_file(sheet)
+        if not cache_file or not os.path.isfile(cache_file):
+            return None
+        try:
+            with open(cache_file, 'rb') as cf:
+                cached = loads(cf.read())
+            if cached.get('version') != self.VERSION or \
+                    cached.get('stamp') != stamp:
+                return None
+            return [(key, value, tuple((field, val) for field, val in fields))
+                    for key, value, fields in cached['rows']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_cache(self, sheet: str, stamp: dict,
+                     rows: List[Tuple[str, str, Override]]) -> None:
+        cache_file = self._cache_file(sheet)
+        if not cache_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = f"{cache_file}.tmp"
+            with open(tmp_file, 'w') as cf:
+                json.dump({'version': self.VERSION, 'source': sheet,
+                           'stamp': stamp, 'rows': rows}, cf,
+                          separators=(',', ':'))
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            self.log.debug(f"Unable to cache overrides of {sheet}: {e}")
+
+    @staticmethod
+    def _cell(value: Any) -> Optional[str]:
+        if value is None:
+            return None
+        # Excel stores numeric serials and names as floats
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        value = str(value).strip()
+        return value or None
+
+    @staticmethod
+    def _iter_csv(sheet: str) -> Iterator[tuple]:
+        with open(sheet, newline='', encoding='utf-8-sig') as sf:
+            delimiter = '\t' if sheet.lower().endswith('.tsv') else ','
+            yield from csv.reader(sf, delimiter=delimiter)
+
+    @staticmethod
+    def _iter_excel(sheet: str) -> Iterator[tuple]:
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise IEAutomationAuvikDeviceDataError(
+                f"openpyxl is required to read {sheet}"
+            )
+        # Read only mode streams rows instead of loading the workbook
+        workbook = load_workbook(sheet, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    @classmethod
+    def parse(cls, sheet: str) -> Iterator[Tuple[str, str, Override]]:
+        """ Stream the rows of sheet as (key, value, override).
+        """
+        if sheet.lower().endswith(('.xlsx', '.xlsm')):
+            rows = cls._iter_excel(sheet)
+        else:
+            rows = cls._iter_csv(sheet)
+        header = None
+        for line, row in enumerate(rows, 1):
+            cells = [cls._cell(value) for value in row]
+            if header is None:
+                if not any(cells):
+                    continue
+                header = cls._header(sheet, cells)
+                continue
+            keys = {}
+            fields = []
+            for column, cell in zip(header, cells):
+                if cell is None or column is None:
+                    continue
+                if column in cls.KEYS:
+                    keys[column] = cell
+                elif column in cls.LIST_FIELDS:
+                    fields.append((column, re.split(r'[\s,;]+', cell)))
+                else:
+                    fields.append((column, cell))
+            key = next((key for key in cls.KEYS if key in keys), None)
+            if key is None:
+                if fields:
+                    raise IEAutomationAuvikDeviceDataError(
+                        f"No id, serial or name on line {line} of {sheet}"
+                    )
+                continue
+            if key != 'name' and 'name' in keys:
+                # Matched by id or serial, so the name is a rename
+                fields.append(('name', keys['name']))
+            if fields:
+                value = keys[key].lower() if key == 'name' else keys[key]
+                yield key, value, tuple(fields)
+
+    @classmethod
+    def _header(cls, sheet: str, cells: List[Optional[str]]
+                ) -> List[Optional[str]]:
+        header = []
+        for cell in cells:
+            column = cell.lower() if cell else None
+            if column == '_id':
+                column = 'id'
+            if column and column not in cls.KEYS and \
+                    column not in cls.FIELDS:
+                raise IEAutomationAuvikDeviceDataError(
+                    f"Unknown override column {cell} in {sheet}"
+                )
+            header.append(column)
+        if not any(column in cls.KEYS for column in header):
+            raise IEAutomationAuvikDeviceDataError(
+                f"No id, serial or name column in {sheet}"
+            )
+        return header
+
+    def lookup(self, device: AuvikDeviceData) -> List[Override]:
+        """ Overrides matching device by name, serial and id, in the order
+        they apply so the most specific key wins.
+        """
+        overrides = []
+        if device.name:
+            overrides.append(self.by_name.get(device.name.lower()))
+        if device.serial:
+            overrides.append(self.by_serial.get(device.serial))
+        overrides.append(self.by_id.get(device._id))
+        return [override for override in overrides if override is not None]
+
+    def apply(self, device: AuvikDeviceData) -> AuvikDeviceData:
+        """ Set the overridden fields of device, returned for chaining.
+        """
+        if not self:
+            return device
+        overrides = self.lookup(device)
+        if not overrides:
+            return device
+        changed = set()
+        for override in overrides:
+            for field, value in override:
+                setattr(device, field, value)
+                changed.add(field)
+        device._clear_derived(changed)
+        self.applied += 1
+        return device
+
+    def apply_all(self, devices: Iterable[AuvikDeviceData]
+                  ) -> Iterator[AuvikDeviceData]:
+        """ Lazily apply the overrides to a stream of devices.
+        """
+        for device in devices:
+            yield self.apply(device)
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+# vim: noai:et:tw=80:ts=4:ss=4:sts=4:sw=4:ft=python
+
+'''
+Title:              progress.py
+Description:        Progress bars shared by the Auvik API clients
+Author:             Ricky Laney
+Version:            0.1.0
+'''
+
+__all__ = ['alive_bar']
+
+
+def alive_bar(*args, **kwargs):
+    """ alive_progress.alive_bar, imported on first use.
+    """
+    from alive_progress import alive_bar
+    return alive_bar(*args, **kwargs)
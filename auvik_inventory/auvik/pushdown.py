@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# vim: noai:et:tw=80:ts=4:ss=4:sts=4:sw=4:ft=python
+
+'''
+Title:              pushdown.py
+Description:        Push AuvikFilter predicates down to Auvik API filters
+Author:             Ricky Laney
+Version:            0.1.0
+'''
+import logging
+from typing import (
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+)
+from src.auvik.filters import AuvikFilter
+
+__all__ = [
+    'PushdownPlan',
+    'AuvikFilterPushdown',
+]
+
+
+class PushdownPlan(NamedTuple):
+    """ Query parameters sent to the API and the filter left to run locally.
+    """
+    params: Dict[str, str]
+    local: Optional[AuvikFilter]
+
+
+class AuvikFilterPushdown:
+    """ Plan which AuvikFilter predicates the API can evaluate.
+
+    A predicate is pushed down only when the server filter returns exactly
+    the devices it would match locally.  That holds for enum parameters
+    (deviceType, onlineStatus) when the predicate matches exactly one enum
+    value, e.g. 'status=online' or 'device_type==switch', which is then
+    sent as Auvik spells it.  Free text parameters (vendorName, makeModel)
+    are matched case-sensitively by the server while AuvikFilter ignores
+    case, so they always run locally, as do negated predicates and a
+    second predicate on the same parameter.
+
+    :param:AuvikSpec: spec = spec used to find the supported parameters.
+    :param:str: path = API path the parameters are sent to.
+    """
+    FIELD_PARAMS = {
+        'device_type': 'filter[deviceType]',
+        'status': 'filter[onlineStatus]',
+    }
+    DEFAULT_PATH = '/inventory/device/info'
+
+    def __init__(self, spec: object, path: str=None) -> None:
+        self.log = logging.getLogger('auvik.pushdown')
+        self.spec = spec
+        self.path = path or self.DEFAULT_PATH
+        params = {p['name']: p for p in spec.query_path_params(self.path)}
+        # Only fields whose parameter the path really supports
+        self.params = {field: params[name] for field, name in
+                       self.FIELD_PARAMS.items() if name in params}
+
+    @staticmethod
+    def _enum(param: dict) -> Optional[List[str]]:
+        # AuvikSpec resolves the parameter schemas, enums are inline
+        return param.get('schema', {}).get('enum')
+
+    def _server_value(self, param: dict, value: str) -> Optional[str]:
+        negate = AuvikFilter.parse_value(value)[1]
+        enum = self._enum(param)
+        if negate or not enum:
+            return None
+        predicate = AuvikFilter.compile_value(value)
+        matches = [e for e in enum if predicate(e)]
+        return matches[0] if len(matches) == 1 else None
+
+    def plan(self, filters: Optional[AuvikFilter]) -> PushdownPlan:
+        """ Split filters into API parameters and a local remainder.
+        """
+        if not filters or not filters.filters:
+            return PushdownPlan({}, None)
+        params = {}
+        local = []
+        for fil in filters.filters:
+            for key, value in fil.items():
+                param = self.params.get(key)
+                server_value = None
+                if param and param['name'] not in params:
+                    server_value = self._server_value(param, value)
+                if server_value is None:
+                    local.append({key: value})
+                else:
+                    params[param['name']] = server_value
+        if params:
+            self.log.debug(f"Pushed down {params}, {len(local)} local filters")
+        return PushdownPlan(params, AuvikFilter(local) if local else None)
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+# vim: noai:et:tw=80:ts=4:ss=4:sts=4:sw=4:ft=python
+
+'''
+Title:              ratelimit.py
+Description:        Rate limiting and retries for the Auvik API clients
+Author:             Ricky Laney
+Version:            0.1.0
+'''
+import asyncio
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+import logging
+import random
+import threading
+import time
+from typing import Callable, Mapping, Optional
+
+__all__ = [
+    'TokenBucket',
+    'RetryBudget',
+    'RequestScheduler',
+]
+
+
+class TokenBucket:
+    """ Thread safe token bucket with an adaptive rate.
+
+    The rate is cut in half when the API throttles us and slowly grows back
+    to max_rate while requests succeed, so the bucket settles just under the
+    API's real limit.  A bucket without a rate lets every request through
+    until set_max_rate() gives it one; pauses still apply.
+
+    :param:float: rate = requests per second allowed at most, None for no
+        limit.
+    :param:int: burst = requests allowed at once (defaults to the rate).
+    :param:float: min_rate = the rate is never cut below this.
+    :param:callable: clock = monotonic seconds, swapped out by the tests.
+    """
+
+    def __init__(self, rate: Optional[float]=None, burst: int=None,
+                 min_rate: float=0.5,
+                 clock: Callable[[], float]=time.monotonic) -> None:
+        self.max_rate = None
+        self.rate = None
+        self.min_rate = float(min_rate)
+        self._burst = burst
+        self.burst = burst or 1
+        self.tokens = float(self.burst)
+        self._clock = clock
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        if rate:
+            self._set_rate(float(rate))
+            self.rate = self.max_rate
+            self.tokens = float(self.burst)
+
+    def _set_rate(self, rate: float) -> None:
+        # Caller holds the lock or is __init__
+        self.max_rate = max(self.min_rate, rate)
+        if self._burst is None:
+            self.burst = max(1, int(self.max_rate))
+            self.tokens = min(self.tokens, self.burst)
+
+    def reserve(self) -> float:
+        """ Take a token and return the seconds to wait before using it.
+        """
+        with self._lock:
+            now = self._clock()
+            paused = self._paused_until - now
+            if self.rate is None:
+                self._updated = now
+                return max(0.0, paused)
+            elapsed = now - self._updated
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self._updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, paused)
+
+    def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """ Hold every caller for seconds, e.g. from a Retry-After header.
+        """
+        with self._lock:
+            until = self._clock() + seconds
+            self._paused_until = max(self._paused_until, until)
+
+    def set_max_rate(self, rate: float) -> None:
+        """ Move the ceiling the rate grows back to, cutting the current
+        rate when it is above the new ceiling.  A bucket without a rate
+        starts limiting at the new ceiling.
+        """
+        with self._lock:
+            self._set_rate(float(rate))
+            if self.rate is None:
+                self.tokens = float(self.burst)
+                self._updated = self._clock()
+                self.rate = self.max_rate
+            else:
+                self.rate = min(self.rate, self.max_rate)
+
+    def throttle(self) -> None:
+        with self._lock:
+            if self.rate is not None:
+                self.rate = max(self.min_rate, self.rate / 2)
+
+    def recover(self) -> None:
+        with self._lock:
+            if self.rate is not None and self.rate < self.max_rate:
+                step = self.max_rate / 20
+                self.rate = min(self.max_rate, self.rate + step)
+
+
+class RetryBudget:
+    """ Retries allowed across all requests of a client.
+
+    Every retry spends a token and every success earns back ratio of a
+    token, so retries stay a small fraction of the traffic and a failing API
+    is not hammered by every worker at once.
+
+    :param:int: budget = tokens available at start and at most.
+    :param:float: ratio = tokens earned per successful request.
+    """
+
+    def __init__(self, budget: int=50, ratio: float=0.1) -> None:
+        self.budget = float(budget)
+        self.tokens = float(budget)
+        self.ratio = ratio
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self.tokens = min(self.budget, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class RequestScheduler:
+    """ Paces requests and decides when and how long to wait for a retry.
+
+    Both the sync and async AuvikAPI clients call wait() before every
+    request, success() after a good response and retry_delay() after a
+    failure, sleeping for the returned delay or giving up on None.
+
+    Without a configured rate requests are not paced at all until Auvik
+    pushes back.  Responses carrying X-RateLimit-Remaining and
+    X-RateLimit-Reset set the rate to what is left of the current window,
+    and every worker waits for the reset once nothing is left.  A 429 with
+    no rate known yet starts pacing at THROTTLED_RATE.  A configured rate
+    paces from the start and caps the derived one.
+
+    :param:float: rate = requests per second allowed at most, None to
+        follow the rate limit headers.
+    :param:int: burst = requests allowed at once.
+    :param:int: max_retries = retries allowed for a single request.
+    :param:int: retry_budget = retries allowed across all requests.
+    :param:float: backoff_base = first backoff in seconds.
+    :param:float: backoff_max = longest backoff in seconds.
+    :param:callable: clock = monotonic seconds for the token bucket.
+    """
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    # Rate assumed when Auvik throttles before telling us its limit
+    THROTTLED_RATE = 10
+    DEFAULT_MAX_RETRIES = 5
+    DEFAULT_RETRY_BUDGET = 50
+    REMAINING_HEADER = 'X-RateLimit-Remaining'
+    RESET_HEADER = 'X-RateLimit-Reset'
+
+    def __init__(self, rate: float=None, burst: int=None,
+                 max_retries: int=None, retry_budget: int=None,
+                 backoff_base: float=0.5, backoff_max: float=60.0,
+                 clock: Callable[[], float]=time.monotonic) -> None:
+        self.log = logging.getLogger('auvik.ratelimit')
+        self.rate_cap = float(rate) if rate else None
+        self.bucket = TokenBucket(rate, burst, clock=clock)
+        self.budget = RetryBudget(
+            self.DEFAULT_RETRY_BUDGET if retry_budget is None
+            else retry_budget
+        )
+        self.max_retries = self.DEFAULT_MAX_RETRIES if max_retries is None \
+            else max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries = 0
+
+    def wait(self) -> None:
+        self.bucket.acquire()
+
+    async def wait_async(self) -> None:
+        await self.bucket.acquire_async()
+
+    def success(self, headers: Mapping[str, str]=None) -> None:
+        if headers:
+            self.observe(headers)
+        self.bucket.recover()
+        self.budget.deposit()
+
+    @staticmethod
+    def parse_reset(reset: Optional[str],
+                    now: float=None) -> Optional[float]:
+        """ Seconds until the rate limit window resets, from either a number
+        of seconds or an epoch timestamp.
+        """
+        try:
+            reset = float(reset)
+        except (TypeError, ValueError):
+            return None
+        if reset > 1e9:
+            reset -= time.time() if now is None else now
+        return max(0.0, reset)
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """ Follow the rate limit headers of a response.
+        """
+        try:
+            remaining = float(headers.get(self.REMAINING_HEADER))
+        except (TypeError, ValueError):
+            return
+        reset = self.parse_reset(headers.get(self.RESET_HEADER))
+        if reset is None:
+            return
+        if remaining < 1:
+            self.log.debug(f"Rate limit window spent, waiting {reset:.2f}s")
+            self.bucket.pause(reset)
+            return
+        if reset > 0:
+            rate = remaining / reset
+            if self.rate_cap:
+                rate = min(rate, self.rate_cap)
+            self.bucket.set_max_rate(rate)
+
+    @staticmethod
+    def parse_retry_after(retry_after: Optional[str],
+                          now: float=None) -> Optional[float]:
+        """ Seconds to wait from a Retry-After header (seconds or a date).
+        """
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            when = parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        now = time.time() if now is None else now
+        return max(0.0, when.timestamp() - now)
+
+    def backoff(self, attempt: int) -> float:
+        """ Full jitter exponential backoff.
+        """
+        cap = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return random.uniform(0, cap)
+
+    def retry_delay(self, status: Optional[int], attempt: int,
+                    retry_after: str=None) -> Optional[float]:
+        """ Seconds to wait before retrying or None to give up.
+        A status of None means the request failed to connect.
+        """
+        if status is not None and status not in self.RETRY_STATUSES:
+            return None
+        if status == 429:
+            if self.bucket.rate is None:
+                self.bucket.set_max_rate(self.THROTTLED_RATE)
+            self.bucket.throttle()
+            self.log.debug(f"Throttled, rate now {self.bucket.rate:.2f}/s")
+        if attempt >= self.max_retries or not self.budget.withdraw():
+            self.log.debug(f"Giving up after {attempt} retries")
+            return None
+        delay = self.parse_retry_after(retry_after)
+        if delay is not None:
+            # Hold every worker, not just this one
+            self.bucket.pause(delay)
+        else:
+            delay = self.backoff(attempt)
+        self.retries += 1
+        self.log.debug(f"Retry {attempt + 1} for status {status} in "
+                       f"{delay:.2f}s")
+        return delay
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# vim: noai:et:tw=80:ts=4:ss=4:sts=4:sw=4:ft=python
+
+'''
+Title:              render.py
+Description:        Streaming table, CSV and TSV output of Auvik devices
+Author:             Ricky Laney
+Version:            0.1.0
+'''
+import csv
+from itertools import chain, islice
+import sys
+from typing import (
+    IO,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+from src.auvik.data import AuvikDeviceData
+
+__all__ = ['TableRenderer']
+
+
+class TableRenderer:
+    """ Write devices as rows while they arrive.
+
+    In 'table' mode the column widths come from widths (a fixed schema) or
+    from the first sample rows, which are the only rows ever buffered.
+    Longer values in later rows are cut to the column width.  'csv' and
+    'tsv' modes write every row straight away.
+
+    Columns default to the fields loaded on the first device.  Lists are
+    shown as their length in a table and joined with ';' in CSV/TSV.
+
+    :param:list: columns = fields to show, in order.
+    :param:str: mode = 'table', 'csv' or 'tsv'.
+    :param:dict: widths = fixed width per column, skips sampling.
+    :param:int: sample = rows used to size the columns.
+    :param:int: max_width = widest a sampled column gets.
+    :param:file: out = stream written to, defaults to stdout.
+    """
+    MODES = ('table', 'csv', 'tsv')
+    DEFAULT_SAMPLE = 100
+    DEFAULT_MAX_WIDTH = 40
+
+    def __init__(self, columns: Sequence[str]=None, mode: str='table',
+                 widths: Dict[str, int]=None, sample: int=DEFAULT_SAMPLE,
+                 max_width: int=DEFAULT_MAX_WIDTH, out: IO[str]=None) -> None:
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid table mode: {mode}")
+        self.columns = list(columns) if columns else None
+        self.mode = mode
+        self.widths = dict(widths or {})
+        self.sample = max(int(sample), 1)
+        self.max_width = max_width
+        self.out = out or sys.stdout
+
+    @staticmethod
+    def _value(device: Union[AuvikDeviceData, dict], column: str) -> Any:
+        if isinstance(device, dict):
+            if 'item' in device:
+                device = device['item']
+            return device.get(column)
+        return getattr(device, column, None)
+
+    @staticmethod
+    def _columns(device: Union[AuvikDeviceData, dict]) -> List[str]:
+        if isinstance(device, dict):
+            return list(device.get('item', device))
+        return list(device._fields())
+
+    def _cells(self, device: Union[AuvikDeviceData, dict],
+               columns: List[str]) -> List[str]:
+        cells = []
+        for column in columns:
+            value = self._value(device, column)
+            if value is None:
+                value = ''
+            elif isinstance(value, (list, tuple)):
+                value = len(value) if self.mode == 'table' else \
+                    ';'.join(str(v) for v in value)
+            cells.append(str(value))
+        return cells
+
+    def render(self, devices: Iterable[Union[AuvikDeviceData, dict]]) -> int:
+        """ Write devices to out and return the number of rows written.
+        An empty iterable writes only a header, and only if columns is set.
+        """
+        devices = iter(devices)
+        columns = self.columns
+        if columns is None:
+            first = next(devices, None)
+            if first is None:
+                return 0
+            columns = self._columns(first)
+            devices = chain([first], devices)
+        rows = (self._cells(device, columns) for device in devices)
+        if self.mode == 'table':
+            return self._render_table(columns, rows)
+        delimiter = '\t' if self.mode == 'tsv' else ','
+        writer = csv.writer(self.out, delimiter=delimiter,
+                            lineterminator='\n')
+        writer.writerow(columns)
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        return count
+
+    def _render_table(self, columns: List[str],
+                      rows: Iterator[List[str]]) -> int:
+        head = []
+        if not all(column in self.widths for column in columns):
+            head = list(islice(rows, self.sample))
+        widths = []
+        for pos, column in enumerate(columns):
+            width = self.widths.get(column)
+            if width is None:
+                width = max([len(column)] + [len(row[pos]) for row in head])
+                width = min(width, max(self.max_width, len(column)))
+            widths.append(width)
+        border = '+' + '+'.join('-' * (w + 2) for w in widths) + '+\n'
+        write = self.out.write
+        write(border)
+        write(self._line(columns, widths))
+        write(border)
+        count = 0
+        for row in chain(head, rows):
+            write(self._line(row, widths))
+            count += 1
+        write(border)
+        return count
+
+    @staticmethod
+    def _line(cells: List[str], widths: List[int]) -> str:
+        parts = []
+        for cell, width in zip(cells, widths):
+            if len(cell) > width:
+                cell = cell[:width - 1] + '~'
+            parts.append(cell.ljust(width))
+        return '| ' + ' | '.join(parts) + ' |\n'
@@ -8,14 +8,10 @@ Author:             Ricky Laney
 Version:            0.1.0
 '''
 import json
+import logging
 import os
-from typing import Union
-from src.auvik.constants import (
-    ALL_DEVICE_TYPES,
-    NET_DEVICE_TYPES,
-    INTERFACE_TYPES,
-    NETWORK_TYPES,
-)
+import threading
+from typing import Dict, List, Optional
 from src.constants import PRJ_DIR
 from src.exceptions import IEAutomationAuvikSpecError
 
@@ -24,73 +20,256 @@ AUVIK_SPEC = os.path.join(PRJ_DIR, 'docs/auvik_api_spec.json')
 
 class AuvikSpec:
     """ Auvik's OpenAPI spec class for filtering and validation
+
+    The spec is compiled once into indexes of paths, tags, operation ids and
+    parameters by name and location per path and operation.  The compiled
+    form is shared by every AuvikSpec instance and, when cache_file is
+    given, stamped with the spec file's size and mtime and written there,
+    so the full spec is only parsed again when it changes.
+
+    Lookups default to the 'get' operation of a path.
     """
+    # Locations param() looks a name up in when none is given, in order
+    PARAM_LOCATIONS = ('query', 'path', 'header', 'cookie')
+    # Bump when the compiled layout changes
+    VERSION = 1
+    # Compiled specs by spec file, shared across instances
+    _compiled = {}
+    _raw = {}
+    _lock = threading.Lock()
 
-    def __init__(self, spec_file=AUVIK_SPEC) -> None:
+    def __init__(self, spec_file=AUVIK_SPEC,
+                 cache_file: Optional[str]=None) -> None:
+        self.log = logging.getLogger('auvik.spec')
         self.spec_file = spec_file
-        self.spec = self.load_spec()
-        self.server_url = self.spec['servers'][0]['url']
+        self.cache_file = cache_file
+
+    @property
+    def compiled(self) -> dict:
+        compiled = self._compiled.get(self.spec_file)
+        if compiled is None:
+            with self._lock:
+                compiled = self._compiled.get(self.spec_file)
+                if compiled is None:
+                    compiled = self._load_compiled()
+                    self._compiled[self.spec_file] = compiled
+        return compiled
 
-    def load_spec(self) -> None:
+    @property
+    def spec(self) -> dict:
+        """ The full OpenAPI spec, parsed on first use.
+        """
+        raw = self._raw.get(self.spec_file)
+        if raw is None:
+            raw = self._raw[self.spec_file] = self.load_spec()
+        return raw
+
+    def load_spec(self) -> dict:
         """ Loads the OpenAPI spec
         """
         if not os.path.isfile(self.spec_file):
-            raise IEAutomationAuvikSpecError(f"Not a valid spec file: {spec_file}")
+            raise IEAutomationAuvikSpecError(
+                f"Not a valid spec file: {self.spec_file}"
+            )
         with open(self.spec_file) as sf:
             spec = json.load(sf)
         return spec
 
+    def _stamp(self) -> dict:
+        if not os.path.isfile(self.spec_file):
+            raise IEAutomationAuvikSpecError(
+                f"Not a valid spec file: {self.spec_file}"
+            )
+        stat = os.stat(self.spec_file)
+        return {
+            'version': self.VERSION,
+            'source': os.path.abspath(self.spec_file),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+        }
+
+    def _load_compiled(self) -> dict:
+        stamp = self._stamp()
+        if self.cache_file and os.path.isfile(self.cache_file):
+            try:
+                with open(self.cache_file) as cf:
+                    cached = json.load(cf)
+                if cached.get('stamp') == stamp:
+                    return self._index(cached)
+            except (OSError, ValueError, KeyError):
+                pass
+        compiled = self.compile(self.spec)
+        compiled['stamp'] = stamp
+        if self.cache_file:
+            try:
+                directory = os.path.dirname(os.path.abspath(self.cache_file))
+                os.makedirs(directory, exist_ok=True)
+                tmp_file = f"{self.cache_file}.tmp"
+                with open(tmp_file, 'w') as cf:
+                    json.dump(compiled, cf, separators=(',', ':'))
+                os.replace(tmp_file, self.cache_file)
+            except OSError as e:
+                self.log.debug(f"Unable to cache compiled spec: {e}")
+        return self._index(compiled)
+
+    @staticmethod
+    def _resolve(spec: dict, schema: dict) -> dict:
+        ref = schema.get('$ref') if isinstance(schema, dict) else None
+        if not ref:
+            return schema
+        # '#/components/schemas/DeviceTypeSchema'
+        for part in ref.lstrip('#/').split('/'):
+            spec = spec[part]
+        return spec
+
+    @classmethod
+    def compile(cls, spec: dict) -> dict:
+        """ Compact form of spec with only what lookups need.
+        Parameter schemas are resolved, so enums are available inline.
+        """
+        paths = {}
+        for path, item in spec['paths'].items():
+            shared = item.get('parameters', [])
+            operations = {}
+            for method, op in item.items():
+                if not isinstance(op, dict) or method == 'parameters':
+                    continue
+                params = []
+                for param in shared + op.get('parameters', []):
+                    param = cls._resolve(spec, param)
+                    param = dict(param)
+                    if 'schema' in param:
+                        param['schema'] = cls._resolve(spec, param['schema'])
+                    params.append(param)
+                operations[method] = {
+                    'operationId': op.get('operationId'),
+                    'tags': op.get('tags', []),
+                    'parameters': params,
+                }
+            paths[path] = operations
+        return {
+            'server_url': spec['servers'][0]['url'],
+            'tags': [tag['name'] for tag in spec.get('tags', [])],
+            'paths': paths,
+        }
+
+    @staticmethod
+    def _index(compiled: dict) -> dict:
+        """ Add the lookup indexes to a compiled spec.
+        """
+        tag_paths = {tag: [] for tag in compiled['tags']}
+        operation_ids = {}
+        for path, operations in compiled['paths'].items():
+            for method, op in operations.items():
+                # Parameters by (name, location) and by location, the same
+                # name may be both a query and a path parameter
+                op['by_name'] = {(p['name'], p['in']): p
+                                 for p in op['parameters']}
+                by_in = {}
+                for param in op['parameters']:
+                    by_in.setdefault(param['in'], []).append(param)
+                op['by_in'] = by_in
+                op['required'] = [p for p in op['parameters']
+                                  if p.get('required') in (True, 'true')]
+                for tag in op['tags']:
+                    paths = tag_paths.setdefault(tag, [])
+                    if path not in paths:
+                        paths.append(path)
+                if op['operationId']:
+                    operation_ids[op['operationId']] = (path, method)
+        compiled['tag_set'] = set(compiled['tags'])
+        compiled['tag_paths'] = tag_paths
+        compiled['operation_ids'] = operation_ids
+        return compiled
+
+    @property
+    def server_url(self) -> str:
+        return self.compiled['server_url']
+
     @property
     def paths(self) -> list:
-        return [k for k in self.spec['paths'].keys()]
+        return list(self.compiled['paths'])
 
     @property
     def tags(self) -> list:
-        return [k['name'] for k in self.spec['tags']]
+        return list(self.compiled['tags'])
 
-    def _check_path(self, path: str) -> Union[None, IEAutomationSpecError]:
-        if path not in self.paths:
+    def _check_path(self, path: str) -> None:
+        if path not in self.compiled['paths']:
             raise IEAutomationAuvikSpecError(f"Invalid path: {path}")
 
-    def _check_tag(self, tag: str) -> Union[None, IEAutomationSpecError]:
-        if tag not in self.tags:
+    def _check_tag(self, tag: str) -> None:
+        if tag not in self.compiled['tag_set']:
             raise IEAutomationAuvikSpecError(f"Invalid tag: {tag}")
 
+    def _operation(self, path: str, method: str='get') -> dict:
+        self._check_path(path)
+        try:
+            return self.compiled['paths'][path][method]
+        except KeyError:
+            raise IEAutomationAuvikSpecError(
+                f"No {method.upper()} operation for path: {path}"
+            )
+
+    def path_methods(self, path: str) -> List[str]:
+        self._check_path(path)
+        return list(self.compiled['paths'][path])
+
     def paths_by_tag(self, tag: str) -> list:
         """ Get a list of URL paths for specific tag
         """
         self._check_tag(tag)
-        return [k for k,v in self.spec['paths'].items() \
-                if tag in v['get']['tags']]
+        return list(self.compiled['tag_paths'][tag])
 
-    def path_operation_id(self, path: str) -> str:
-        self._check_path(path)
-        return self.spec['paths'][path]['get']['operationId']
+    def path_operation_id(self, path: str, method: str='get') -> str:
+        return self._operation(path, method)['operationId']
+
+    def path_by_operation_id(self, operation_id: str) -> str:
+        try:
+            return self.compiled['operation_ids'][operation_id][0]
+        except KeyError:
+            raise IEAutomationAuvikSpecError(
+                f"Invalid operation id: {operation_id}"
+            )
 
-    def path_params(self, path: str) -> list:
+    def path_params(self, path: str, method: str='get') -> list:
         """ Get a list of parameters for a URL path
         """
-        self._check_path(path)
-        return [p for p in self.spec['paths'][path]['get']['parameters']]
+        return list(self._operation(path, method)['parameters'])
+
+    def param(self, path: str, name: str, method: str='get',
+              location: str=None) -> Optional[dict]:
+        """ Get a single parameter of a URL path by name and location
+        ('query', 'path', ...), or by name in PARAM_LOCATIONS order
+        """
+        by_name = self._operation(path, method)['by_name']
+        if location:
+            return by_name.get((name, location))
+        for location in self.PARAM_LOCATIONS:
+            param = by_name.get((name, location))
+            if param is not None:
+                return param
+        return None
 
-    def required_path_params(self, path: str) -> list:
+    def required_path_params(self, path: str, method: str='get') -> list:
         """ Get a list of required parameters for a URL path
         """
-        self._check_path(path)
-        return [p for p in self.path_params(path) \
-                if p['required'] == 'true']
+        return list(self._operation(path, method)['required'])
 
-    def query_path_params(self, path: str) -> list:
+    def query_path_params(self, path: str, method: str='get') -> list:
         """ Get a list of query parameters for a URL path
         """
-        self._check_path(path)
-        return [p for p in self.path_params(path) \
-                if p['in'] == 'query']
+        return list(self._operation(path, method)['by_in'].get('query', ()))
 
-    def path_only_params(self, path: str) -> list:
-        """ Get a list of query parameters for a URL path
+    def path_only_params(self, path: str, method: str='get') -> list:
+        """ Get a list of path parameters for a URL path
         """
-        self._check_path(path)
-        return [p for p in self.path_params(path) \
-                if p['in'] == 'path']
+        return list(self._operation(path, method)['by_in'].get('path', ()))
 
+    @classmethod
+    def clear_cache(cls) -> None:
+        """ Forget the compiled and raw specs shared by instances.
+        """
+        with cls._lock:
+            cls._compiled.clear()
+            cls._raw.clear()
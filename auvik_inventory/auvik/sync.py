@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+# vim: noai:et:tw=80:ts=4:ss=4:sts=4:sw=4:ft=python
+
+'''
+Title:              sync.py
+Description:        Incremental inventory sync for AuvikAPI
+Author:             Ricky Laney
+Version:            0.1.0
+'''
+from datetime import datetime, timedelta, timezone
+import json
+import logging
+import os
+import time
+from typing import (
+    List,
+    Optional,
+    Union,
+)
+
+# Typing shortcuts
+UsP = Union[str, os.PathLike]
+Usl = Union[str, list]
+
+__all__ = [
+    'AuvikSnapshot',
+    'AuvikInventorySync',
+]
+
+# Auvik formats every timestamp as YYYY-MM-DDTHH:MM:SS.sssZ, which sorts
+# lexically in time order.
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+
+def auvik_time(dt: datetime) -> str:
+    """ Format a datetime the way the Auvik API expects it.
+    """
+    return dt.astimezone(timezone.utc).strftime(TIME_FORMAT)[:-4] + 'Z'
+
+
+class AuvikSnapshot:
+    """ Local snapshot of Auvik records kept per collection and tenant.
+
+    Each tenant keeps its records by id along with a high-water mark (the
+    newest 'lastModified' seen) and the time of its last full pull.
+
+    :param:str: snapshot_file = JSON file the snapshot is persisted to.
+    """
+    VERSION = 1
+
+    def __init__(self, snapshot_file: UsP) -> None:
+        self.snapshot_file = snapshot_file
+        self.collections = {}
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.isfile(self.snapshot_file):
+            return
+        with open(self.snapshot_file) as sf:
+            snapshot = json.load(sf)
+        # Start over if the file was written by another version
+        if snapshot.get('version') == self.VERSION:
+            self.collections = snapshot['collections']
+
+    def save(self) -> None:
+        """ Atomically write the snapshot to disk.
+        """
+        snapshot = {'version': self.VERSION, 'collections': self.collections}
+        directory = os.path.dirname(os.path.abspath(self.snapshot_file))
+        os.makedirs(directory, exist_ok=True)
+        tmp_file = f"{self.snapshot_file}.tmp"
+        with open(tmp_file, 'w') as sf:
+            json.dump(snapshot, sf)
+        os.replace(tmp_file, self.snapshot_file)
+
+    def tenant(self, collection: str, tenant_id: str) -> dict:
+        """ Get (creating if needed) the state of a tenant in a collection.
+        """
+        tenants = self.collections.setdefault(collection, {})
+        return tenants.setdefault(tenant_id, {
+            'high_water': None,
+            'last_full': None,
+            'records': {},
+        })
+
+    def records(self, collection: str, tenant_ids: List[str]) -> List[dict]:
+        records = []
+        for tenant_id in tenant_ids:
+            records.extend(self.tenant(collection, tenant_id)['records'].values())
+        return records
+
+
+class AuvikInventorySync:
+    """ Keep an AuvikSnapshot up to date with as few requests as possible.
+
+    Every sync only asks for records modified after the tenant's high-water
+    mark using filter[modifiedAfter].  Every full_interval seconds a full pull
+    replaces the tenant's records to catch deletions.  When stale_after is
+    set, devices not seen online for that many seconds are dropped using
+    filter[notSeenSince].
+
+    :param:AuvikAPI: api = client used to page through the collections.
+    :param:str: snapshot_file = JSON file the snapshot is persisted to.
+    :param:int: full_interval = seconds between full pulls per tenant.
+    :param:int: stale_after = seconds a device may stay unseen (optional).
+    """
+    COLLECTIONS = {
+        'devices': '/inventory/device/info',
+        'networks': '/inventory/network/info',
+        'interfaces': '/inventory/interface/info',
+        'components': '/inventory/component/info',
+    }
+    # Collections whose endpoint supports filter[notSeenSince]
+    SEEN_COLLECTIONS = ['devices']
+    DEFAULT_FULL_INTERVAL = 24 * 60 * 60
+
+    def __init__(self, api: object, snapshot_file: UsP,
+                 full_interval: int=None, stale_after: int=None) -> None:
+        self.log = logging.getLogger('auvik.sync')
+        self.api = api
+        self.snapshot = AuvikSnapshot(snapshot_file)
+        self.full_interval = full_interval or self.DEFAULT_FULL_INTERVAL
+        self.stale_after = stale_after
+
+    def _url(self, collection: str, tenant_id: str, **filters) -> str:
+        try:
+            path = self.COLLECTIONS[collection]
+        except KeyError:
+            raise ValueError(f"Invalid collection: {collection}")
+        url = f"{path}?tenants={tenant_id}"
+        for key, val in filters.items():
+            if val:
+                url = f"{url}&filter[{key}]={val}"
+        return url
+
+    @staticmethod
+    def _high_water(records: List[dict], high_water: Optional[str]) -> str:
+        for record in records:
+            modified = record.get('attributes', {}).get('lastModified')
+            if modified and (not high_water or modified > high_water):
+                high_water = modified
+        return high_water
+
+    def sync_tenant(self, collection: str, tenant_id: str,
+                    full: bool=False) -> dict:
+        """ Bring a single tenant of a collection up to date.
+        Returns the tenant state from the snapshot.
+        """
+        state = self.snapshot.tenant(collection, tenant_id)
+        started = time.time()
+        full_due = not state['last_full'] or \
+            started - state['last_full'] >= self.full_interval
+        if full or full_due or not state['high_water']:
+            url = self._url(collection, tenant_id)
+            records = list(self.api.iter_records(url))
+            # Replacing the records drops anything deleted upstream
+            state['records'] = {r['id']: r for r in records}
+            state['last_full'] = started
+            self.log.debug(f"Full {collection} pull for {tenant_id} "
+                           f"found {len(records)} records")
+        else:
+            url = self._url(collection, tenant_id,
+                            modifiedAfter=state['high_water'])
+            records = list(self.api.iter_records(url))
+            state['records'].update((r['id'], r) for r in records)
+            self.log.debug(f"Incremental {collection} pull for {tenant_id} "
+                           f"found {len(records)} records")
+        state['high_water'] = self._high_water(records, state['high_water'])
+        if self.stale_after and collection in self.SEEN_COLLECTIONS:
+            self._prune_stale(collection, tenant_id, state)
+        return state
+
+    def _prune_stale(self, collection: str, tenant_id: str,
+                     state: dict) -> None:
+        cutoff = datetime.now(timezone.utc) - \
+            timedelta(seconds=self.stale_after)
+        url = self._url(collection, tenant_id, notSeenSince=auvik_time(cutoff))
+        stale = [r['id'] for r in self.api.iter_records(url)]
+        for record_id in stale:
+            state['records'].pop(record_id, None)
+        self.log.debug(f"Pruned {len(stale)} stale {collection} "
+                       f"for {tenant_id}")
+
+    def sync(self, collection: str='devices', tenants: Usl=None,
+             tenant_ids: Usl=None, full: bool=False) -> List[dict]:
+        """ Sync a collection for one or more tenants and save the snapshot.
+        Returns the merged records of all requested tenants.  Every tenant
+        name must resolve, a typo would otherwise silently shrink the sync.
+        """
+        ids = self.api.resolve_tenant_ids(tenants, tenant_ids, strict=True)
+        for tenant_id in ids:
+            self.sync_tenant(collection, tenant_id, full=full)
+        self.snapshot.save()
+        return self.snapshot.records(collection, ids)
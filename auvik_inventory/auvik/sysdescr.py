@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+# vim: noai:et:tw=80:ts=4:ss=4:sts=4:sw=4:ft=python
+
+'''
+Title:              sysdescr.py
+Description:        Memoized sysDescr classification for Auvik devices
+Author:             Ricky Laney
+Version:            0.1.0
+'''
+import atexit
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+from sys import intern
+import threading
+from typing import (
+    NamedTuple,
+    Optional,
+    Union,
+)
+from src.constants import NET_DEVICE_MAPPER
+
+# Typing shortcuts
+UsP = Union[str, os.PathLike]
+
+__all__ = [
+    'SysDescr',
+    'SysDescrCache',
+    'sysdescr_cache',
+]
+
+
+def _shared(value: Optional[str]) -> Optional[str]:
+    return intern(value) if isinstance(value, str) else value
+
+
+class SysDescr(NamedTuple):
+    """ Classification of a sysDescr string.
+    nd_type is the NET_DEVICE_MAPPER entry for os or None if not mapped.
+    """
+    os: Optional[str]
+    model: Optional[str]
+    version: Optional[str]
+    nd_type: Optional[str]
+
+
+class SysDescrCache:
+    """ Bounded LRU of sysDescr classifications keyed by description.
+
+    Large estates repeat a handful of descriptions across thousands of
+    devices, so sysdescrparser and the NET_DEVICE_MAPPER lookup only run
+    once per distinct description.  When cache_file is set the entries are
+    loaded from it and saved back at exit (or by save()) so they survive
+    restarts.  The file is stamped with the layout version, a hash of
+    NET_DEVICE_MAPPER and the sysdescrparser version, and is ignored when
+    any of them changed since it was written.
+
+    :param:int: maxsize = most descriptions kept in memory.
+    :param:str: cache_file = JSON file the entries are persisted to.
+    """
+    # Bump when the cached layout changes
+    VERSION = 2
+    DEFAULT_MAXSIZE = 4096
+
+    def __init__(self, maxsize: int=None, cache_file: UsP=None) -> None:
+        self.log = logging.getLogger('auvik.sysdescr')
+        self.maxsize = maxsize or self.DEFAULT_MAXSIZE
+        self.cache_file = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._dirty = False
+        self._at_exit = False
+        if cache_file:
+            self.configure(cache_file=cache_file)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def configure(self, maxsize: int=None, cache_file: UsP=None) -> None:
+        """ Resize the cache and/or attach a persistent file.
+        """
+        with self._lock:
+            if maxsize:
+                self.maxsize = int(maxsize)
+                self._trim()
+        if cache_file:
+            self.cache_file = cache_file
+            self.load()
+            if not self._at_exit:
+                atexit.register(self.save)
+                self._at_exit = True
+
+    @staticmethod
+    def parse(description: str) -> SysDescr:
+        # Imported on first miss, most runs hit the persisted entries
+        from sysdescrparser import sysdescrparser
+        sys = sysdescrparser(description)
+        return SysDescr(
+            _shared(sys.os),
+            _shared(sys.model),
+            _shared(sys.version),
+            NET_DEVICE_MAPPER.get(sys.os),
+        )
+
+    def classify(self, description: str) -> SysDescr:
+        """ Classification of description, parsed at most once while cached.
+        """
+        with self._lock:
+            entry = self._entries.get(description)
+            if entry is not None:
+                self._entries.move_to_end(description)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        # Parse outside the lock, a duplicate parse is harmless
+        entry = self.parse(description)
+        with self._lock:
+            self._entries[description] = entry
+            self._dirty = True
+            self._trim()
+        return entry
+
+    def _trim(self) -> None:
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    @property
+    def stamp(self) -> dict:
+        """ What the persisted classifications depend on.
+        """
+        if self._stamp is None:
+            from importlib.metadata import PackageNotFoundError, version
+            try:
+                parser = version('sysdescrparser')
+            except PackageNotFoundError:
+                parser = None
+            mapper = json.dumps(NET_DEVICE_MAPPER, sort_keys=True, default=str)
+            self._stamp = {
+                'version': self.VERSION,
+                'mapper': hashlib.sha1(mapper.encode()).hexdigest(),
+                'sysdescrparser': parser,
+            }
+        return self._stamp
+
+    def load(self) -> None:
+        if not self.cache_file or not os.path.isfile(self.cache_file):
+            return
+        try:
+            with open(self.cache_file) as cf:
+                stored = json.load(cf)
+        except (OSError, ValueError) as err:
+            self.log.warning(f"Ignoring sysDescr cache {self.cache_file}: {err}")
+            return
+        # Start over if the file was written by another version or mapper
+        if stored.get('stamp') != self.stamp:
+            self.log.debug(f"Discarding stale sysDescr cache {self.cache_file}")
+            return
+        with self._lock:
+            for description, entry in stored['entries']:
+                if description not in self._entries:
+                    self._entries[description] = SysDescr(
+                        *(_shared(value) for value in entry)
+                    )
+            self._trim()
+        self.log.debug(f"Loaded {len(self)} sysDescr entries")
+
+    def save(self) -> None:
+        """ Atomically write the entries to cache_file, if set and changed.
+        """
+        if not self.cache_file or not self._dirty:
+            return
+        with self._lock:
+            entries = [[description, list(entry)] for description, entry
+                       in self._entries.items()]
+            self._dirty = False
+        try:
+            directory = os.path.dirname(os.path.abspath(self.cache_file))
+            os.makedirs(directory, exist_ok=True)
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, 'w') as cf:
+                json.dump({'stamp': self.stamp, 'entries': entries}, cf)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as err:
+            self.log.warning(f"Unable to save sysDescr cache "
+                             f"{self.cache_file}: {err}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self),
+            "maxsize": self.maxsize,
+        }
+
+
+# Shared by every AuvikDeviceData
+sysdescr_cache = SysDescrCache()
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+# vim: noai:et:tw=80:ts=4:ss=4:sts=4:sw=4:ft=python
+
+'''
+Title:              table.py
+Description:        Columnar container for large Auvik inventories
+Author:             Ricky Laney
+Version:            0.1.0
+'''
+from array import array
+from collections import Counter
+from itertools import compress
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Union,
+)
+from src.auvik.data import AuvikDeviceData
+from src.auvik.filters import AuvikFilter
+
+# Typing shortcuts
+Column = Union['DeviceColumn', 'PlainColumn']
+
+__all__ = [
+    'DeviceColumn',
+    'DeviceTable',
+    'PlainColumn',
+]
+
+
+class DeviceColumn:
+    """ Dictionary encoded column for fields with few distinct values.
+
+    Every distinct value is stored once in values and each row only keeps
+    a small integer code, so predicates run once per distinct value instead
+    of once per device.
+    """
+    __slots__ = ('values', 'index', 'codes')
+
+    def __init__(self, values: List[Any]=None, index: Dict[Any, int]=None,
+                 codes: array=None) -> None:
+        self.values = values if values is not None else []
+        self.index = index if index is not None else {}
+        self.codes = codes if codes is not None else array('I')
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, row: int) -> Any:
+        return self.values[self.codes[row]]
+
+    def __iter__(self) -> Iterator[Any]:
+        values = self.values
+        return (values[code] for code in self.codes)
+
+    def append(self, value: Any) -> None:
+        if isinstance(value, list):
+            value = tuple(value)
+        code = self.index.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.index[value] = code
+        self.codes.append(code)
+
+    def take(self, rows: Iterable[int]) -> 'DeviceColumn':
+        """ New column with the given rows, sharing the dictionary.
+        """
+        codes = self.codes
+        return DeviceColumn(self.values, self.index,
+                            array('I', (codes[row] for row in rows)))
+
+    @property
+    def cardinality(self) -> int:
+        return len(self.values)
+
+    def mask(self, predicate: Callable[[Any], bool]) -> List[bool]:
+        """ Evaluate predicate once per distinct value and expand to rows.
+        """
+        matches = [bool(predicate(value)) for value in self.values]
+        return [matches[code] for code in self.codes]
+
+    def match(self, rows: Iterable[int],
+              predicate: Callable[[Any], bool]) -> List[int]:
+        """ The rows whose value matches, checking each code once.
+        """
+        matches = [bool(predicate(value)) for value in self.values]
+        codes = self.codes
+        return [row for row in rows if matches[codes[row]]]
+
+    def counts(self) -> Dict[Any, int]:
+        values = self.values
+        return {values[code]: count for code, count in
+                Counter(self.codes).most_common()}
+
+    def groups(self) -> Dict[Any, List[int]]:
+        """ Rows per distinct value.
+        """
+        groups = {}
+        for row, code in enumerate(self.codes):
+            groups.setdefault(code, []).append(row)
+        values = self.values
+        return {values[code]: rows for code, rows in groups.items()}
+
+
+class PlainColumn:
+    """ Column kept as a plain list of values.
+
+    Used for fields that are (nearly) unique per device, such as ids, names
+    and addresses, where a dictionary would hold every value again and
+    never save a predicate call.
+    """
+    __slots__ = ('values',)
+
+    def __init__(self, values: List[Any]=None) -> None:
+        self.values = values if values is not None else []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, row: int) -> Any:
+        return self.values[row]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.values)
+
+    def append(self, value: Any) -> None:
+        if isinstance(value, list):
+            value = tuple(value)
+        self.values.append(value)
+
+    def take(self, rows: Iterable[int]) -> 'PlainColumn':
+        values = self.values
+        return PlainColumn([values[row] for row in rows])
+
+    @property
+    def cardinality(self) -> int:
+        return len(self.values)
+
+    def mask(self, predicate: Callable[[Any], bool]) -> List[bool]:
+        return [bool(predicate(value)) for value in self.values]
+
+    def match(self, rows: Iterable[int],
+              predicate: Callable[[Any], bool]) -> List[int]:
+        values = self.values
+        return [row for row in rows if predicate(values[row])]
+
+    def counts(self) -> Dict[Any, int]:
+        return dict(Counter(self.values).most_common())
+
+    def groups(self) -> Dict[Any, List[int]]:
+        groups = {}
+        for row, value in enumerate(self.values):
+            groups.setdefault(value, []).append(row)
+        return groups
+
+
+class DeviceTable:
+    """ Columnar table of devices for whole-inventory analytics.
+
+    Fields with few distinct values (ENCODED) are stored as DeviceColumn
+    and the others as PlainColumn.  Filters and aggregations still loop
+    over the rows in Python; on encoded columns a predicate runs once per
+    distinct value rather than once per row.  Tables are immutable:
+    select, filter and take return new tables that share the column
+    dictionaries.
+
+    :param:dict: columns = column name to DeviceColumn or PlainColumn.
+    """
+    COLUMNS = (
+        '_id', 'name', 'ip', 'os', 'model', 'version', 'nd_type',
+        'device_type', 'make', 'vendor', 'software', 'serial', 'firmware',
+        'status', 'last_seen', 'last_modified', 'tenant',
+    )
+    # Columns shared by many devices, the rest are close to unique
+    ENCODED = frozenset((
+        'os', 'model', 'version', 'nd_type', 'device_type', 'make', 'vendor',
+        'software', 'firmware', 'status', 'tenant',
+    ))
+
+    def __init__(self, columns: Dict[str, Column]) -> None:
+        self._columns = columns
+        lengths = {len(col) for col in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+        self._length = lengths.pop() if lengths else 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __repr__(self) -> str:
+        return f"<DeviceTable[rows={len(self)}, columns={len(self.columns)}]>"
+
+    def __getitem__(self, name: str) -> Column:
+        try:
+            return self._columns[name]
+        except KeyError:
+            raise KeyError(f"Invalid column: {name}")
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns.keys())
+
+    @classmethod
+    def from_devices(cls, devices: Iterable[AuvikDeviceData],
+                     columns: Sequence[str]=None) -> 'DeviceTable':
+        """ Build a table from AuvikDeviceData objects in one pass.
+        """
+        columns = columns or cls.COLUMNS
+        table = {name: DeviceColumn() if name in cls.ENCODED else
+                 PlainColumn() for name in columns}
+        appenders = [(table[name].append, name) for name in columns]
+        for device in devices:
+            for append, name in appenders:
+                append(getattr(device, name, None))
+        return cls(table)
+
+    def to_devices(self) -> List[AuvikDeviceData]:
+        """ Build AuvikDeviceData objects from the rows.
+        """
+        return [AuvikDeviceData.from_fields(**row) for row in self.rows()]
+
+    def rows(self) -> Iterator[dict]:
+        names = self.columns
+        for values in zip(*self._columns.values()):
+            yield dict(zip(names, values))
+
+    def column(self, name: str) -> List[Any]:
+        return list(self[name])
+
+    def select(self, *names: str) -> 'DeviceTable':
+        """ Table with only the given columns.
+        """
+        return DeviceTable({name: self[name] for name in names})
+
+    def take(self, rows: Iterable[int]) -> 'DeviceTable':
+        rows = list(rows)
+        return DeviceTable({name: col.take(rows) for name, col in
+                            self._columns.items()})
+
+    def where(self, mask: Sequence[bool]) -> 'DeviceTable':
+        """ Table with the rows where mask is True.
+        """
+        return self.take(compress(range(len(self)), mask))
+
+    def mask(self, column: str, predicate: Callable[[Any], bool]) -> List[bool]:
+        return self[column].mask(predicate)
+
+    def filter(self, filters: Union[str, list]=None,
+               **equals: Any) -> 'DeviceTable':
+        """ Filter rows like AuvikFilter and/or by exact column values.
+
+        filters uses the AuvikFilter format ('key=val,key2=val2' or a list
+        of {key: val}) including its exact, prefix, regex and negation
+        operators.
+        """
+        conditions = []
+        if filters:
+            conditions.extend(AuvikFilter(filters).predicates)
+        for key, val in equals.items():
+            conditions.append((key, lambda v, x=val: v == x))
+        if not conditions:
+            return self
+        return self.take(self._match_rows(conditions))
+
+    def _match_rows(self, conditions: List[tuple]) -> List[int]:
+        """ Rows matching every (column, predicate) condition.
+        Columns with the fewest distinct values are checked first, so the
+        plain columns only see the rows the encoded ones kept.
+        """
+        conditions = sorted(conditions,
+                            key=lambda c: self[c[0]].cardinality)
+        rows = range(len(self))
+        for column, predicate in conditions:
+            rows = self[column].match(rows, predicate)
+        return rows
+
+    def counts(self, column: str) -> Dict[Any, int]:
+        """ Number of rows per distinct value, most common first.
+        """
+        return self[column].counts()
+
+    def group_by(self, column: str) -> Dict[Any, 'DeviceTable']:
+        """ Split the table into one table per distinct value of column.
+        """
+        return {value: self.take(rows) for value, rows in
+                self[column].groups().items()}
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# vim: noai:et:tw=80:ts=4:ss=4:sts=4:sw=4:ft=python
+
+'''
+Title:              tenants.py
+Description:        Indexed tenant directory for AuvikAPI
+Author:             Ricky Laney
+Version:            0.1.0
+'''
+from bisect import bisect_left
+import json
+import logging
+import os
+import time
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
+from src.auvik.data import AuvikTenantData
+from src.exceptions import IEAutomationAuvikAPIError
+
+# Typing shortcuts
+UsP = Union[str, os.PathLike]
+
+__all__ = ['TenantDirectory']
+
+
+class TenantDirectory:
+    """ Resolve tenant names and ids without scanning every tenant.
+
+    Tenants are indexed by id and by domainPrefix (case-insensitive) and a
+    sorted list of domains answers prefix lookups.  A name is resolved as an
+    id, then an exact domain, then a domain prefix and finally, like the old
+    lookup, any domain containing it.  Resolved names are memoized; misses
+    are not, so a directory refreshed with a new tenant finds it.
+
+    :param:list: tenants = AuvikTenantData to index.
+    :param:str: ambiguous = 'first' (API order), 'all' or 'error' when a
+                name matches several tenants.
+    :param:str: missing = 'warn', 'ignore' or 'error' when nothing matches.
+    """
+    VERSION = 1
+    AMBIGUOUS_POLICIES = ('first', 'all', 'error')
+    MISSING_POLICIES = ('warn', 'ignore', 'error')
+
+    def __init__(self, tenants: Iterable[AuvikTenantData]=(),
+                 ambiguous: str='first', missing: str='warn') -> None:
+        self.log = logging.getLogger('auvik.tenants')
+        if ambiguous not in self.AMBIGUOUS_POLICIES:
+            raise IEAutomationAuvikAPIError(
+                f"Invalid ambiguous tenant policy: {ambiguous}"
+            )
+        if missing not in self.MISSING_POLICIES:
+            raise IEAutomationAuvikAPIError(
+                f"Invalid missing tenant policy: {missing}"
+            )
+        self.ambiguous = ambiguous
+        self.missing = missing
+        self.tenants = list(tenants)
+        self.by_id = {tenant._id: tenant for tenant in self.tenants}
+        self.by_domain = {}
+        for tenant in self.tenants:
+            if tenant.domain:
+                self.by_domain.setdefault(tenant.domain.lower(), []) \
+                    .append(tenant)
+        self._domains = sorted(self.by_domain)
+        # API order, used to keep 'first' stable
+        self._order = {tenant._id: pos for pos, tenant in
+                       enumerate(self.tenants)}
+        self._resolved = {}
+        # Set by load() when the tenants came from a saved file
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self.tenants)
+
+    def __repr__(self) -> str:
+        return f"<TenantDirectory[tenants={len(self)}]>"
+
+    def prefix(self, prefix: str) -> List[AuvikTenantData]:
+        """ Tenants with a domain starting with prefix (case-insensitive).
+        """
+        prefix = prefix.lower()
+        matches = []
+        for pos in range(bisect_left(self._domains, prefix),
+                         len(self._domains)):
+            domain = self._domains[pos]
+            if not domain.startswith(prefix):
+                break
+            matches.extend(self.by_domain[domain])
+        return matches
+
+    def matches(self, name: str) -> List[AuvikTenantData]:
+        """ Every tenant matching name at the most specific level found.
+        """
+        tenant = self.by_id.get(name)
+        if tenant is not None:
+            return [tenant]
+        lowered = name.lower()
+        matches = self.by_domain.get(lowered) or self.prefix(lowered)
+        if not matches:
+            matches = [tenant for domain, tenants in self.by_domain.items()
+                       if lowered in domain for tenant in tenants]
+        return sorted(matches, key=lambda t: self._order[t._id])
+
+    def resolve(self, name: str) -> List[str]:
+        """ Tenant ids for name following the ambiguous and missing policies.
+        """
+        ids = self._resolved.get(name)
+        if ids is not None:
+            return ids
+        matches = self.matches(name)
+        if not matches:
+            message = f"No tenant found for {name}"
+            if self.missing == 'error':
+                raise IEAutomationAuvikAPIError(message)
+            if self.missing == 'warn':
+                self.log.warning(message)
+        elif len(matches) > 1:
+            domains = ', '.join(t.domain for t in matches)
+            message = f"Tenant {name} is ambiguous: {domains}"
+            if self.ambiguous == 'error':
+                raise IEAutomationAuvikAPIError(message)
+            if self.ambiguous == 'first':
+                self.log.debug(f"{message}, using {matches[0].domain}")
+                matches = matches[:1]
+        ids = [tenant._id for tenant in matches]
+        if ids:
+            self._resolved[name] = ids
+        return ids
+
+    def unresolved(self, names: Iterable[str]) -> List[str]:
+        """ Names matching no tenant, without applying the policies.
+        """
+        return [name for name in names
+                if name not in self._resolved and not self.matches(name)]
+
+    def resolve_all(self, names: Iterable[str],
+                    strict: bool=False) -> List[str]:
+        """ Unique tenant ids for several names, in order.
+        Raises when none of the names resolve, an empty tenants= query
+        would otherwise cover every tenant of the default domain.  With
+        strict=True any name that does not resolve raises.
+        """
+        ids = []
+        missing = []
+        for name in names:
+            resolved = self.resolve(name)
+            if not resolved:
+                missing.append(name)
+            ids.extend(resolved)
+        if missing and (strict or not ids):
+            raise IEAutomationAuvikAPIError(
+                f"No tenants found for {', '.join(missing)}"
+            )
+        return list(dict.fromkeys(ids))
+
+    def save(self, tenant_file: UsP, namespace: str='') -> None:
+        """ Atomically write the tenants to tenant_file.
+        """
+        stored = {
+            'version': self.VERSION,
+            'namespace': namespace,
+            'saved': time.time(),
+            'tenants': [{
+                'id': tenant._id,
+                'attributes': {
+                    'domainPrefix': tenant.domain,
+                    'tenantType': tenant.tenant_type,
+                },
+            } for tenant in self.tenants],
+        }
+        directory = os.path.dirname(os.path.abspath(tenant_file))
+        os.makedirs(directory, exist_ok=True)
+        tmp_file = f"{tenant_file}.tmp"
+        with open(tmp_file, 'w') as tf:
+            json.dump(stored, tf)
+        os.replace(tmp_file, tenant_file)
+
+    @classmethod
+    def load(cls, tenant_file: UsP, ttl: int, namespace: str='',
+             **policies: str) -> Optional['TenantDirectory']:
+        """ Directory from tenant_file or None if missing, stale or written
+        for another namespace.
+        """
+        if not os.path.isfile(tenant_file):
+            return None
+        try:
+            with open(tenant_file) as tf:
+                stored = json.load(tf)
+        except (OSError, ValueError):
+            return None
+        if stored.get('version') != cls.VERSION or \
+                stored.get('namespace') != namespace or \
+                time.time() - stored.get('saved', 0) > ttl:
+            return None
+        tenants = [AuvikTenantData.intern(t) for t in stored['tenants']]
+        directory = cls(tenants, **policies)
+        directory.loaded = True
+        return directory
@@ -0,0 +1,95 @@
+import json
+import logging
+
+import pytest
+
+BASE_URL = 'https://auvik.test/v1'
+
+
+class Secret(str):
+    def show(self):
+        return str(self)
+
+
+class FakeConfig:
+    def __init__(self, filters=None, **settings):
+        self.auvik_api = {
+            'AUVIK_API_URL': BASE_URL,
+            'AUVIK_API_DOMAIN': 'acme',
+            'AUVIK_API_USER': 'user',
+            'AUVIK_API_KEY': Secret('key'),
+            'AUVIK_API_SSL_CERT': 'auvik.pem',
+            'AUVIK_API_JSON_DECODER': 'json',
+            **settings,
+        }
+        self.filters = filters or {}
+        self.show_progress = False
+
+
+class FakeResponse:
+    def __init__(self, status=200, body=b'', headers=None):
+        self.status_code = status
+        self.ok = status < 400
+        self.content = body
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """ Serves routes relative to BASE_URL.  A route is a JSON document, a
+    raw body, an HTTP status, an exception to raise or a callable returning
+    any of those.
+    """
+
+    def __init__(self, routes=None):
+        self.routes = dict(routes or {})
+        self.requested = []
+
+    def get(self, url, timeout=None):
+        self.requested.append(url)
+        path = url[len(BASE_URL):] if url.startswith(BASE_URL) else url
+        route = self.routes.get(path, 404)
+        if callable(route):
+            route = route(path)
+        if isinstance(route, Exception):
+            raise route
+        if isinstance(route, int):
+            return FakeResponse(route)
+        if not isinstance(route, bytes):
+            route = json.dumps(route).encode()
+        return FakeResponse(body=route)
+
+    def close(self):
+        pass
+
+
+def page(data, next_path=None, total_pages=1):
+    """ A JSON:API page linking to next_path.
+    """
+    return {
+        'data': data,
+        'links': {'next': f"{BASE_URL}{next_path}"} if next_path else {},
+        'meta': {'totalPages': total_pages},
+    }
+
+
+@pytest.fixture
+def make_api(tmp_path, monkeypatch):
+    """ AuvikAPI clients served by a FakeSession instead of Auvik.
+    """
+    api_module = pytest.importorskip('auvik_inventory.auvik.api')
+    AuvikAPI = api_module.AuvikAPI
+    (tmp_path / 'auvik.pem').write_text('')
+    monkeypatch.setattr(AuvikAPI, 'CERT_DIR', str(tmp_path))
+
+    def make(routes=None, filters=None, **settings):
+        settings.setdefault('AUVIK_API_PREFETCH', 0)
+        api = AuvikAPI.__new__(AuvikAPI)
+        api.log = logging.getLogger('auvik.api')
+        api.config = FakeConfig(filters, **settings)
+        api._load_config()
+        api.url = None
+        api._retry_errors = (ConnectionError,)
+        api.session = FakeSession(routes)
+        return api
+
+    return make
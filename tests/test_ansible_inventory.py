@@ -0,0 +1,135 @@
+import io
+import json
+
+import pytest
+
+ansible_inventory = pytest.importorskip(
+    'auvik_inventory.auvik.ansible_inventory')
+AnsibleInventory = ansible_inventory.AnsibleInventory
+AuvikDeviceData = ansible_inventory.AuvikDeviceData
+
+IOS = ('Cisco IOS Software, C3750 Software (C3750-IPSERVICESK9-M), '
+       'Version 12.2(55)SE5, RELEASE SOFTWARE (fc1)')
+
+
+def device(n, name, tenant_id='ans1', domain='acme.corp',
+           device_type='switch'):
+    return AuvikDeviceData({
+        'type': 'device',
+        'id': f"d{n}",
+        'attributes': {
+            'ipAddresses': [f"10.0.0.{n}"],
+            'deviceName': name,
+            'deviceType': device_type,
+            'makeModel': 'C3750',
+            'vendorName': 'Cisco',
+            'softwareVersion': '12.2',
+            'serialNumber': f"SN{n}",
+            'description': IOS,
+            'firmwareVersion': '',
+            'onlineStatus': 'online',
+            'lastSeenTime': '2021-01-01T00:00:00.000Z',
+            'lastModified': '2021-01-01T00:00:00.000Z',
+        },
+        'relationships': {'tenant': {'data': {
+            'id': tenant_id, 'type': 'tenant',
+            'attributes': {'domainPrefix': domain},
+        }}},
+    })
+
+
+@pytest.fixture
+def inventory(tmp_path):
+    return AnsibleInventory(cache_file=str(tmp_path / 'hostvars.json'))
+
+
+def listed(inventory, devices):
+    out = io.StringIO()
+    count = inventory.write_list(out, devices)
+    return count, json.loads(out.getvalue())
+
+
+def test_list_payload(inventory):
+    count, payload = listed(inventory, [device(1, 'sw1.acme.corp'),
+                                        device(2, 'sw2')])
+    assert count == 2
+    hostvars = payload['_meta']['hostvars']
+    assert list(hostvars) == ['sw1', 'sw2']
+    assert hostvars['sw1']['ansible_host'] == '10.0.0.1'
+    assert hostvars['sw1']['tenant'] == 'acme.corp'
+    assert hostvars['sw1']['os'] == 'IOS'
+    assert payload['tenant_acme_corp'] == {'hosts': ['sw1', 'sw2']}
+    assert payload['device_type_switch'] == {'hosts': ['sw1', 'sw2']}
+    assert sorted(payload['all']['children']) == \
+        sorted(k for k in payload if k not in ('_meta', 'all'))
+
+
+def test_colliding_host_names_stay_unique(inventory):
+    _, payload = listed(inventory, [
+        device(1, 'sw1'),
+        device(2, 'sw1.other.corp', tenant_id='ans2', domain='other'),
+        # Named after its ip, 'sw1', which is taken too
+        device(3, 'admin@sw1'),
+    ])
+    assert list(payload['_meta']['hostvars']) == ['sw1', '10.0.0.2', 'd3']
+
+
+def test_colliding_group_names_are_suffixed(inventory):
+    _, payload = listed(inventory, [
+        device(1, 'sw1', tenant_id='ans1', domain='acme.corp'),
+        device(2, 'sw2', tenant_id='ans2', domain='acme-corp'),
+        device(3, 'sw3', device_type='l3 switch'),
+        device(4, 'sw4', device_type='l3-switch'),
+    ])
+    assert payload['tenant_acme_corp'] == {'hosts': ['sw1', 'sw3', 'sw4']}
+    assert payload['tenant_acme_corp_ans2'] == {'hosts': ['sw2']}
+    assert payload['device_type_l3_switch'] == {'hosts': ['sw3']}
+    suffixed = [group for group in payload
+                if group.startswith('device_type_l3_switch_')]
+    assert len(suffixed) == 1
+    assert payload[suffixed[0]] == {'hosts': ['sw4']}
+
+
+def test_failed_listings_write_nothing(inventory):
+    inventory.write_list(io.StringIO(), [device(1, 'sw1')])
+
+    def devices():
+        yield device(2, 'sw2')
+        raise ConnectionError('lost the API')
+
+    out = io.StringIO()
+    with pytest.raises(ConnectionError):
+        inventory.write_list(out, devices())
+    assert out.getvalue() == ''
+    # The previous cache is kept
+    assert list(inventory.host('sw1')) and inventory.host('sw2') == {}
+
+
+def test_host_is_answered_from_the_cache(inventory, monkeypatch):
+    listed(inventory, [device(1, 'sw1')])
+
+    def devices():
+        raise AssertionError('contacted the API')
+
+    monkeypatch.setattr(inventory, 'devices', devices)
+    assert inventory.host('sw1')['ansible_host'] == '10.0.0.1'
+    assert inventory.host('sw9') == {}
+
+
+def test_stale_caches_are_rebuilt_for_host(inventory, monkeypatch):
+    listed(inventory, [device(1, 'sw1')])
+    with open(inventory.cache_file) as cf:
+        stored = json.load(cf)
+    stored['saved'] -= inventory.cache_ttl + 1
+    with open(inventory.cache_file, 'w') as cf:
+        json.dump(stored, cf)
+    monkeypatch.setattr(inventory, 'devices',
+                        lambda: iter([device(1, 'sw1'), device(2, 'sw2')]))
+    assert inventory.host('sw2')['ansible_host'] == '10.0.0.2'
+
+
+def test_main_host(inventory, capsys):
+    listed(inventory, [device(1, 'sw1')])
+    assert ansible_inventory.main(['--host', 'sw1',
+                                   '--cache-file', inventory.cache_file]) == 0
+    assert json.loads(capsys.readouterr().out)['name'] == 'sw1'
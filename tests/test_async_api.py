@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+async_api = pytest.importorskip('auvik_inventory.auvik.async_api')
+tenants = pytest.importorskip('auvik_inventory.auvik.tenants')
+pytest.importorskip('aiohttp')
+
+TENANTS = [
+    {'id': 't1', 'type': 'tenant', 'attributes': {'domainPrefix': 'acme'}},
+    {'id': 't2', 'type': 'tenant', 'attributes': {'domainPrefix': 'globex'}},
+]
+
+
+@pytest.fixture
+def api():
+    return async_api.AuvikAPI(user='user', api_key='key', domain='acme',
+                              ssl_cert='chain_us1_my_auvik_com.crt',
+                              max_workers=3)
+
+
+def test_enrichment_is_windowed_and_ordered(api, monkeypatch):
+    running = 0
+    peak = 0
+
+    async def get_device_details(item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001 * (item['id'] % 3))
+        running -= 1
+        return {'item': item}
+
+    monkeypatch.setattr(api, 'get_device_details', get_device_details)
+    items = [{'id': n} for n in range(20)]
+    results = asyncio.run(api.enrich_devices(items))
+    assert [result['item'] for result in results] == items
+    assert peak == 3
+
+
+def test_enrichment_failures_cancel_the_window(api, monkeypatch):
+    started = []
+
+    async def get_device_details(item):
+        started.append(item['id'])
+        if item['id'] == 1:
+            raise RuntimeError('boom')
+        await asyncio.sleep(0.01)
+        return {'item': item}
+
+    monkeypatch.setattr(api, 'get_device_details', get_device_details)
+    with pytest.raises(RuntimeError):
+        asyncio.run(api.enrich_devices([{'id': n} for n in range(20)]))
+    assert len(started) < 20
+
+
+def test_tenants_are_fetched_once(api, monkeypatch):
+    calls = []
+
+    async def fetch_tenants():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return TENANTS
+
+    monkeypatch.setattr(api, '_fetch_tenants', fetch_tenants)
+
+    async def main():
+        return await asyncio.gather(*(api.get_tenants() for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [t.domain for t in results[0]] == ['acme', 'globex']
+    # A new loop gets a new lock, the tenants stay cached
+    assert asyncio.run(api.get_tenant_id_by_name('glo')) == 't2'
+    assert len(calls) == 1
+
+
+def test_generate_query_honours_strict(api, monkeypatch):
+    async def fetch_tenants():
+        return TENANTS
+
+    monkeypatch.setattr(api, '_fetch_tenants', fetch_tenants)
+    assert asyncio.run(api.generate_query(['acme', 'initech'])) == 't1'
+    with pytest.raises(tenants.IEAutomationAuvikAPIError):
+        asyncio.run(api.generate_query(['acme', 'initech'], strict=True))
+    assert asyncio.run(api.generate_query(tenant_ids='t2,t1,t2')) == 't2,t1'
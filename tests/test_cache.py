@@ -0,0 +1,120 @@
+import pytest
+
+cache = pytest.importorskip('auvik_inventory.auvik.cache')
+AuvikResponseCache = cache.AuvikResponseCache
+
+URL = 'https://auvik.test/v1/inventory/device/info?tenants=t1'
+
+
+class Clock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def make_cache(tmp_path, clock):
+    caches = []
+
+    def make(**kwargs):
+        kwargs.setdefault('clock', clock)
+        response_cache = AuvikResponseCache(str(tmp_path / 'cache.sqlite'),
+                                            **kwargs)
+        caches.append(response_cache)
+        return response_cache
+
+    yield make
+    for response_cache in caches:
+        response_cache.close()
+
+
+def test_entries_expire_after_their_ttl(make_cache, clock):
+    responses = make_cache(ttl=60)
+    responses.set(URL, b'body')
+    clock.now += 59
+    assert responses.get(URL) == b'body'
+    clock.now += 2
+    assert responses.get(URL) is None
+    assert responses.stats == {'hits': 1, 'misses': 1, 'entries': 0,
+                               'size': 0}
+
+
+def test_ttls_by_path_prefix(make_cache):
+    responses = make_cache(ttl=60, ttls={'/v1/inventory': 10,
+                                         '/v1/inventory/device/info': 0})
+    assert responses.ttl_for(URL) == 0
+    assert responses.ttl_for('https://auvik.test/v1/inventory/network') == 10
+    assert responses.ttl_for('https://auvik.test/v1/tenants') == 60
+    responses.set(URL, b'body')
+    assert responses.get(URL) is None
+
+
+def test_equivalent_urls_share_an_entry(make_cache):
+    responses = make_cache()
+    responses.set('HTTPS://Auvik.test/v1/a/?b=2&a=1', b'body')
+    assert responses.get('https://auvik.test/v1/a?a=1&b=2') == b'body'
+
+
+def test_namespaces_are_kept_apart(make_cache):
+    make_cache(namespace='alice').set(URL, b'alice')
+    assert make_cache(namespace='bob').get(URL) is None
+
+
+def test_least_recently_used_entries_are_evicted(make_cache, clock):
+    responses = make_cache(max_size=30)
+    for n in range(3):
+        clock.now += 1
+        responses.set(f"{URL}&page={n}", b'x' * 10)
+    clock.now += 1
+    # Page 0 is now the most recently used
+    assert responses.get(f"{URL}&page=0") == b'x' * 10
+    clock.now += 1
+    responses.set(f"{URL}&page=3", b'x' * 10)
+    # Evicted down to EVICT_TO of max_size, oldest first
+    assert responses.get(f"{URL}&page=1") is None
+    assert responses.get(f"{URL}&page=2") is None
+    assert responses.get(f"{URL}&page=0") == b'x' * 10
+    assert responses.get(f"{URL}&page=3") == b'x' * 10
+    assert responses.stats['size'] == responses._size == 20
+
+
+def test_expired_entries_are_evicted_first(make_cache, clock):
+    responses = make_cache(max_size=30, ttls={'/v1/old': 5})
+    responses.set(f"{URL}&page=0", b'x' * 10)
+    clock.now += 1
+    # More recently used than page 0, but expired by the next write
+    responses.set('https://auvik.test/v1/old', b'x' * 10)
+    clock.now += 10
+    responses.set(f"{URL}&page=1", b'x' * 15)
+    assert responses.get(f"{URL}&page=0") == b'x' * 10
+    assert responses.get(f"{URL}&page=1") == b'x' * 15
+    assert responses.stats['entries'] == 2
+
+
+def test_running_size_tracks_replaced_entries(make_cache):
+    responses = make_cache()
+    responses.set(URL, b'x' * 10)
+    responses.set(URL, b'x' * 4)
+    assert responses._size == responses.stats['size'] == 4
+    # Picked up again when the file is reopened
+    assert make_cache()._size == 4
+    responses.clear()
+    assert responses._size == 0
+
+
+def test_writes_do_not_sum_the_table(make_cache, monkeypatch):
+    responses = make_cache(max_size=1024)
+
+    def total_size():
+        raise AssertionError('summed the whole table')
+
+    monkeypatch.setattr(responses, '_total_size', total_size)
+    for n in range(50):
+        responses.set(f"{URL}&page={n}", b'x' * 10)
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from .conftest import page
+
+PATH = '/inventory/device/info'
+
+
+def tenant_routes(*tenant_ids, pages=2, delay=0.0):
+    """ Two pages of records per tenant, earlier tenants answering slower.
+    """
+    routes = {}
+    for n, tenant_id in enumerate(tenant_ids):
+        first = f"{PATH}?tenants={tenant_id}"
+        second = f"{first}&page=2"
+
+        def slow(path, body=page([{'id': f"{tenant_id}-a"}], second, pages),
+                 wait=delay * (len(tenant_ids) - n)):
+            time.sleep(wait)
+            return body
+
+        routes[first] = slow
+        routes[second] = page([{'id': f"{tenant_id}-b"}], total_pages=pages)
+    return routes
+
+
+def ids(records):
+    return [r['id'] for r in records]
+
+
+def test_records_are_merged_in_tenant_order(make_api):
+    api = make_api(tenant_routes('t1', 't2', 't3', delay=0.01))
+    records = api.crawl_tenants(PATH, tenant_ids='t1,t2,t3', max_workers=3)
+    assert ids(records) == ['t1-a', 't1-b', 't2-a', 't2-b', 't3-a', 't3-b']
+    assert api.crawl_stats.keys() == {'t1', 't2', 't3'}
+    assert all(stat['records'] == 2 and stat['error'] is None
+               for stat in api.crawl_stats.values())
+
+
+def test_failed_tenants_are_skipped(make_api):
+    routes = tenant_routes('t1', 't2', 't3')
+    routes[f"{PATH}?tenants=t2&page=2"] = 404
+    api = make_api(routes)
+    records = api.crawl_tenants(PATH, tenant_ids='t1,t2,t3')
+    assert ids(records) == ['t1-a', 't1-b', 't3-a', 't3-b']
+    assert api.crawl_stats['t2']['records'] == 0
+    assert '404' in api.crawl_stats['t2']['error']
+    assert api.crawl_stats['t3']['error'] is None
+
+
+def test_every_tenant_failing_raises(make_api):
+    api = make_api({})
+    with pytest.raises(Exception, match='failed for every tenant'):
+        api.crawl_tenants(PATH, tenant_ids='t1,t2')
+    assert all(stat['error'] for stat in api.crawl_stats.values())
+
+
+def test_server_filters_reach_every_tenant(make_api):
+    api = make_api({
+        f"{PATH}?tenants={t}&filter[vendorName]=Cisco%20Systems":
+            page([{'id': t}]) for t in ('t1', 't2')
+    })
+    records = api.crawl_tenants(
+        PATH, tenant_ids='t1,t2',
+        server_filters={'filter[vendorName]': 'Cisco Systems'},
+    )
+    assert ids(records) == ['t1', 't2']
+
+
+def test_inventory_fans_out_when_configured(make_api):
+    api = make_api(tenant_routes('t1', 't2'), AUVIK_API_TENANT_FANOUT=True)
+    records = api.get_tenant_inventory(tenant_ids='t1,t2')
+    assert ids(records) == ['t1-a', 't1-b', 't2-a', 't2-b']
+    assert not any('tenants=t1,t2' in url for url in api.session.requested)
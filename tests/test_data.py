@@ -0,0 +1,52 @@
+import pytest
+
+data = pytest.importorskip('auvik_inventory.auvik.data')
+AuvikDeviceData = data.AuvikDeviceData
+
+DESCRIPTION = ('Cisco IOS Software, C3750 Software (C3750-IPSERVICESK9-M), '
+               'Version 12.2(55)SE5, RELEASE SOFTWARE (fc1)')
+
+
+def record(seen='2021-01-01T00:00:00.000Z', description=DESCRIPTION):
+    return {
+        'type': 'device',
+        'id': 'd1',
+        'attributes': {
+            'ipAddresses': ['10.0.0.1'],
+            'deviceName': 'sw1',
+            'deviceType': 'switch',
+            'makeModel': 'C3750',
+            'vendorName': 'Cisco',
+            'softwareVersion': '12.2',
+            'serialNumber': 'SN1',
+            'description': description,
+            'firmwareVersion': '',
+            'onlineStatus': 'online',
+            'lastSeenTime': seen,
+            'lastModified': seen,
+        },
+        'relationships': {'tenant': {'data': {
+            'id': 't1', 'type': 'tenant',
+            'attributes': {'domainPrefix': 'acme'},
+        }}},
+    }
+
+
+def test_lazy_fields_match_eager_ones():
+    lazy = AuvikDeviceData(record(), lazy=True)
+    assert lazy._fields() == AuvikDeviceData(record())._fields()
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_reload_derives_every_field_again(lazy):
+    device = AuvikDeviceData(record(), lazy=lazy)
+    before = device._fields()
+    device.load(record(seen='2022-02-02T00:00:00.000Z',
+                       description='Arista Networks EOS'), lazy=lazy)
+    after = device._fields()
+    for field in ('os', 'model', 'version', 'nd_type', 'last_seen',
+                  'last_modified'):
+        assert after[field] != before[field], field
+    assert after == AuvikDeviceData(
+        record(seen='2022-02-02T00:00:00.000Z',
+               description='Arista Networks EOS'))._fields()
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+decoder = pytest.importorskip('auvik_inventory.auvik.decoder')
+AuvikPage = decoder.AuvikPage
+
+PAGE = {
+    'data': [{'id': 'd1', 'attributes': {'deviceName': 'sw1'}},
+             {'id': 'd2', 'attributes': {'deviceName': 'sw2 "x", [y]'}}],
+    'links': {'first': '/v1/inventory/device/info?page[first]=2',
+              'next': '/v1/inventory/device/info?page[after]=abc'},
+    'meta': {'totalPages': 3},
+}
+
+
+def test_page_items_links_and_meta():
+    page = AuvikPage(json.dumps(PAGE, indent=2).encode())
+    assert page.next is None
+    assert list(page) == PAGE['data']
+    assert page.next == PAGE['links']['next']
+    assert page.meta == PAGE['meta']
+
+
+def test_last_page_has_no_next():
+    page = AuvikPage(json.dumps({'data': [], 'links': {}}))
+    assert list(page) == []
+    assert page.next is None
+
+
+def test_single_resource_page():
+    assert list(AuvikPage('{"data": {"id": "t1"}}')) == [{'id': 't1'}]
+
+
+@pytest.mark.parametrize('body', ['{}', ' { } '])
+def test_empty_document(body):
+    assert list(AuvikPage(body)) == []
+
+
+@pytest.mark.parametrize('body', [
+    b'',
+    b'   ',
+    b'{',
+    b'{"data":',
+    b'{"data": [',
+    b'{"data": [{"id": "d1"},',
+    b'{"data": [{"id": "d1"}',
+    b'{"data": [{"id": "d1"}], "links": {"next": "/x"',
+    b'{"data": [{"id": "d1"}]',
+])
+def test_truncated_pages_raise_like_loads(body):
+    with pytest.raises(ValueError):
+        json.loads(body)
+    with pytest.raises(json.JSONDecodeError):
+        list(AuvikPage(body))
+
+
+def test_pages_must_be_objects():
+    with pytest.raises(json.JSONDecodeError):
+        list(AuvikPage('[]'))
+
+
+def test_items_before_a_truncation_are_yielded():
+    page = iter(AuvikPage('{"data": [{"id": "d1"}, {"id": '))
+    assert next(page) == {'id': 'd1'}
+    with pytest.raises(json.JSONDecodeError):
+        next(page)
+
+
+def test_loads_uses_the_selected_decoder():
+    previous = decoder.get_decoder()
+    try:
+        assert decoder.set_decoder('json') == 'json'
+        assert decoder.loads(b'{"a": [1]}') == {'a': [1]}
+        with pytest.raises(ValueError):
+            decoder.set_decoder('yaml')
+    finally:
+        decoder.set_decoder(previous)
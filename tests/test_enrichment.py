@@ -0,0 +1,146 @@
+import threading
+import time
+
+import pytest
+
+from .conftest import page
+
+ITEMS = [{'id': f"d{i}"} for i in range(12)]
+COLLECTIONS = ('detail', 'warranty', 'lifecycle')
+
+
+def lookup(kind, delay=0.0, fail=()):
+    """ A per-device route answering slower for lower ids.
+    """
+    def route(path):
+        device_id = path.rsplit('/', 1)[-1]
+        if device_id in fail:
+            return 404
+        time.sleep(delay * (len(ITEMS) - int(device_id[1:])))
+        return {'data': {'id': device_id, 'type': kind}}
+    return route
+
+
+def device_routes(delay=0.0, fail=()):
+    return {f"/inventory/device/{kind}/{item['id']}":
+            lookup(kind, delay, fail)
+            for kind in COLLECTIONS for item in ITEMS}
+
+
+def test_results_keep_the_order_of_the_items(make_api):
+    api = make_api(device_routes(delay=0.002))
+    results = list(api.enrich_devices(ITEMS, max_workers=4))
+    assert [r['item'] for r in results] == ITEMS
+    assert [r['details']['id'] for r in results] == \
+        [item['id'] for item in ITEMS]
+    assert all(r['warranty']['type'] == 'warranty' and
+               r['lifecycle']['type'] == 'lifecycle' for r in results)
+
+
+def test_lookups_run_concurrently(make_api):
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def route(path):
+        with lock:
+            active.append(path)
+            peak.append(len(active))
+        time.sleep(0.01)
+        with lock:
+            active.remove(path)
+        return {'data': {}}
+
+    api = make_api({path: route for path in device_routes()})
+    list(api.enrich_devices(ITEMS, max_workers=4))
+    assert max(peak) > 1
+
+
+def test_items_are_consumed_in_a_bounded_window(make_api):
+    consumed = []
+
+    def items():
+        for item in ITEMS:
+            consumed.append(item)
+            yield item
+
+    api = make_api(device_routes())
+    results = api.enrich_devices(items(), max_workers=2)
+    next(results)
+    assert len(consumed) == 4
+    results.close()
+
+
+def test_a_failed_lookup_is_isolated(make_api):
+    api = make_api(device_routes(fail={'d3'}))
+    results = list(api.enrich_devices(ITEMS, max_workers=4))
+    assert len(results) == len(ITEMS)
+    assert results[3] == {'item': ITEMS[3], 'details': None,
+                          'warranty': None, 'lifecycle': None}
+    assert results[4]['details'] == {'id': 'd4', 'type': 'detail'}
+
+
+def test_a_single_worker_enriches_serially(make_api):
+    api = make_api(device_routes())
+    results = list(api.enrich_devices(ITEMS, max_workers=1))
+    assert [r['details']['id'] for r in results] == \
+        [item['id'] for item in ITEMS]
+
+
+def collection(kind, ids):
+    return page([{'id': device_id, 'type': kind} for device_id in ids])
+
+
+def test_bulk_enrichment_joins_the_collections_by_id(make_api):
+    ids = [item['id'] for item in ITEMS]
+    api = make_api({
+        '/inventory/device/detail?tenants=t1':
+            collection('detail', reversed(ids)),
+        '/inventory/device/warranty?tenants=t1':
+            collection('warranty', ids[::2]),
+        '/inventory/device/lifecycle?tenants=t1':
+            collection('lifecycle', ids + ['d99']),
+    })
+    results = list(api.bulk_enrich_devices(ITEMS, tenant_ids='t1'))
+    assert [r['item'] for r in results] == ITEMS
+    assert [r['details']['id'] for r in results] == ids
+    assert [bool(r['warranty']) for r in results] == \
+        [i % 2 == 0 for i in range(len(ITEMS))]
+    assert all(r['lifecycle']['id'] == r['item']['id'] for r in results)
+    # One request per collection, not per device
+    assert len(api.session.requested) == 3
+
+
+def test_bulk_enrichment_survives_a_failed_collection(make_api):
+    ids = [item['id'] for item in ITEMS]
+    api = make_api({
+        '/inventory/device/detail?tenants=t1': collection('detail', ids),
+        '/inventory/device/warranty?tenants=t1': 404,
+        '/inventory/device/lifecycle?tenants=t1':
+            collection('lifecycle', ids),
+    })
+    results = list(api.bulk_enrich_devices(ITEMS, tenant_ids='t1'))
+    assert all(r['warranty'] is None for r in results)
+    assert [r['details']['id'] for r in results] == ids
+
+
+@pytest.mark.parametrize('enrichment, requests', [
+    ('device', len(ITEMS) * len(COLLECTIONS)),
+    ('bulk', len(COLLECTIONS)),
+])
+def test_enrichment_mode(make_api, enrichment, requests):
+    ids = [item['id'] for item in ITEMS]
+    routes = device_routes()
+    routes.update({f"/inventory/device/{kind}?tenants=t1":
+                   collection(kind, ids) for kind in COLLECTIONS})
+    api = make_api(routes)
+    results = list(api._enrich(ITEMS, tenant_ids='t1',
+                               enrichment=enrichment, max_workers=4))
+    assert [r['details']['id'] for r in results] == ids
+    assert len(api.session.requested) == requests
+
+
+def test_invalid_enrichment_mode(make_api):
+    api = make_api()
+    with pytest.raises(Exception, match='Invalid enrichment mode'):
+        api._enrich(ITEMS, enrichment='psychic')
@@ -0,0 +1,70 @@
+import pytest
+
+filters = pytest.importorskip('auvik_inventory.auvik.filters')
+AuvikFilter = filters.AuvikFilter
+
+
+def matches(value, candidates):
+    predicate = AuvikFilter.compile_value(value)
+    return [candidate for candidate in candidates if predicate(candidate)]
+
+
+NAMES = ['sw1', 'SW10', 'core-sw1', '^sw1', '!sw1', '=sw1', None]
+
+
+def test_contains_is_the_default():
+    assert matches('sw1', NAMES) == ['sw1', 'SW10', 'core-sw1', '^sw1',
+                                     '!sw1', '=sw1']
+
+
+def test_exact():
+    assert matches('=SW1', NAMES) == ['sw1']
+
+
+def test_prefix():
+    assert matches('^sw', NAMES) == ['sw1', 'SW10']
+
+
+def test_regex():
+    assert matches('~^sw[0-9]+$', NAMES) == ['sw1', 'SW10']
+
+
+def test_invalid_regex():
+    with pytest.raises(filters.IEAutomationAuvikFilterError):
+        AuvikFilter.compile_value('~sw[')
+
+
+def test_negation():
+    assert matches('!sw1', NAMES) == [None]
+    assert matches('!^sw', NAMES) == ['core-sw1', '^sw1', '!sw1', '=sw1',
+                                      None]
+
+
+def test_escaped_operators_are_literal():
+    assert matches('\\^sw1', NAMES) == ['^sw1']
+    assert matches('\\!sw1', NAMES) == ['!sw1']
+    assert matches('\\=sw1', NAMES) == ['=sw1']
+    assert matches('!\\^sw1', NAMES) == ['sw1', 'SW10', 'core-sw1', '!sw1',
+                                         '=sw1', None]
+
+
+def test_build_filters_splits_on_the_first_equals():
+    assert AuvikFilter._build_filters('name==sw1,vendor=cisco') == [
+        {'name': '=sw1'}, {'vendor': 'cisco'},
+    ]
+    assert AuvikFilter._build_filters('description=a=b') == [
+        {'description': 'a=b'},
+    ]
+
+
+def test_build_filters_needs_a_key_and_value():
+    with pytest.raises(filters.IEAutomationAuvikFilterError):
+        AuvikFilter._build_filters('vendor=cisco,sw1')
+
+
+def test_filter_string_operators():
+    devices = [{'name': 'sw1', 'vendor': 'Cisco'},
+               {'name': 'sw10', 'vendor': 'Cisco'},
+               {'name': 'sw1', 'vendor': 'Juniper'}]
+    found = AuvikFilter('name==sw1,vendor=!juniper').filter_devices(devices)
+    assert found == [devices[0]]
@@ -0,0 +1,89 @@
+import ast
+import json
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+# Dependencies that must only load when the feature using them runs
+HEAVY_MODULES = [
+    'aiohttp',
+    'alive_progress',
+    'jsonpickle',
+    'prettytable',
+    'requests',
+    'sysdescrparser',
+]
+AUVIK_DIR = pathlib.Path(__file__).parent.parent / 'auvik_inventory' / 'auvik'
+# Generous budget, a regression to eager imports costs far more than this
+IMPORT_BUDGET = 0.25
+
+SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+try:
+    for module in {modules!r}:
+        __import__(module)
+except ImportError as e:
+    print(json.dumps({{'error': str(e)}}))
+    sys.exit()
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    'elapsed': elapsed,
+    'loaded': [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def _import_stats(modules=('auvik_inventory', 'auvik_inventory.auvik'),
+                  heavy=HEAVY_MODULES):
+    # A fresh interpreter, so nothing imported by pytest leaks in
+    script = SCRIPT.format(modules=list(modules), heavy=heavy)
+    output = subprocess.run([sys.executable, '-c', script], check=True,
+                            capture_output=True, text=True).stdout
+    stats = json.loads(output)
+    if 'error' in stats:
+        pytest.skip(f"Unable to import {modules[-1]}: {stats['error']}")
+    return stats
+
+
+def test_no_heavy_imports():
+    assert _import_stats()['loaded'] == []
+
+
+def test_import_time():
+    elapsed = min(_import_stats()['elapsed'] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET
+
+
+def _top_level_imports(tree):
+    """ Modules imported when a module is imported, skipping TYPE_CHECKING
+    and __main__ blocks.
+    """
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            yield from (alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.module and not node.level:
+                yield node.module
+        elif isinstance(node, ast.If):
+            test = ast.unparse(node.test)
+            if test in ('TYPE_CHECKING', "__name__ == '__main__'"):
+                continue
+            yield from _top_level_imports(node)
+        elif isinstance(node, (ast.Try, ast.With)):
+            yield from _top_level_imports(node)
+
+
+# Every module the API client imports is checked, so a heavy import in
+# api.py or anything it pulls in fails here even where api.py can not be
+# imported
+@pytest.mark.parametrize('module', sorted(
+    path.name for path in AUVIK_DIR.glob('*.py')
+))
+def test_no_heavy_top_level_imports(module):
+    tree = ast.parse((AUVIK_DIR / module).read_text())
+    heavy = [name for name in _top_level_imports(tree)
+             if name.split('.')[0] in HEAVY_MODULES]
+    assert heavy == []
@@ -0,0 +1,98 @@
+import pytest
+
+index = pytest.importorskip('auvik_inventory.auvik.index')
+InventoryIndex = index.InventoryIndex
+AuvikDeviceData = index.AuvikDeviceData
+AuvikTenantData = pytest.importorskip(
+    'auvik_inventory.auvik.data').AuvikTenantData
+
+ACME = AuvikTenantData({'id': 't1', 'attributes': {'domainPrefix': 'acme'}})
+GLOBEX = AuvikTenantData({'id': 't2',
+                          'attributes': {'domainPrefix': 'globex'}})
+
+
+def device(device_id, name, ips, serial=None, tenant=ACME, macs=()):
+    return AuvikDeviceData.from_fields(
+        _id=device_id, name=name, ip=ips[0] if ips else None, ips=ips,
+        serial=serial, tenant=tenant,
+        interfaces=[{f"eth{n}": mac} for n, mac in enumerate(macs)],
+    )
+
+
+DEVICES = [
+    device('d1', 'core-sw1', ['10.1.0.1', '10.2.0.1'], 'SN1',
+           macs=['00:1A:2B:3C:4D:5E']),
+    device('d2', 'core-sw2', ['10.1.0.2'], 'SN2'),
+    device('d3', 'edge-rt1', ['192.168.1.1', '2001:db8::1'], 'SN3',
+           tenant=GLOBEX),
+    device('d4', 'Core-SW1', ['10.1.5.9'], tenant=GLOBEX),
+]
+
+
+@pytest.fixture
+def idx():
+    return InventoryIndex(DEVICES)
+
+
+def ids(devices):
+    return [d._id for d in devices]
+
+
+def test_exact_lookups(idx):
+    assert ids(idx.by_ip('10.2.0.1')) == ['d1']
+    assert ids(idx.by_serial('sn2')) == ['d2']
+    assert ids(idx.by_mac('001a.2b3c.4d5e')) == ['d1']
+    assert ids(idx.by_tenant('globex')) == ['d3', 'd4']
+    assert ids(idx.by_tenant('t1')) == ['d1', 'd2']
+    assert idx.by_ip('10.9.9.9') == []
+
+
+def test_names_are_case_insensitive_and_shared(idx):
+    assert ids(idx.by_name('CORE-SW1')) == ['d1', 'd4']
+
+
+def test_ipv6_addresses_are_normalized(idx):
+    assert ids(idx.by_ip('2001:0db8:0000::0001')) == ['d3']
+
+
+def test_prefix_lookups(idx):
+    assert ids(idx.prefix('name', 'core-')) == ['d1', 'd4', 'd2']
+    assert ids(idx.prefix('ip', '10.1.')) == ['d1', 'd2', 'd4']
+    assert ids(idx.prefix('mac', '00-1a')) == ['d1']
+    assert idx.prefix('name', 'zzz') == []
+
+
+def test_cidr_lookups(idx):
+    assert ids(idx.cidr('10.1.0.0/16')) == ['d1', 'd2', 'd4']
+    assert ids(idx.cidr('10.1.0.0/30')) == ['d1', 'd2']
+    # A device is returned once however many of its IPs match
+    assert ids(idx.cidr('10.0.0.0/8')) == ['d1', 'd2', 'd4']
+    assert ids(idx.cidr('2001:db8::/32')) == ['d3']
+    assert idx.cidr('172.16.0.0/12') == []
+
+
+def test_removed_devices_leave_every_view(idx):
+    # Build the sorted and network views before changing the index
+    idx.prefix('name', 'core')
+    idx.cidr('10.0.0.0/8')
+    assert idx.remove('d1')._id == 'd1'
+    assert 'd1' not in idx
+    assert ids(idx.by_name('core-sw1')) == ['d4']
+    assert ids(idx.prefix('ip', '10.')) == ['d2', 'd4']
+    assert ids(idx.cidr('10.0.0.0/8')) == ['d2', 'd4']
+    assert idx.remove('d1') is None
+
+
+def test_updated_devices_are_indexed_again(idx):
+    idx.cidr('10.0.0.0/8')
+    moved = device('d2', 'core-sw2', ['172.16.0.2'], 'SN2')
+    idx.update(moved)
+    assert len(idx) == len(DEVICES)
+    assert idx.by_ip('10.1.0.2') == []
+    assert idx.by_ip('172.16.0.2') == [moved]
+    assert ids(idx.cidr('172.16.0.0/12')) == ['d2']
+
+
+def test_invalid_key(idx):
+    with pytest.raises(KeyError):
+        idx.lookup('color', 'blue')
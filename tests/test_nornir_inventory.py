@@ -0,0 +1,108 @@
+import pytest
+
+nornir_inventory = pytest.importorskip('auvik_inventory.auvik.nornir_inventory')
+AuvikInventory = nornir_inventory.AuvikInventory
+F = pytest.importorskip('nornir.core.filter').F
+
+DESCRIPTIONS = {
+    'Cisco': ('Cisco IOS Software, C3750 Software (C3750-IPSERVICESK9-M), '
+              'Version 12.2(55)SE5, RELEASE SOFTWARE (fc1)'),
+    'Arista': 'Arista Networks EOS version 4.20.1F running on DCS-7050',
+}
+DERIVED_SLOTS = ('_os', '_model', '_version', '_nd_type')
+
+
+def record(device_id, name, vendor, tenant='acme', device_type='switch'):
+    return {
+        'type': 'device',
+        'id': device_id,
+        'attributes': {
+            'ipAddresses': [f"10.0.0.{device_id[1:]}"],
+            'deviceName': name,
+            'deviceType': device_type,
+            'makeModel': 'X',
+            'vendorName': vendor,
+            'softwareVersion': '1',
+            'serialNumber': f"SN{device_id}",
+            'description': DESCRIPTIONS[vendor],
+            'firmwareVersion': '',
+            'onlineStatus': 'online',
+            'lastSeenTime': '2021-01-01T00:00:00.000Z',
+            'lastModified': '2021-01-01T00:00:00.000Z',
+        },
+        'relationships': {'tenant': {'data': {
+            'id': f"t-{tenant}", 'type': 'tenant',
+            'attributes': {'domainPrefix': tenant},
+        }}},
+    }
+
+
+RECORDS = [
+    record('d1', 'sw1.corp.local', 'Cisco'),
+    record('d2', 'sw2.corp.local', 'Arista', tenant='globex'),
+    record('d3', 'sw1.other.local', 'Cisco', tenant='globex'),
+    record('d4', 'printer', 'Cisco', device_type='printer'),
+]
+
+
+def inventory(filters=None, **kwargs):
+    plugin = AuvikInventory(**kwargs)
+    local = nornir_inventory.AuvikFilter(filters) if filters else None
+    return plugin.build(plugin.select(RECORDS,
+                                      *plugin._split_filters(local)))
+
+
+def derived(host):
+    return [slot for slot in DERIVED_SLOTS if hasattr(host.device, slot)]
+
+
+def test_hosts_are_built_without_deriving_fields():
+    hosts = inventory().hosts
+    # Network devices only, colliding names fall back to the id
+    assert list(hosts) == ['sw1', 'sw2', 'd3']
+    assert all(derived(host) == [] for host in hosts.values())
+
+
+def test_filtered_out_hosts_are_never_derived():
+    inv = inventory(platform_map={'cisco_ios': 'ios'})
+    kept = inv.filter(F(vendor='Cisco') & F(groups__contains='tenant_acme'))
+    assert list(kept.hosts) == ['sw1']
+    assert kept.hosts['sw1'].platform == 'ios'
+    assert inv.hosts['sw2'].device is not None
+    assert derived(inv.hosts['sw2']) == []
+    assert derived(inv.hosts['d3']) == []
+
+
+def test_only_read_fields_are_derived():
+    host = inventory().hosts['sw1']
+    assert host['vendor'] == 'Cisco'
+    assert host['tenant'] == 'acme'
+    assert derived(host) == []
+    assert host['model'] == 'C3750-IPSERVICESK9-M'
+    assert '_nd_type' not in derived(host)
+
+
+def test_host_data_matches_the_device():
+    host = inventory().hosts['sw2']
+    fields = host.device._fields()
+    fields['tenant'] = 'globex'
+    assert dict(host.data) == fields
+    assert host.hostname == '10.0.0.2'
+    assert host.platform == host.device.nd_type
+
+
+def test_host_data_set_by_nornir_wins():
+    host = inventory().hosts['sw1']
+    host['site'] = 'hq'
+    host['vendor'] = 'cisco'
+    assert (host['site'], host['vendor']) == ('hq', 'cisco')
+    assert host.device.vendor == 'Cisco'
+    host.platform = 'nxos'
+    assert host.platform == 'nxos'
+    assert derived(host) == []
+
+
+def test_device_filters_reuse_the_device():
+    hosts = inventory('os==IOS').hosts
+    assert list(hosts) == ['sw1', 'd3']
+    assert hosts['sw1'].device.os == 'IOS'
@@ -0,0 +1,145 @@
+import os
+
+import pytest
+
+overrides = pytest.importorskip('auvik_inventory.auvik.overrides')
+InventoryOverrides = overrides.InventoryOverrides
+AuvikDeviceData = overrides.AuvikDeviceData
+NET_DEVICE_MAPPER = pytest.importorskip(
+    'auvik_inventory.auvik.data').NET_DEVICE_MAPPER
+
+DESCRIPTION = ('Cisco IOS Software, C3750 Software (C3750-IPSERVICESK9-M), '
+               'Version 12.2(55)SE5, RELEASE SOFTWARE (fc1)')
+
+
+def record(device_id='d1', name='sw1.corp.local', serial='SN1'):
+    return {
+        'type': 'device',
+        'id': device_id,
+        'attributes': {
+            'ipAddresses': ['10.0.0.1'],
+            'deviceName': name,
+            'deviceType': 'switch',
+            'makeModel': 'C3750',
+            'vendorName': 'Cisco',
+            'softwareVersion': '12.2',
+            'serialNumber': serial,
+            'description': DESCRIPTION,
+            'firmwareVersion': '',
+            'onlineStatus': 'online',
+            'lastSeenTime': '2021-01-01T00:00:00.000Z',
+            'lastModified': '2021-01-01T00:00:00.000Z',
+        },
+        'relationships': {'tenant': {'data': {
+            'id': 't1', 'type': 'tenant',
+            'attributes': {'domainPrefix': 'acme'},
+        }}},
+    }
+
+
+@pytest.fixture(autouse=True)
+def fresh_parsed():
+    # Parsed sheets are shared by every instance
+    InventoryOverrides._parsed.clear()
+    yield
+    InventoryOverrides._parsed.clear()
+
+
+def write(path, text, mtime=None):
+    path.write_text(text)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+    return str(path)
+
+
+def test_id_wins_over_serial_and_serial_over_name(tmp_path):
+    sheet = write(tmp_path / 'ovr.csv',
+                  'name,serial,id,ip,nd_type\n'
+                  'SW1.corp.local,,,10.1.1.1,cisco_xe\n'
+                  ',SN1,,10.2.2.2,\n'
+                  ',,d1,10.3.3.3,\n')
+    device = InventoryOverrides(sheet, cache_dir=None).apply(
+        AuvikDeviceData(record())
+    )
+    assert device.ip == '10.3.3.3'
+    # Fields only the name row sets still apply
+    assert device.nd_type == 'cisco_xe'
+
+
+def test_list_fields_are_split(tmp_path):
+    sheet = write(tmp_path / 'ovr.csv',
+                  'id,ips\nd1,"10.0.0.1, 10.0.0.2;10.0.0.3  10.0.0.4"\n')
+    device = InventoryOverrides(sheet, cache_dir=None).apply(
+        AuvikDeviceData(record())
+    )
+    assert device.ips == ['10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.4']
+
+
+def test_lazy_devices_keep_overridden_fields(tmp_path):
+    sheet = write(tmp_path / 'ovr.csv', 'id,os\nd1,IOS-XE\n')
+    ovr = InventoryOverrides(sheet, cache_dir=None)
+    lazy = ovr.apply(AuvikDeviceData(record(), lazy=True))
+    eager = ovr.apply(AuvikDeviceData(record()))
+    assert lazy.os == 'IOS-XE'
+    assert lazy.model == 'C3750-IPSERVICESK9-M'
+    assert lazy._fields() == eager._fields()
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_nd_type_follows_an_overridden_os(tmp_path, lazy):
+    sheet = write(tmp_path / 'ovr.csv', 'id,os\nd1,NXOS\n')
+    device = AuvikDeviceData(record(), lazy=lazy)
+    original = AuvikDeviceData(record()).nd_type
+    InventoryOverrides(sheet, cache_dir=None).apply(device)
+    assert device.os == 'NXOS'
+    assert device.nd_type == NET_DEVICE_MAPPER['NXOS'] != original
+    # Fields derived from the untouched description stay
+    assert device.model == 'C3750-IPSERVICESK9-M'
+
+
+def test_overridden_nd_type_is_kept(tmp_path):
+    sheet = write(tmp_path / 'ovr.csv', 'id,os,nd_type\nd1,NXOS,cisco_xe\n')
+    device = InventoryOverrides(sheet, cache_dir=None).apply(
+        AuvikDeviceData(record())
+    )
+    assert device.nd_type == 'cisco_xe'
+
+
+def test_fields_derive_from_an_overridden_description(tmp_path):
+    sheet = write(tmp_path / 'ovr.csv',
+                  'id,description,model\nd1,Arista Networks EOS,X\n')
+    device = InventoryOverrides(sheet, cache_dir=None).apply(
+        AuvikDeviceData(record())
+    )
+    expected = AuvikDeviceData(dict(record(), attributes=dict(
+        record()['attributes'], description='Arista Networks EOS')))
+    assert (device.os, device.version, device.nd_type) == \
+        (expected.os, expected.version, expected.nd_type)
+    assert device.model == 'X'
+
+
+def test_changed_sheets_are_parsed_again(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    sheet = write(tmp_path / 'ovr.csv', 'id,ip\nd1,10.1.1.1\n',
+                  mtime=1_600_000_000_000_000_000)
+    assert InventoryOverrides(sheet, cache_dir).by_id['d1'] == \
+        (('ip', '10.1.1.1'),)
+    write(tmp_path / 'ovr.csv', 'id,ip\nd1,10.9.9.9\n',
+          mtime=1_600_000_001_000_000_000)
+    InventoryOverrides._parsed.clear()
+    assert InventoryOverrides(sheet, cache_dir).by_id['d1'] == \
+        (('ip', '10.9.9.9'),)
+
+
+def test_unchanged_sheets_come_from_the_cache(tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    sheet = write(tmp_path / 'ovr.csv', 'id,ip\nd1,10.1.1.1\n')
+    InventoryOverrides(sheet, cache_dir)
+    InventoryOverrides._parsed.clear()
+
+    def parse(sheet):
+        raise AssertionError('parsed again')
+
+    monkeypatch.setattr(InventoryOverrides, 'parse', parse)
+    assert InventoryOverrides(sheet, cache_dir).by_id['d1'] == \
+        (('ip', '10.1.1.1'),)
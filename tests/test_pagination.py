@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from .conftest import BASE_URL, page
+
+RECORDS = [{'id': f"d{i}"} for i in range(7)]
+
+
+def pages(per_page=3, link=lambda n: f"/inventory/device/info?page={n}"):
+    """ Routes serving RECORDS per_page at a time.
+    """
+    chunks = [RECORDS[i:i + per_page]
+              for i in range(0, len(RECORDS), per_page)]
+    routes = {}
+    for n, chunk in enumerate(chunks):
+        path = '/inventory/device/info' if n == 0 else \
+            f"/inventory/device/info?page={n}"
+        next_path = link(n + 1) if n + 1 < len(chunks) else None
+        body = page(chunk, total_pages=len(chunks))
+        if next_path:
+            body['links']['next'] = next_path
+        routes[path] = body
+    return routes
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_records_from_every_page(make_api, stream):
+    api = make_api(pages(link=lambda n: f"{BASE_URL}/inventory/device/info"
+                                        f"?page={n}"),
+                   AUVIK_API_STREAM_PAGES=stream)
+    assert list(api.iter_records('/inventory/device/info')) == RECORDS
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_relative_next_links_are_joined_to_the_base_url(make_api, stream):
+    api = make_api(pages(), AUVIK_API_STREAM_PAGES=stream)
+    assert list(api.iter_records('/inventory/device/info')) == RECORDS
+    assert all(url.startswith(BASE_URL) for url in api.session.requested)
+    assert len(api.session.requested) == 3
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_truncated_pages_raise_value_error(make_api, stream):
+    routes = pages()
+    routes['/inventory/device/info?page=1'] = b'{"data": [{"id": "d3"},'
+    api = make_api(routes, AUVIK_API_STREAM_PAGES=stream)
+    with pytest.raises(ValueError):
+        list(api.iter_records('/inventory/device/info'))
+
+
+def prefetch_threads():
+    return [t for t in threading.enumerate() if t.name == 'auvik-prefetch']
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+def test_prefetched_pages_arrive_in_order(make_api, prefetch):
+    api = make_api(pages(per_page=2))
+    data = list(api.iter_pages('/inventory/device/info', prefetch=prefetch))
+    assert data == [RECORDS[i:i + 2] for i in range(0, len(RECORDS), 2)]
+
+
+def test_closing_early_stops_the_prefetch_thread(make_api):
+    api = make_api(pages(per_page=1))
+    pages_iter = api.iter_pages('/inventory/device/info', prefetch=2)
+    assert next(pages_iter) == RECORDS[:1]
+    pages_iter.close()
+    assert wait_for(lambda: not prefetch_threads())
+    # The producer stopped a page or two ahead of the consumer
+    assert len(api.session.requested) < len(RECORDS)
+
+
+def test_prefetch_errors_reach_the_consumer(make_api):
+    routes = pages(per_page=1)
+    routes['/inventory/device/info?page=3'] = 404
+    api = make_api(routes)
+    pages_iter = api.iter_pages('/inventory/device/info', prefetch=2)
+    assert [next(pages_iter) for _ in range(3)] == \
+        [RECORDS[:1], RECORDS[1:2], RECORDS[2:3]]
+    with pytest.raises(Exception, match='404'):
+        next(pages_iter)
+    assert wait_for(lambda: not prefetch_threads())
@@ -0,0 +1,87 @@
+import pytest
+
+pushdown = pytest.importorskip('auvik_inventory.auvik.pushdown')
+AuvikFilter = pushdown.AuvikFilter
+AuvikFilterPushdown = pushdown.AuvikFilterPushdown
+
+DEVICE_TYPES = ['switch', 'l3Switch', 'router', 'firewall']
+STATUSES = ['online', 'offline', 'unreachable']
+PARAMS = {
+    'filter[deviceType]': 'device_type',
+    'filter[onlineStatus]': 'status',
+    'filter[vendorName]': 'vendor',
+    'filter[makeModel]': 'make',
+}
+DEVICES = [
+    {'name': 'sw1', 'device_type': 'switch', 'status': 'online',
+     'vendor': 'Cisco', 'make': 'Cisco C3750'},
+    {'name': 'sw2', 'device_type': 'l3Switch', 'status': 'offline',
+     'vendor': 'cisco', 'make': 'cisco C9300'},
+    {'name': 'rt1', 'device_type': 'router', 'status': 'online',
+     'vendor': 'Juniper', 'make': 'Juniper MX204'},
+    {'name': 'fw1', 'device_type': 'firewall', 'status': 'unreachable',
+     'vendor': 'CISCO', 'make': 'Cisco ASA 5506'},
+]
+
+
+class FakeSpec:
+    def query_path_params(self, path):
+        return [
+            {'name': 'filter[deviceType]', 'schema': {'enum': DEVICE_TYPES}},
+            {'name': 'filter[onlineStatus]', 'schema': {'enum': STATUSES}},
+            {'name': 'filter[vendorName]', 'schema': {'type': 'string'}},
+            {'name': 'filter[makeModel]', 'schema': {'type': 'string'}},
+        ]
+
+
+def server(params):
+    # The API matches filter values exactly and case-sensitively
+    return [device for device in DEVICES
+            if all(device[PARAMS[name]] == value
+                   for name, value in params.items())]
+
+
+def planned(filters):
+    plan = AuvikFilterPushdown(FakeSpec()).plan(AuvikFilter(filters))
+    devices = server(plan.params)
+    if plan.local:
+        devices = plan.local.filter_devices(devices)
+    return plan, devices
+
+
+@pytest.mark.parametrize('filters', [
+    'status=online',
+    'device_type==switch',
+    'device_type=^l3',
+    'device_type=switch',
+    'status=!online',
+    'vendor==Cisco',
+    'vendor=cisco,status=online',
+    'make==cisco c3750',
+    'device_type=~^(router|firewall)$,vendor=!juniper',
+    'device_type==switch,device_type=!l3',
+])
+def test_pushdown_matches_local_filtering(filters):
+    _, devices = planned(filters)
+    assert devices == AuvikFilter(filters).filter_devices(DEVICES)
+
+
+def test_enum_values_are_pushed_as_spelled_by_auvik():
+    plan, _ = planned('device_type=^l3,status==ONLINE')
+    assert plan.params == {'filter[deviceType]': 'l3Switch',
+                           'filter[onlineStatus]': 'online'}
+    assert plan.local is None
+
+
+def test_free_text_stays_local():
+    plan, _ = planned('vendor==Cisco,make==Cisco C3750')
+    assert plan.params == {}
+    assert plan.local.filters == [{'vendor': '=Cisco'},
+                                  {'make': '=Cisco C3750'}]
+
+
+def test_ambiguous_and_negated_enums_stay_local():
+    # 'switch' is a substring of both switch and l3Switch
+    plan, _ = planned('device_type=switch,status=!online')
+    assert plan.params == {}
+    assert len(plan.local.filters) == 2
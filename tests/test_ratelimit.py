@@ -0,0 +1,180 @@
+from email.utils import formatdate
+
+import pytest
+
+ratelimit = pytest.importorskip('auvik_inventory.auvik.ratelimit')
+TokenBucket = ratelimit.TokenBucket
+RetryBudget = ratelimit.RetryBudget
+RequestScheduler = ratelimit.RequestScheduler
+
+NOW = 1_700_000_000.0
+
+
+class Clock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_bucket_without_a_rate_never_waits(clock):
+    bucket = TokenBucket(clock=clock)
+    assert [bucket.reserve() for _ in range(1000)] == [0.0] * 1000
+
+
+def test_bucket_spends_the_burst_then_waits(clock):
+    bucket = TokenBucket(2, burst=2, clock=clock)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_burst_defaults_to_the_rate(clock):
+    bucket = TokenBucket(4, clock=clock)
+    assert [bucket.reserve() for _ in range(5)] == \
+        [0.0, 0.0, 0.0, 0.0, pytest.approx(0.25)]
+
+
+def test_bucket_refills_over_time(clock):
+    bucket = TokenBucket(2, burst=2, clock=clock)
+    bucket.reserve()
+    bucket.reserve()
+    clock.advance(0.5)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.5)
+    # Never refills beyond the burst
+    clock.advance(60)
+    assert [bucket.reserve() for _ in range(3)] == \
+        [0.0, 0.0, pytest.approx(0.5)]
+
+
+def test_bucket_pause_holds_every_caller(clock):
+    bucket = TokenBucket(clock=clock)
+    bucket.pause(3)
+    assert bucket.reserve() == 3
+    clock.advance(1)
+    assert bucket.reserve() == 2
+    # A shorter pause never cuts a longer one
+    bucket.pause(1)
+    assert bucket.reserve() == 2
+    clock.advance(2)
+    assert bucket.reserve() == 0.0
+
+
+def test_bucket_throttle_and_recover(clock):
+    bucket = TokenBucket(8, clock=clock)
+    bucket.throttle()
+    assert bucket.rate == 4
+    bucket.throttle()
+    bucket.throttle()
+    bucket.throttle()
+    bucket.throttle()
+    assert bucket.rate == bucket.min_rate
+    for _ in range(100):
+        bucket.recover()
+    assert bucket.rate == 8
+
+
+def test_bucket_set_max_rate(clock):
+    bucket = TokenBucket(8, clock=clock)
+    bucket.set_max_rate(2)
+    assert (bucket.rate, bucket.max_rate) == (2, 2)
+    bucket.set_max_rate(4)
+    # Grows back to the new ceiling rather than jumping there
+    assert (bucket.rate, bucket.max_rate) == (2, 4)
+
+
+def test_retry_budget_is_exhausted_and_earned_back():
+    budget = RetryBudget(budget=2, ratio=0.5)
+    assert budget.withdraw()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+    for _ in range(10):
+        budget.deposit()
+    assert budget.tokens == 2
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('7', 7.0),
+    ('0.5', 0.5),
+    ('-3', 0.0),
+    (formatdate(NOW + 30, usegmt=True), 30.0),
+    (formatdate(NOW - 30, usegmt=True), 0.0),
+    ('soon', None),
+    ('', None),
+    (None, None),
+])
+def test_parse_retry_after(header, expected):
+    assert RequestScheduler.parse_retry_after(header, now=NOW) == expected
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('12', 12.0),
+    (str(NOW + 5), 5.0),
+    (str(NOW - 5), 0.0),
+    ('never', None),
+    (None, None),
+])
+def test_parse_reset(header, expected):
+    assert RequestScheduler.parse_reset(header, now=NOW) == expected
+
+
+def test_scheduler_is_unpaced_by_default(clock):
+    scheduler = RequestScheduler(clock=clock)
+    assert scheduler.bucket.rate is None
+    for _ in range(100):
+        scheduler.success({})
+    assert [scheduler.bucket.reserve() for _ in range(100)] == [0.0] * 100
+
+
+def test_scheduler_follows_rate_limit_headers(clock):
+    scheduler = RequestScheduler(clock=clock)
+    scheduler.success({'X-RateLimit-Remaining': '50',
+                       'X-RateLimit-Reset': '10'})
+    assert scheduler.bucket.rate == 5
+    # A spent window holds every worker until the reset
+    scheduler.success({'X-RateLimit-Remaining': '0',
+                       'X-RateLimit-Reset': '4'})
+    assert scheduler.bucket.reserve() == pytest.approx(4)
+
+
+def test_scheduler_caps_the_header_rate(clock):
+    scheduler = RequestScheduler(rate=2, clock=clock)
+    scheduler.success({'X-RateLimit-Remaining': '50',
+                       'X-RateLimit-Reset': '10'})
+    assert scheduler.bucket.max_rate == 2
+
+
+def test_scheduler_paces_after_the_first_429(clock):
+    scheduler = RequestScheduler(clock=clock)
+    assert scheduler.retry_delay(429, 0, '1') == 1
+    assert scheduler.bucket.rate == RequestScheduler.THROTTLED_RATE / 2
+
+
+def test_scheduler_gives_up(clock):
+    scheduler = RequestScheduler(max_retries=2, retry_budget=10, clock=clock)
+    assert scheduler.retry_delay(404, 0) is None
+    assert scheduler.retry_delay(503, 0) is not None
+    assert scheduler.retry_delay(None, 1) is not None
+    assert scheduler.retry_delay(503, 2) is None
+    assert scheduler.retries == 2
+
+
+def test_scheduler_shares_the_retry_budget(clock):
+    scheduler = RequestScheduler(retry_budget=1, clock=clock)
+    assert scheduler.retry_delay(503, 0) is not None
+    assert scheduler.retry_delay(503, 0) is None
@@ -0,0 +1,87 @@
+import io
+
+import pytest
+
+render = pytest.importorskip('auvik_inventory.auvik.render')
+TableRenderer = render.TableRenderer
+
+DEVICES = [
+    {'name': 'sw1', 'ip': '10.0.0.1', 'ips': ['10.0.0.1', '10.0.1.1']},
+    {'name': 'core-switch-01', 'ip': '10.0.0.2', 'ips': ['10.0.0.2']},
+]
+
+
+def rendered(devices, **kwargs):
+    out = io.StringIO()
+    count = TableRenderer(out=out, **kwargs).render(devices)
+    return count, out.getvalue()
+
+
+def test_table_truncates_to_fixed_widths():
+    count, text = rendered(DEVICES, columns=['name', 'ip'],
+                           widths={'name': 6, 'ip': 8})
+    assert count == 2
+    assert text.splitlines() == [
+        '+--------+----------+',
+        '| name   | ip       |',
+        '+--------+----------+',
+        '| sw1    | 10.0.0.1 |',
+        '| core-~ | 10.0.0.2 |',
+        '+--------+----------+',
+    ]
+
+
+def test_table_truncates_rows_after_the_sample():
+    devices = [{'name': 'a'}, {'name': 'abcdefgh'}]
+    _, text = rendered(devices, columns=['name'], sample=1)
+    # Sized by 'name', the header is never cut
+    assert '| abc~ |' in text.splitlines()
+
+
+def test_table_caps_sampled_widths():
+    _, text = rendered(DEVICES, columns=['name'], max_width=8)
+    assert '| core-sw~ |' in text.splitlines()
+
+
+def test_table_shows_list_lengths():
+    _, text = rendered(DEVICES[:1], columns=['ips'])
+    assert '| 2   |' in text.splitlines()
+
+
+def test_csv():
+    count, text = rendered(DEVICES, columns=['name', 'ips'], mode='csv')
+    assert count == 2
+    assert text == ('name,ips\n'
+                    'sw1,10.0.0.1;10.0.1.1\n'
+                    'core-switch-01,10.0.0.2\n')
+
+
+def test_tsv():
+    _, text = rendered(DEVICES, columns=['name', 'ip'], mode='tsv')
+    assert text == ('name\tip\n'
+                    'sw1\t10.0.0.1\n'
+                    'core-switch-01\t10.0.0.2\n')
+
+
+def test_columns_default_to_the_first_device():
+    _, text = rendered(DEVICES, mode='csv')
+    assert text.splitlines()[0] == 'name,ip,ips'
+
+
+@pytest.mark.parametrize('mode, expected', [
+    ('csv', 'name,ip\n'),
+    ('tsv', 'name\tip\n'),
+    ('table', '+------+----+\n| name | ip |\n+------+----+\n'
+              '+------+----+\n'),
+])
+def test_empty_input_writes_the_header(mode, expected):
+    assert rendered([], columns=['name', 'ip'], mode=mode) == (0, expected)
+
+
+def test_empty_input_without_columns_writes_nothing():
+    assert rendered([], mode='csv') == (0, '')
+
+
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        TableRenderer(mode='xml')
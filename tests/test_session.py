@@ -0,0 +1,59 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('requests')
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"data": []}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize('settings, size', [
+    ({}, 8),
+    ({'AUVIK_API_MAX_WORKERS': 3}, 3),
+    ({'AUVIK_API_MAX_WORKERS': 3, 'AUVIK_API_POOL_SIZE': 12}, 12),
+])
+def test_pool_is_sized_for_the_workers(make_api, settings, size):
+    api = make_api(**settings)
+    session = api._create_session()
+    adapter = session.get_adapter(api.base_url)
+    assert api.pool_size == size
+    assert adapter._pool_maxsize == size
+    assert adapter._pool_block
+    assert session.auth == ('user', 'key')
+
+
+def test_pool_stats_count_reused_connections(make_api, server):
+    api = make_api(AUVIK_API_URL=server, AUVIK_API_POOL_SIZE=2)
+    api.session = api._create_session()
+    for _ in range(3):
+        assert api._get('/tenants') == []
+    # One keep-alive connection served every request
+    assert api.pool_stats[server] == {
+        'maxsize': 2, 'available': 2, 'connections': 1, 'requests': 3,
+        'reused': 2,
+    }
+    api.session.close()
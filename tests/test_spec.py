@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+spec = pytest.importorskip('auvik_inventory.auvik.spec')
+AuvikSpec = spec.AuvikSpec
+
+SPEC = {
+    'servers': [{'url': 'https://auvik.test/v1'}],
+    'tags': [{'name': 'Inventory'}, {'name': 'Alerts'}],
+    'paths': {
+        '/inventory/device/info/{id}': {
+            'parameters': [
+                {'name': 'id', 'in': 'path', 'required': True,
+                 'schema': {'type': 'string'}},
+            ],
+            'get': {
+                'operationId': 'readDeviceInfo',
+                'tags': ['Inventory'],
+                'parameters': [
+                    {'name': 'id', 'in': 'query',
+                     'schema': {'type': 'string'}},
+                    {'$ref': '#/components/parameters/DeviceType'},
+                ],
+            },
+        },
+        '/alert/dismiss/{id}': {
+            'post': {'operationId': 'dismissAlert', 'tags': ['Alerts']},
+        },
+    },
+    'components': {
+        'parameters': {
+            'DeviceType': {'name': 'filter[deviceType]', 'in': 'query',
+                           'schema': {'$ref': '#/components/schemas/Type'}},
+        },
+        'schemas': {'Type': {'enum': ['switch', 'router']}},
+    },
+}
+
+
+@pytest.fixture
+def spec_file(tmp_path):
+    path = tmp_path / 'spec.json'
+    path.write_text(json.dumps(SPEC))
+    AuvikSpec.clear_cache()
+    yield str(path)
+    AuvikSpec.clear_cache()
+
+
+def test_params_with_the_same_name_are_kept_apart(spec_file):
+    s = AuvikSpec(spec_file)
+    path = '/inventory/device/info/{id}'
+    assert s.param(path, 'id', location='path')['required'] is True
+    assert 'required' not in s.param(path, 'id', location='query')
+    # Without a location the query parameter comes first
+    assert s.param(path, 'id') is s.param(path, 'id', location='query')
+    assert s.param(path, 'id', location='header') is None
+    assert [p['name'] for p in s.path_only_params(path)] == ['id']
+    assert [p['name'] for p in s.query_path_params(path)] == \
+        ['id', 'filter[deviceType]']
+    assert [p['in'] for p in s.required_path_params(path)] == ['path']
+
+
+def test_refs_are_resolved(spec_file):
+    param = AuvikSpec(spec_file).param('/inventory/device/info/{id}',
+                                       'filter[deviceType]')
+    assert param['schema']['enum'] == ['switch', 'router']
+
+
+def test_operation_lookups(spec_file):
+    s = AuvikSpec(spec_file)
+    assert s.paths_by_tag('Alerts') == ['/alert/dismiss/{id}']
+    assert s.path_methods('/alert/dismiss/{id}') == ['post']
+    assert s.path_by_operation_id('readDeviceInfo') == \
+        '/inventory/device/info/{id}'
+    with pytest.raises(spec.IEAutomationAuvikSpecError):
+        s.path_params('/alert/dismiss/{id}')
+    with pytest.raises(spec.IEAutomationAuvikSpecError):
+        s.paths_by_tag('Nope')
+
+
+def test_compiled_spec_is_cached_until_the_spec_changes(spec_file, tmp_path,
+                                                        monkeypatch):
+    cache_file = str(tmp_path / 'cache' / 'spec.json')
+    AuvikSpec(spec_file, cache_file=cache_file).compiled
+    AuvikSpec.clear_cache()
+
+    def compile(spec):
+        raise AssertionError('compiled again')
+
+    monkeypatch.setattr(AuvikSpec, 'compile', staticmethod(compile))
+    s = AuvikSpec(spec_file, cache_file=cache_file)
+    assert s.param('/inventory/device/info/{id}', 'id', location='path')
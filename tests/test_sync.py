@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sync = pytest.importorskip('auvik_inventory.auvik.sync')
+AuvikInventorySync = sync.AuvikInventorySync
+AuvikSnapshot = sync.AuvikSnapshot
+
+DEVICES = '/inventory/device/info?tenants=t1'
+
+
+def record(record_id, modified, name=None):
+    return {'id': record_id, 'attributes': {
+        'deviceName': name or record_id, 'lastModified': modified,
+    }}
+
+
+class FakeAPI:
+    """ Serves records by URL, splitting off the filter[...] parameters.
+    """
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.requested = []
+        self.strict = None
+
+    def resolve_tenant_ids(self, tenants=None, tenant_ids=None, strict=False):
+        self.strict = strict
+        return tenant_ids.split(',')
+
+    def iter_records(self, url):
+        self.requested.append(url)
+        path, _, filters = url.partition('&filter[')
+        key = filters.split(']', 1)[0] if filters else None
+        return iter(self.routes.get((path, key), []))
+
+
+@pytest.fixture
+def snapshot_file(tmp_path):
+    return str(tmp_path / 'snapshot.json')
+
+
+def test_first_sync_is_a_full_pull(snapshot_file):
+    api = FakeAPI({(DEVICES, None): [
+        record('d1', '2021-01-02T00:00:00.000Z'),
+        record('d2', '2021-01-03T00:00:00.000Z'),
+    ]})
+    records = AuvikInventorySync(api, snapshot_file).sync(tenant_ids='t1')
+    assert [r['id'] for r in records] == ['d1', 'd2']
+    assert api.requested == [DEVICES]
+    assert api.strict
+    state = AuvikSnapshot(snapshot_file).tenant('devices', 't1')
+    assert state['high_water'] == '2021-01-03T00:00:00.000Z'
+    assert state['last_full']
+
+
+def test_later_syncs_merge_records_modified_after_the_high_water(
+        snapshot_file):
+    api = FakeAPI({(DEVICES, None): [
+        record('d1', '2021-01-02T00:00:00.000Z'),
+        record('d2', '2021-01-03T00:00:00.000Z'),
+    ]})
+    AuvikInventorySync(api, snapshot_file).sync(tenant_ids='t1')
+    api = FakeAPI({(DEVICES, 'modifiedAfter'): [
+        record('d2', '2021-01-05T00:00:00.000Z', name='renamed'),
+        record('d3', '2021-01-04T00:00:00.000Z'),
+    ]})
+    records = AuvikInventorySync(api, snapshot_file).sync(tenant_ids='t1')
+    assert api.requested == [
+        f"{DEVICES}&filter[modifiedAfter]=2021-01-03T00:00:00.000Z"
+    ]
+    assert {r['id']: r['attributes']['deviceName'] for r in records} == \
+        {'d1': 'd1', 'd2': 'renamed', 'd3': 'd3'}
+    state = AuvikSnapshot(snapshot_file).tenant('devices', 't1')
+    assert state['high_water'] == '2021-01-05T00:00:00.000Z'
+
+
+def test_full_pulls_drop_deleted_records(snapshot_file):
+    api = FakeAPI({(DEVICES, None): [
+        record('d1', '2021-01-02T00:00:00.000Z'),
+        record('d2', '2021-01-03T00:00:00.000Z'),
+    ]})
+    AuvikInventorySync(api, snapshot_file).sync(tenant_ids='t1')
+    api.routes[(DEVICES, None)] = [record('d2', '2021-01-03T00:00:00.000Z')]
+    # An incremental pull never sees the deletion
+    records = AuvikInventorySync(api, snapshot_file).sync(tenant_ids='t1')
+    assert [r['id'] for r in records] == ['d1', 'd2']
+    records = AuvikInventorySync(api, snapshot_file).sync(tenant_ids='t1',
+                                                          full=True)
+    assert [r['id'] for r in records] == ['d2']
+    # Overdue full pulls catch deletions without full=True
+    api.routes[(DEVICES, None)] = []
+    records = AuvikInventorySync(api, snapshot_file,
+                                 full_interval=-1).sync(tenant_ids='t1')
+    assert records == []
+
+
+def test_devices_not_seen_since_the_cutoff_are_pruned(snapshot_file):
+    api = FakeAPI({
+        (DEVICES, None): [
+            record('d1', '2021-01-02T00:00:00.000Z'),
+            record('d2', '2021-01-03T00:00:00.000Z'),
+        ],
+        (DEVICES, 'notSeenSince'): [record('d1', '2021-01-02T00:00:00.000Z')],
+    })
+    started = datetime.now(timezone.utc)
+    records = AuvikInventorySync(api, snapshot_file,
+                                 stale_after=3600).sync(tenant_ids='t1')
+    assert [r['id'] for r in records] == ['d2']
+    cutoff = api.requested[-1].rsplit('=', 1)[1]
+    assert cutoff.endswith('Z') and len(cutoff) == 24
+    cutoff = datetime.strptime(cutoff, sync.TIME_FORMAT) \
+        .replace(tzinfo=timezone.utc)
+    expected = started - timedelta(hours=1)
+    assert abs(cutoff - expected) < timedelta(seconds=5)
+
+
+def test_only_devices_are_pruned(snapshot_file):
+    networks = '/inventory/network/info?tenants=t1'
+    api = FakeAPI({(networks, None): [record('n1', None)]})
+    records = AuvikInventorySync(api, snapshot_file, stale_after=3600) \
+        .sync('networks', tenant_ids='t1')
+    assert [r['id'] for r in records] == ['n1']
+    assert api.requested == [networks]
+
+
+def test_tenants_are_synced_separately(snapshot_file):
+    api = FakeAPI({
+        (DEVICES, None): [record('d1', '2021-01-02T00:00:00.000Z')],
+        ('/inventory/device/info?tenants=t2', None):
+            [record('d9', '2021-01-09T00:00:00.000Z')],
+    })
+    records = AuvikInventorySync(api, snapshot_file).sync(tenant_ids='t1,t2')
+    assert [r['id'] for r in records] == ['d1', 'd9']
+    snapshot = AuvikSnapshot(snapshot_file)
+    assert snapshot.tenant('devices', 't1')['high_water'] == \
+        '2021-01-02T00:00:00.000Z'
+
+
+def test_invalid_collection(snapshot_file):
+    with pytest.raises(ValueError):
+        AuvikInventorySync(FakeAPI({}), snapshot_file).sync(
+            'printers', tenant_ids='t1'
+        )
@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+sysdescr = pytest.importorskip('auvik_inventory.auvik.sysdescr')
+SysDescr = sysdescr.SysDescr
+SysDescrCache = sysdescr.SysDescrCache
+
+IOS = ('Cisco IOS Software, C3750 Software (C3750-IPSERVICESK9-M), '
+       'Version 12.2(55)SE5, RELEASE SOFTWARE (fc1)')
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """ Descriptions parsed, classified as themselves.
+    """
+    calls = []
+
+    def parse(description):
+        calls.append(description)
+        return SysDescr(description, None, None, None)
+
+    monkeypatch.setattr(SysDescrCache, 'parse', staticmethod(parse))
+    return calls
+
+
+def test_descriptions_are_parsed_once(parsed):
+    cache = SysDescrCache()
+    for _ in range(3):
+        for description in ('a', 'b'):
+            assert cache.classify(description).os == description
+    assert parsed == ['a', 'b']
+    assert cache.stats == {'hits': 4, 'misses': 2, 'entries': 2,
+                           'maxsize': SysDescrCache.DEFAULT_MAXSIZE}
+
+
+def test_least_recently_used_descriptions_are_dropped(parsed):
+    cache = SysDescrCache(maxsize=2)
+    cache.classify('a')
+    cache.classify('b')
+    cache.classify('a')
+    cache.classify('c')
+    assert len(cache) == 2
+    cache.classify('a')
+    cache.classify('b')
+    assert parsed == ['a', 'b', 'c', 'b']
+
+
+def test_shrinking_trims_the_cache(parsed):
+    cache = SysDescrCache()
+    for description in 'abcd':
+        cache.classify(description)
+    cache.configure(maxsize=2)
+    assert len(cache) == 2
+    cache.classify('d')
+    assert parsed == list('abcd')
+
+
+def test_entries_survive_a_restart(parsed, tmp_path):
+    cache_file = str(tmp_path / 'sysdescr.json')
+    cache = SysDescrCache(cache_file=cache_file)
+    cache.classify('a')
+    cache.save()
+    restarted = SysDescrCache(cache_file=cache_file)
+    assert restarted.classify('a') == SysDescr('a', None, None, None)
+    assert parsed == ['a']
+
+
+def test_unchanged_caches_are_not_written(parsed, tmp_path):
+    cache_file = tmp_path / 'sysdescr.json'
+    SysDescrCache(cache_file=str(cache_file)).save()
+    assert not cache_file.exists()
+
+
+@pytest.mark.parametrize('key, value', [
+    ('version', 0),
+    ('mapper', 'stale'),
+    ('sysdescrparser', '0.0.1'),
+])
+def test_stale_stamps_are_discarded(parsed, tmp_path, key, value):
+    cache_file = tmp_path / 'sysdescr.json'
+    cache = SysDescrCache(cache_file=str(cache_file))
+    cache.classify('a')
+    cache.save()
+    stored = json.loads(cache_file.read_text())
+    stored['stamp'][key] = value
+    cache_file.write_text(json.dumps(stored))
+    restarted = SysDescrCache(cache_file=str(cache_file))
+    assert len(restarted) == 0
+    restarted.classify('a')
+    assert parsed == ['a', 'a']
+
+
+def test_corrupt_caches_are_ignored(parsed, tmp_path):
+    cache_file = tmp_path / 'sysdescr.json'
+    cache_file.write_text('{"stamp":')
+    cache = SysDescrCache(cache_file=str(cache_file))
+    assert len(cache) == 0
+
+
+def test_parse_maps_the_os():
+    pytest.importorskip('sysdescrparser')
+    entry = SysDescrCache.parse(IOS)
+    assert entry.os == 'IOS'
+    assert entry.nd_type == sysdescr.NET_DEVICE_MAPPER['IOS']
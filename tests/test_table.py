@@ -0,0 +1,105 @@
+import pytest
+
+table = pytest.importorskip('auvik_inventory.auvik.table')
+DeviceTable = table.DeviceTable
+DeviceColumn = table.DeviceColumn
+PlainColumn = table.PlainColumn
+AuvikDeviceData = table.AuvikDeviceData
+
+DESCRIPTIONS = {
+    'switch': ('Cisco IOS Software, C3750 Software (C3750-IPSERVICESK9-M), '
+               'Version 12.2(55)SE5, RELEASE SOFTWARE (fc1)'),
+    'firewall': 'Cisco Adaptive Security Appliance Version 9.8(4)',
+}
+
+
+def record(n, device_type='switch', status='online'):
+    return {
+        'type': 'device',
+        'id': f"d{n}",
+        'attributes': {
+            'ipAddresses': [f"10.0.0.{n}"],
+            'deviceName': f"dev{n}",
+            'deviceType': device_type,
+            'makeModel': 'C3750',
+            'vendorName': 'Cisco',
+            'softwareVersion': '12.2',
+            'serialNumber': f"SN{n}",
+            'description': DESCRIPTIONS[device_type],
+            'firmwareVersion': '',
+            'onlineStatus': status,
+            'lastSeenTime': '2021-01-01T00:00:00.000Z',
+            'lastModified': '2021-01-01T00:00:00.000Z',
+        },
+        'relationships': {'tenant': {'data': {
+            'id': 't1', 'type': 'tenant',
+            'attributes': {'domainPrefix': 'acme'},
+        }}},
+    }
+
+
+RECORDS = [record(1), record(2, status='offline'), record(3, 'firewall'),
+           record(4)]
+
+
+def devices(lazy=False):
+    return [AuvikDeviceData(r, lazy=lazy) for r in RECORDS]
+
+
+def test_projected_columns_only():
+    projected = DeviceTable.from_devices(devices(), columns=['name', 'status'])
+    assert projected.columns == ['name', 'status']
+    assert list(projected.rows()) == [
+        {'name': 'dev1', 'status': 'online'},
+        {'name': 'dev2', 'status': 'offline'},
+        {'name': 'dev3', 'status': 'online'},
+        {'name': 'dev4', 'status': 'online'},
+    ]
+    with pytest.raises(KeyError):
+        projected['os']
+
+
+def test_projection_leaves_lazy_fields_unparsed():
+    lazy = devices(lazy=True)
+    DeviceTable.from_devices(lazy, columns=['name', 'ip', 'status'])
+    assert not any(hasattr(device, slot) for device in lazy
+                   for slot in AuvikDeviceData._derived_slots)
+    DeviceTable.from_devices(lazy, columns=['name', 'os'])
+    assert all(device._os for device in lazy)
+
+
+def test_columns_are_encoded_by_cardinality():
+    full = DeviceTable.from_devices(devices())
+    assert full.columns == list(DeviceTable.COLUMNS)
+    assert isinstance(full['status'], DeviceColumn)
+    assert isinstance(full['name'], PlainColumn)
+    assert full['status'].cardinality == 2
+    assert full['status'].values == ['online', 'offline']
+
+
+def test_select_projects_an_existing_table():
+    full = DeviceTable.from_devices(devices())
+    selected = full.select('ip', 'name')
+    assert selected.columns == ['ip', 'name']
+    assert selected.column('name') == ['dev1', 'dev2', 'dev3', 'dev4']
+    # Columns are shared, not copied
+    assert selected['name'] is full['name']
+
+
+def test_filter_and_aggregate():
+    full = DeviceTable.from_devices(devices())
+    online = full.filter('status==online', device_type='switch')
+    assert online.column('name') == ['dev1', 'dev4']
+    assert full.filter('name=!dev1').column('name') == ['dev2', 'dev3',
+                                                        'dev4']
+    assert full.counts('status') == {'online': 3, 'offline': 1}
+    groups = full.group_by('device_type')
+    assert {key: len(rows) for key, rows in groups.items()} == \
+        {'switch': 3, 'firewall': 1}
+
+
+def test_round_trip_to_devices():
+    original = devices()
+    rebuilt = DeviceTable.from_devices(original).to_devices()
+    assert [(d.name, d.ip, d.os, d.nd_type) for d in rebuilt] == \
+        [(d.name, d.ip, d.os, d.nd_type) for d in original]
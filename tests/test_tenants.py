@@ -0,0 +1,112 @@
+import json
+import logging
+
+import pytest
+
+tenants = pytest.importorskip('auvik_inventory.auvik.tenants')
+TenantDirectory = tenants.TenantDirectory
+AuvikTenantData = tenants.AuvikTenantData
+TenantError = tenants.IEAutomationAuvikAPIError
+
+DOMAINS = [('t1', 'acme'), ('t2', 'acme-east'), ('t3', 'acme-west'),
+           ('t4', 'globex'), ('t5', 'initech')]
+TENANTS = [AuvikTenantData({'id': tenant_id,
+                            'attributes': {'domainPrefix': domain}})
+           for tenant_id, domain in DOMAINS]
+
+
+def directory(**policies):
+    return TenantDirectory(TENANTS, **policies)
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('t4', ['t4']),
+    ('ACME', ['t1']),
+    ('acme-w', ['t3']),
+    ('tech', ['t5']),
+])
+def test_names_resolve_at_the_most_specific_level(name, expected):
+    assert directory().resolve(name) == expected
+
+
+@pytest.mark.parametrize('ambiguous, expected', [
+    ('first', ['t2']),
+    ('all', ['t2', 't3']),
+])
+def test_ambiguous_names(ambiguous, expected):
+    assert directory(ambiguous=ambiguous).resolve('acme-') == expected
+
+
+def test_ambiguous_names_can_raise():
+    with pytest.raises(TenantError, match='ambiguous'):
+        directory(ambiguous='error').resolve('acme-')
+
+
+def test_missing_names_warn_by_default(caplog):
+    with caplog.at_level(logging.WARNING, logger='auvik.tenants'):
+        assert directory().resolve('hooli') == []
+    assert 'No tenant found for hooli' in caplog.text
+
+
+def test_missing_names_can_be_ignored(caplog):
+    with caplog.at_level(logging.WARNING, logger='auvik.tenants'):
+        assert directory(missing='ignore').resolve('hooli') == []
+    assert caplog.text == ''
+
+
+def test_missing_names_can_raise():
+    with pytest.raises(TenantError, match='hooli'):
+        directory(missing='error').resolve('hooli')
+
+
+@pytest.mark.parametrize('policies', [
+    {'ambiguous': 'some'},
+    {'missing': 'shrug'},
+])
+def test_invalid_policies(policies):
+    with pytest.raises(TenantError):
+        directory(**policies)
+
+
+def test_resolve_all_keeps_order_without_duplicates():
+    assert directory(missing='ignore').resolve_all(
+        ['globex', 't1', 'acme', 'hooli', 'acme-e']
+    ) == ['t4', 't1', 't2']
+
+
+def test_resolve_all_raises_when_nothing_resolves():
+    with pytest.raises(TenantError, match='hooli, umbrella'):
+        directory(missing='ignore').resolve_all(['hooli', 'umbrella'])
+
+
+def test_strict_resolve_all_raises_on_any_missing_name():
+    with pytest.raises(TenantError, match='No tenants found for hooli'):
+        directory(missing='ignore').resolve_all(['acme', 'hooli'],
+                                                strict=True)
+    assert directory().resolve_all(['acme', 'globex'], strict=True) == \
+        ['t1', 't4']
+
+
+def test_unresolved_ignores_the_policies():
+    assert directory(missing='error').unresolved(['acme', 'hooli']) == \
+        ['hooli']
+
+
+def test_saved_directories_are_loaded_within_the_ttl(tmp_path):
+    tenant_file = str(tmp_path / 'tenants.json')
+    directory().save(tenant_file, namespace='user@auvik')
+    loaded = TenantDirectory.load(tenant_file, ttl=60,
+                                  namespace='user@auvik', ambiguous='all')
+    assert loaded.loaded
+    assert loaded.resolve('acme-') == ['t2', 't3']
+    assert TenantDirectory.load(tenant_file, ttl=60,
+                                namespace='other@auvik') is None
+
+
+def test_expired_directories_are_not_loaded(tmp_path):
+    tenant_file = tmp_path / 'tenants.json'
+    directory().save(str(tenant_file))
+    stored = json.loads(tenant_file.read_text())
+    stored['saved'] -= 120
+    tenant_file.write_text(json.dumps(stored))
+    assert TenantDirectory.load(str(tenant_file), ttl=60) is None
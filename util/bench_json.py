@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+#title:             bench_json.py
+#description:       Compare JSON decoders and streaming on Auvik sized pages
+#author:            Ricky Laney
+#date:              20261017
+#version:           0.0.1
+#usage:             python util/bench_json.py [records] [rounds]
+#notes:             orjson/ujson are timed only when installed
+#python_version:    3.9.0
+#==============================================================================
+
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'auvik_inventory', 'auvik'))
+
+from decoder import DECODERS, AuvikPage
+
+
+def make_page(records):
+    data = [{
+        'id': f"{n:024x}",
+        'type': 'deviceInfo',
+        'attributes': {
+            'deviceName': f"sw-{n:06d}",
+            'ipAddresses': [f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"],
+            'macAddress': f"00:11:22:{n >> 16 & 255:02x}:{n >> 8 & 255:02x}:"
+                          f"{n & 255:02x}",
+            'serialNumber': f"FOC{n:08d}",
+            'description': 'Cisco IOS Software, C2960X Software, '
+                           'Version 15.2(7)E3, RELEASE SOFTWARE (fc3)',
+            'deviceType': 'switch',
+            'makeModel': 'Cisco WS-C2960X-48FPD-L',
+            'vendorName': 'Cisco',
+            'onlineStatus': 'online',
+            'lastSeenTime': '2021-05-01T12:00:00.000Z',
+            'lastModified': '2021-05-01T12:00:00.000Z',
+        },
+        'relationships': {'tenant': {'data': {'id': '123', 'type': 'tenant'}}},
+    } for n in range(records)]
+    return json.dumps({
+        'data': data,
+        'links': {'first': 'page=1', 'next': 'page=2'},
+        'meta': {'totalPages': 2},
+    }).encode()
+
+
+def measure(consume, body, rounds):
+    best = None
+    for _ in range(rounds):
+        gc.collect()
+        started = time.perf_counter()
+        consume(body)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    gc.collect()
+    tracemalloc.start()
+    consume(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def whole(loads):
+    def consume(body):
+        for record in loads(body)['data']:
+            pass
+    return consume
+
+
+def stream(body):
+    for record in AuvikPage(body):
+        pass
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    body = make_page(records)
+    print(f"{records} records, {len(body) / 2**20:.1f} MiB, best of {rounds}")
+    print(f"{'decoder':<12}{'seconds':>10}{'records/s':>14}{'peak MiB':>12}")
+    runs = []
+    for name, factory in DECODERS.items():
+        try:
+            runs.append((name, whole(factory())))
+        except ImportError:
+            print(f"{name:<12}{'not installed':>10}")
+    runs.append(('stream', stream))
+    for name, consume in runs:
+        seconds, peak = measure(consume, body, rounds)
+        print(f"{name:<12}{seconds:>10.3f}{records / seconds:>14,.0f}"
+              f"{peak / 2**20:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()